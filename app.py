@@ -1,4 +1,6 @@
 """Main application entry point for FastAPI."""
+import sys
+
 import uvicorn
 
 from app import create_app
@@ -15,6 +17,11 @@ def run() -> None:
         port=5001,
         reload=config.DEBUG,
         log_level=config.LOG_LEVEL.lower(),
+        # uvicorn[standard] ships uvloop/httptools (uvloop is not built for
+        # Windows); pin them so a broken install fails loudly instead of
+        # silently falling back to the slower pure-Python stack.
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
     )
 
 
@@ -1,14 +1,16 @@
 """FastAPI application factory."""
+import asyncio
 import logging
 import os
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
 
 from config import config
 from app.routes import register_routers
+from app.utils.spa_static import SPAStaticFiles
 from database import get_db_connection
 
 # Configure logging
@@ -40,14 +42,28 @@ def initialize_app_database():
         else:
             logger.warning("Could not connect to database for initialization")
     except Exception as e:
-        logger.error(f"Database initialization failed: {e}")
+        logger.error("Database initialization failed: %s", e)
 
 
 @asynccontextmanager
 async def _lifespan(_: FastAPI):
     """Run startup tasks for FastAPI lifespan."""
+    from app.routes.servicenow import close_servicenow_client, run_health_probe_loop
+    from app.services.chat_service import close_http_client, prewarm_provider_connection
+
     initialize_app_database()
+    # Runs in the background so an unreachable provider cannot delay startup.
+    prewarm_task = asyncio.create_task(prewarm_provider_connection())
+    health_probe_task = asyncio.create_task(run_health_probe_loop())
     yield
+    prewarm_task.cancel()
+    health_probe_task.cancel()
+    await close_http_client()
+    await close_servicenow_client()
+
+
+async def _api_not_found(rest: str):
+    raise HTTPException(status_code=404, detail="Not Found")
 
 
 def create_app() -> FastAPI:
@@ -56,6 +72,9 @@ def create_app() -> FastAPI:
         title=config.APP_TITLE,
         version=config.APP_VERSION,
         lifespan=_lifespan,
+        # orjson encodes the large vulnerability/report payloads several
+        # times faster than the stdlib encoder.
+        default_response_class=ORJSONResponse,
     )
 
     app.add_middleware(
@@ -70,9 +89,17 @@ def create_app() -> FastAPI:
 
     static_folder = config.STATIC_FOLDER
     if os.path.isdir(static_folder):
+        # Unknown API paths are answered by the router's compiled regex, so the
+        # SPA fallback below never sees them.
+        app.add_api_route(
+            "/api/{rest:path}",
+            _api_not_found,
+            methods=["GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
+            include_in_schema=False,
+        )
         app.mount(
             "/",
-            StaticFiles(directory=static_folder, html=True),
+            SPAStaticFiles(directory=static_folder, html=True),
             name="frontend",
         )
     else:
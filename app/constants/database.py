@@ -14,6 +14,16 @@ TABLE_RAPID_VULNERABILITIES = "rapid_vulnerabilities"
 TABLE_NUCLEI_VULNERABILITIES = "nuclei_vulnerabilities"
 TABLE_DEVICE_TAG_RULES = "device_tag_rules"
 TABLE_DEVICE_TAGS = "device_tags"
+TABLE_DEVICE_TAG_SUMMARY = "device_tag_summary"
+TABLE_CVE_SUMMARY = "cve_summary"
+
+# Column list of the vulnerabilities index that covers the CVE report
+# aggregates (distinct devices and OS/RBAC buckets) without touching rows.
+CVE_COVERING_INDEX_COLUMNS = "cve_id, os_platform, rbac_group_name, device_id, device_name"
+
+# Reversed device name, so suffix tag rules ("%.example.com") become
+# index-seekable prefix matches ("moc.elpmaxe.%").
+DEVICE_NAME_REV_COLUMN = "device_name_rev VARCHAR(255) AS (REVERSE(device_name)) STORED"
 
 # Sync types
 SYNC_TYPE_FULL = "full"
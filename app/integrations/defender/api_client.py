@@ -32,7 +32,7 @@ def fetch_device_vulnerabilities(access_token: str) -> list:
     }
     
     while url:
-        logger.info(f"Requesting: {url}")
+        logger.info("Requesting: %s", url)
         
         try:
             response = requests.get(url, headers=headers)
@@ -41,7 +41,7 @@ def fetch_device_vulnerabilities(access_token: str) -> list:
             
             if 'value' in data:
                 results.extend(data['value'])
-                logger.info(f"Fetched {len(data['value'])} records")
+                logger.info("Fetched %s records", len(data['value']))
                 
                 if '@odata.nextLink' in data:
                     url = data['@odata.nextLink']
@@ -52,10 +52,10 @@ def fetch_device_vulnerabilities(access_token: str) -> list:
                 url = None
                 
         except requests.exceptions.RequestException as e:
-            logger.error(f"API request failed: {e}")
+            logger.error("API request failed: %s", e)
             url = None
     
-    logger.info(f"Total fetched {len(results)} records")
+    logger.info("Total fetched %s records", len(results))
     return results
 
 
@@ -88,5 +88,5 @@ def run_advanced_query(query: str, access_token: str) -> dict:
         }
     
     except Exception as e:
-        logger.error(f"Advanced query execution failed: {e}")
+        logger.error("Advanced query execution failed: %s", e)
         return None
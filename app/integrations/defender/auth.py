@@ -1,5 +1,6 @@
 """Authentication module for Microsoft Defender API."""
 import json
+import ssl
 import urllib.request
 import urllib.parse
 import logging
@@ -16,7 +17,6 @@ def get_access_token():
         str: Access token if successful, None otherwise
     """
     try:
-        import ssl
         context = ssl._create_unverified_context()
         
         url = OAUTH_TOKEN_ENDPOINT.format(tenant_id=TENANT_ID)
@@ -40,6 +40,6 @@ def get_access_token():
         return access_token
     
     except Exception as e:
-        logger.error(f"Failed to get access token: {e}")
+        logger.error("Failed to get access token: %s", e)
         return None
 
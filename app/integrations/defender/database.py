@@ -4,6 +4,8 @@ import mysql.connector
 from mysql.connector import Error
 from app.integrations.defender.config import DB_CONFIG
 from app.constants.database import (
+    CVE_COVERING_INDEX_COLUMNS,
+    DEVICE_NAME_REV_COLUMN,
     TABLE_VULNERABILITIES,
     TABLE_SYNC_STATE,
     TABLE_VULNERABILITY_SNAPSHOTS,
@@ -13,7 +15,9 @@ from app.constants.database import (
     TABLE_RAPID_VULNERABILITIES,
     TABLE_NUCLEI_VULNERABILITIES,
     TABLE_DEVICE_TAG_RULES,
+    TABLE_DEVICE_TAG_SUMMARY,
     TABLE_DEVICE_TAGS,
+    TABLE_CVE_SUMMARY,
 )
 
 logger = logging.getLogger(__name__)
@@ -48,7 +52,7 @@ def create_db_connection():
             logger.info("Successfully connected to MySQL database")
             return connection
     except Error as e:
-        logger.error(f"Database connection error: {e}")
+        logger.error("Database connection error: %s", e)
         return None
 
 
@@ -69,17 +73,17 @@ def migrate_database(connection):
         try:
             # Check if sync_state table exists
             cursor.execute(f"SELECT 1 FROM {TABLE_SYNC_STATE} LIMIT 1")
-            logger.info(f"{TABLE_SYNC_STATE} table exists, checking structure...")
+            logger.info("%s table exists, checking structure...", TABLE_SYNC_STATE)
             
             # Check if records_count column exists
             try:
                 cursor.execute(f"SELECT records_count FROM {TABLE_SYNC_STATE} LIMIT 1")
                 # Consume the result to avoid "Unread result found" error
                 cursor.fetchone()
-                logger.info(f"{TABLE_SYNC_STATE} table already has records_count column")
+                logger.info("%s table already has records_count column", TABLE_SYNC_STATE)
             except Error:
                 # Column doesn't exist, need to add it
-                logger.info(f"Adding records_count column to {TABLE_SYNC_STATE} table...")
+                logger.info("Adding records_count column to %s table...", TABLE_SYNC_STATE)
                 try:
                     cursor.execute(f"ALTER TABLE {TABLE_SYNC_STATE} ADD COLUMN records_count INT DEFAULT 0 AFTER sync_type")
                     connection.commit()
@@ -89,7 +93,7 @@ def migrate_database(connection):
                     if 'duplicate column' in error_msg or 'already exists' in error_msg:
                         logger.info("records_count column already exists, skipping")
                     else:
-                        logger.warning(f"Error adding records_count column: {e}")
+                        logger.warning("Error adding records_count column: %s", e)
                         connection.rollback()
             
             # Check if data_source column exists and remove it if present
@@ -98,7 +102,7 @@ def migrate_database(connection):
                 # Consume the result to avoid "Unread result found" error
                 cursor.fetchone()
                 # Column exists, need to remove it
-                logger.info(f"Removing data_source column from {TABLE_SYNC_STATE} table...")
+                logger.info("Removing data_source column from %s table...", TABLE_SYNC_STATE)
                 try:
                     cursor.execute(f"ALTER TABLE {TABLE_SYNC_STATE} DROP COLUMN data_source")
                     connection.commit()
@@ -108,7 +112,7 @@ def migrate_database(connection):
                     if 'doesn\'t exist' in error_msg or 'unknown column' in error_msg:
                         logger.info("data_source column doesn't exist, skipping")
                     else:
-                        logger.warning(f"Error removing data_source column: {e}")
+                        logger.warning("Error removing data_source column: %s", e)
                         connection.rollback()
             except Error:
                 # Column doesn't exist, that's fine
@@ -116,7 +120,7 @@ def migrate_database(connection):
                 
         except Error:
             # Table doesn't exist, will be created by initialize_database
-            logger.info(f"{TABLE_SYNC_STATE} table doesn't exist, will be created")
+            logger.info("%s table doesn't exist, will be created", TABLE_SYNC_STATE)
         
         # Migrate vulnerabilities table - add autopatch_covered field
         try:
@@ -124,17 +128,17 @@ def migrate_database(connection):
             cursor.execute(f"SELECT 1 FROM {TABLE_VULNERABILITIES} LIMIT 1")
             # Consume the result to avoid "Unread result found" error
             cursor.fetchone()
-            logger.info(f"{TABLE_VULNERABILITIES} table exists, checking for autopatch_covered column...")
+            logger.info("%s table exists, checking for autopatch_covered column...", TABLE_VULNERABILITIES)
             
             # Check if autopatch_covered column exists
             try:
                 cursor.execute(f"SELECT autopatch_covered FROM {TABLE_VULNERABILITIES} LIMIT 1")
                 # Consume the result to avoid "Unread result found" error
                 cursor.fetchone()
-                logger.info(f"{TABLE_VULNERABILITIES} table already has autopatch_covered column")
+                logger.info("%s table already has autopatch_covered column", TABLE_VULNERABILITIES)
             except Error:
                 # Column doesn't exist, need to add it
-                logger.info(f"Adding autopatch_covered column to {TABLE_VULNERABILITIES} table...")
+                logger.info("Adding autopatch_covered column to %s table...", TABLE_VULNERABILITIES)
                 try:
                     cursor.execute(f"ALTER TABLE {TABLE_VULNERABILITIES} ADD COLUMN autopatch_covered BOOLEAN DEFAULT FALSE AFTER recommendation_reference")
                     # Add index for better query performance
@@ -146,7 +150,7 @@ def migrate_database(connection):
                     if 'duplicate column' in error_msg or 'already exists' in error_msg or 'duplicate key' in error_msg:
                         logger.info("autopatch_covered column or index already exists, skipping")
                     else:
-                        logger.warning(f"Error adding autopatch_covered column: {e}")
+                        logger.warning("Error adding autopatch_covered column: %s", e)
                         connection.rollback()
 
             # Ensure cve_description column exists for caching NVD text
@@ -181,9 +185,9 @@ def migrate_database(connection):
                 try:
                     cursor.execute(f"SELECT {column_name} FROM {TABLE_VULNERABILITIES} LIMIT 1")
                     cursor.fetchone()
-                    logger.info(f"{TABLE_VULNERABILITIES} already has {column_name} column")
+                    logger.info("%s already has %s column", TABLE_VULNERABILITIES, column_name)
                 except Error:
-                    logger.info(f"Adding {column_name} column to {TABLE_VULNERABILITIES} table...")
+                    logger.info("Adding %s column to %s table...", column_name, TABLE_VULNERABILITIES)
                     try:
                         cursor.execute(
                             f"ALTER TABLE {TABLE_VULNERABILITIES} "
@@ -227,11 +231,99 @@ def migrate_database(connection):
                         logger.warning("Error adding device_tag column: %s", e)
                         connection.rollback()
 
+            # Ensure the reversed device name used by suffix tag rules exists
+            cursor.execute(f"SHOW COLUMNS FROM {TABLE_VULNERABILITIES} LIKE 'device_name_rev'")
+            if not cursor.fetchall():
+                logger.info("Adding device_name_rev column to %s table...", TABLE_VULNERABILITIES)
+                try:
+                    cursor.execute(
+                        f"ALTER TABLE {TABLE_VULNERABILITIES} "
+                        f"ADD COLUMN {DEVICE_NAME_REV_COLUMN} AFTER device_tag, "
+                        f"ADD INDEX idx_device_name_rev (device_name_rev)"
+                    )
+                    connection.commit()
+                    logger.info("Successfully added device_name_rev column and index")
+                except Error as e:
+                    error_msg = str(e).lower()
+                    if 'duplicate column' in error_msg or 'already exists' in error_msg or 'duplicate key' in error_msg:
+                        logger.info("device_name_rev column or index already exists, skipping")
+                    else:
+                        logger.warning("Error adding device_name_rev column: %s", e)
+                        connection.rollback()
+
+            # device_name filters match substrings with LIKE, so the FULLTEXT
+            # index earlier versions added only slowed every sync's bulk load.
+            cursor.execute(
+                f"SHOW INDEX FROM {TABLE_VULNERABILITIES} WHERE Key_name = %s",
+                ("ft_device_name",)
+            )
+            if cursor.fetchall():
+                logger.info("Dropping unused FULLTEXT index ft_device_name from %s...", TABLE_VULNERABILITIES)
+                try:
+                    cursor.execute(f"DROP INDEX ft_device_name ON {TABLE_VULNERABILITIES}")
+                    connection.commit()
+                except Error as e:
+                    logger.warning("Error dropping FULLTEXT index ft_device_name: %s", e)
+                    connection.rollback()
+
+            # Ensure FULLTEXT indexes backing the fulltext filter match mode exist
+            fulltext_indexes = [
+                ("ft_software_name", "software_name"),
+            ]
+            for index_name, column_name in fulltext_indexes:
+                cursor.execute(
+                    f"SHOW INDEX FROM {TABLE_VULNERABILITIES} WHERE Key_name = %s",
+                    (index_name,)
+                )
+                if cursor.fetchall():
+                    continue
+                logger.info("Adding FULLTEXT index %s to %s table...", index_name, TABLE_VULNERABILITIES)
+                try:
+                    cursor.execute(
+                        f"CREATE FULLTEXT INDEX {index_name} ON {TABLE_VULNERABILITIES}({column_name})"
+                    )
+                    connection.commit()
+                    logger.info("Successfully added FULLTEXT index %s", index_name)
+                except Error as e:
+                    error_msg = str(e).lower()
+                    if 'duplicate key' in error_msg or 'already exists' in error_msg:
+                        logger.info("FULLTEXT index %s already exists, skipping", index_name)
+                    else:
+                        logger.warning("Error adding FULLTEXT index %s: %s", index_name, e)
+                        connection.rollback()
+
+            # Ensure the per-CVE indexes used by CVE report lookups exist
+            cve_report_indexes = [
+                ("idx_cve_last_seen", "cve_id, last_seen_timestamp"),
+                ("idx_cve_covering", CVE_COVERING_INDEX_COLUMNS),
+            ]
+            for index_name, column_list in cve_report_indexes:
+                cursor.execute(
+                    f"SHOW INDEX FROM {TABLE_VULNERABILITIES} WHERE Key_name = %s",
+                    (index_name,)
+                )
+                if cursor.fetchall():
+                    continue
+                logger.info("Adding index %s to %s table...", index_name, TABLE_VULNERABILITIES)
+                try:
+                    cursor.execute(
+                        f"CREATE INDEX {index_name} ON {TABLE_VULNERABILITIES}({column_list})"
+                    )
+                    connection.commit()
+                    logger.info("Successfully added index %s", index_name)
+                except Error as e:
+                    error_msg = str(e).lower()
+                    if 'duplicate key' in error_msg or 'already exists' in error_msg:
+                        logger.info("Index %s already exists, skipping", index_name)
+                    else:
+                        logger.warning("Error adding index %s: %s", index_name, e)
+                        connection.rollback()
+
         except Error:
             # Table doesn't exist, will be created by initialize_database
-            logger.info(f"{TABLE_VULNERABILITIES} table doesn't exist, will be created")
+            logger.info("%s table doesn't exist, will be created", TABLE_VULNERABILITIES)
 
-        # Ensure rapid/nuclei tables exist before checking columns
+        # Ensure rapid/nuclei/tag-rule tables exist before checking columns
         threat_tables = {
             TABLE_RAPID_VULNERABILITIES: [
                 ("source_title", "source_title VARCHAR(255)"),
@@ -245,6 +337,13 @@ def migrate_database(connection):
                 ("source_severity", "source_severity VARCHAR(50)"),
                 ("source_cvss", "source_cvss FLOAT"),
             ],
+            # Pattern kind/anchor are classified from the LIKE pattern at seed
+            # time; NULL rows are backfilled by seed_default_rules and stale
+            # ones are rewritten by apply_device_tag_rules.
+            TABLE_DEVICE_TAG_RULES: [
+                ("kind", "kind ENUM('exact', 'prefix', 'suffix', 'substring', 'like') NULL AFTER pattern"),
+                ("anchor", "anchor VARCHAR(255) NULL AFTER kind"),
+            ],
         }
 
         for table_name, columns in threat_tables.items():
@@ -254,16 +353,16 @@ def migrate_database(connection):
                 _ensure_table_columns(cursor, table_name, columns)
                 connection.commit()
             except Error:
-                logger.info(f"{table_name} table doesn't exist yet, will be created during initialization")
+                logger.info("%s table doesn't exist yet, will be created during initialization", table_name)
         
         cursor.close()
         
     except Error as e:
-        logger.error(f"Database migration error: {e}")
+        logger.error("Database migration error: %s", e)
         if connection:
             connection.rollback()
     except Exception as e:
-        logger.error(f"Unknown error during database migration: {e}")
+        logger.error("Unknown error during database migration: %s", e)
         if connection:
             connection.rollback()
 
@@ -294,6 +393,7 @@ def initialize_database(connection):
             device_id VARCHAR(100),
             device_name VARCHAR(255),
             device_tag VARCHAR(50),
+            {DEVICE_NAME_REV_COLUMN},
             rbac_group_name VARCHAR(100),
             os_platform VARCHAR(50),
             os_version VARCHAR(50),
@@ -324,6 +424,8 @@ def initialize_database(connection):
             INDEX idx_cve_id (cve_id),
             INDEX idx_device_id (device_id),
             INDEX idx_cve_device (cve_id, device_id),
+            INDEX idx_cve_last_seen (cve_id, last_seen_timestamp),
+            INDEX idx_cve_covering ({CVE_COVERING_INDEX_COLUMNS}),
             INDEX idx_status (status),
             INDEX idx_severity (vulnerability_severity_level),
             INDEX idx_autopatch_covered (autopatch_covered),
@@ -331,8 +433,10 @@ def initialize_database(connection):
             INDEX idx_nuclei_detected (nuclei_detected),
             INDEX idx_recordfuture_detected (recordfuture_detected),
             INDEX idx_device_tag (device_tag),
+            INDEX idx_device_name_rev (device_name_rev),
             INDEX idx_last_seen (last_seen_timestamp),
-            INDEX idx_first_seen (first_seen_timestamp)
+            INDEX idx_first_seen (first_seen_timestamp),
+            FULLTEXT INDEX ft_software_name (software_name)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
         """
         
@@ -464,6 +568,8 @@ def initialize_database(connection):
             id INT AUTO_INCREMENT PRIMARY KEY,
             tag VARCHAR(50) NOT NULL,
             pattern VARCHAR(255) NOT NULL,
+            kind ENUM('exact', 'prefix', 'suffix', 'substring', 'like') NULL,
+            anchor VARCHAR(255) NULL,
             priority INT DEFAULT 100,
             enabled BOOLEAN DEFAULT TRUE,
             notes VARCHAR(255),
@@ -486,6 +592,27 @@ def initialize_database(connection):
             INDEX idx_tag (tag)
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
         """
+
+        # Per-tag device counts, rebuilt by apply_device_tag_rules
+        device_tag_summary_table = f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_DEVICE_TAG_SUMMARY} (
+            tag VARCHAR(50) PRIMARY KEY,
+            device_count INT NOT NULL DEFAULT 0,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """
+
+        # Per-CVE report aggregates, rebuilt after each sync
+        cve_summary_table = f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_CVE_SUMMARY} (
+            cve_id VARCHAR(50) PRIMARY KEY,
+            total_vulnerabilities INT DEFAULT 0,
+            total_devices INT DEFAULT 0,
+            os_distribution JSON,
+            department_distribution JSON,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """
         
         cursor.execute(vulnerabilities_table)
         cursor.execute(sync_state_table)
@@ -497,6 +624,8 @@ def initialize_database(connection):
         cursor.execute(nuclei_vulnerabilities_table)
         cursor.execute(device_tag_rules_table)
         cursor.execute(device_tags_table)
+        cursor.execute(device_tag_summary_table)
+        cursor.execute(cve_summary_table)
         
         connection.commit()
         try:
@@ -507,7 +636,7 @@ def initialize_database(connection):
         logger.info("Database table structure initialized successfully")
         
     except Error as e:
-        logger.error(f"Error initializing database: {e}")
+        logger.error("Error initializing database: %s", e)
         if connection:
             connection.rollback()
 
@@ -552,16 +681,18 @@ def drop_all_tables(connection):
             "defender_vulnerability_catalog",
             "device_tag_rules",
             "device_tags",
+            "device_tag_summary",
+            "cve_summary",
         ]
         
         # Drop tables one by one
         for table in old_tables_to_drop:
             try:
-                logger.info(f"Attempting to drop table: {table}")
+                logger.info("Attempting to drop table: %s", table)
                 cursor.execute(f"DROP TABLE IF EXISTS {table}")
-                logger.info(f"Successfully dropped table: {table}")
+                logger.info("Successfully dropped table: %s", table)
             except Error as e:
-                logger.warning(f"Error dropping table {table}: {e}")
+                logger.warning("Error dropping table %s: %s", table, e)
         
         # Re-enable foreign key checks
         cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
@@ -570,12 +701,12 @@ def drop_all_tables(connection):
         logger.info("All old tables dropped successfully")
         
     except Error as e:
-        logger.error(f"Error occurred while dropping tables: {e}")
+        logger.error("Error occurred while dropping tables: %s", e)
         if connection:
             connection.rollback()
         
     except Exception as e:
-        logger.error(f"Unknown error occurred while dropping tables: {e}")
+        logger.error("Unknown error occurred while dropping tables: %s", e)
         if connection:
             connection.rollback()
     finally:
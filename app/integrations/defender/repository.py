@@ -7,6 +7,8 @@ from mysql.connector import Error
 from app.integrations.defender.transformers import transform_severity
 from app.utils.datetime_parser import parse_device_vulnerability_timestamps
 from app.constants.database import (
+    CVE_COVERING_INDEX_COLUMNS,
+    DEVICE_NAME_REV_COLUMN,
     TABLE_VULNERABILITIES,
     TABLE_SYNC_STATE,
     TABLE_VULNERABILITY_SNAPSHOTS,
@@ -34,6 +36,13 @@ def _safe_float(value) -> Optional[float]:
         return None
 
 
+def _paths_json(value) -> str:
+    """Serialise evidence paths as a clean JSON string array for storage."""
+    if not isinstance(value, list):
+        value = [value] if value else []
+    return json.dumps([str(item).strip() for item in value if item is not None and str(item).strip()])
+
+
 def _safe_int(value) -> Optional[int]:
     """Safely convert numeric-like input to int."""
     try:
@@ -60,7 +69,7 @@ def get_sync_state_count(connection, sync_type: str) -> int:
         cursor.close()
         return result['count'] if result else 0
     except Error as e:
-        logger.error(f"Error getting sync state count: {e}")
+        logger.error("Error getting sync state count: %s", e)
         return 0
 
 
@@ -82,7 +91,7 @@ def get_last_sync_time_by_type(connection, sync_type: str) -> Optional[datetime.
         cursor.close()
         return result['last_time'] if result and result['last_time'] else None
     except Error as e:
-        logger.error(f"Error getting last sync time by type: {e}")
+        logger.error("Error getting last sync time by type: %s", e)
         return None
 
 
@@ -110,7 +119,7 @@ def get_last_sync_time(connection, sync_type: str = SYNC_TYPE_FULL) -> Optional[
             return None
             
     except Error as e:
-        logger.error(f"Error getting last sync time: {e}")
+        logger.error("Error getting last sync time: %s", e)
         return None
 
 
@@ -128,9 +137,9 @@ def update_sync_time(connection, sync_time: datetime.datetime, sync_type: str =
         query = f"INSERT INTO {TABLE_SYNC_STATE} (last_sync_time, sync_type, records_count) VALUES (%s, %s, %s)"
         cursor.execute(query, (sync_time, sync_type, records_count))
         connection.commit()
-        logger.info(f"Sync time updated successfully: {sync_time}, type: {sync_type}, records: {records_count}")
+        logger.info("Sync time updated successfully: %s, type: %s, records: %s", sync_time, sync_type, records_count)
     except Error as e:
-        logger.error(f"Error updating sync time: {e}")
+        logger.error("Error updating sync time: %s", e)
         connection.rollback()
 
 
@@ -152,7 +161,7 @@ def save_vulnerabilities(connection, vulnerabilities: List[Dict[str, Any]], is_d
         logger.warning("No vulnerabilities to save")
         return
     
-    logger.info(f"Starting to save {len(vulnerabilities)} vulnerability records...")
+    logger.info("Starting to save %s vulnerability records...", len(vulnerabilities))
     
     cursor = None
     temp_table_name = f"{TABLE_VULNERABILITIES}_temp"
@@ -167,13 +176,13 @@ def save_vulnerabilities(connection, vulnerabilities: List[Dict[str, Any]], is_d
             cursor.execute(f"SELECT 1 FROM {TABLE_VULNERABILITIES} LIMIT 1")
             # Consume the result to avoid "Unread result found" error
             cursor.fetchone()
-            logger.info(f"{TABLE_VULNERABILITIES} table exists")
+            logger.info("%s table exists", TABLE_VULNERABILITIES)
         except Error:
             # Table doesn't exist, need to create it first
-            logger.warning(f"{TABLE_VULNERABILITIES} table does not exist, creating it...")
+            logger.warning("%s table does not exist, creating it...", TABLE_VULNERABILITIES)
             from app.integrations.defender.database import initialize_database
             initialize_database(connection)
-            logger.info(f"{TABLE_VULNERABILITIES} table created successfully")
+            logger.info("%s table created successfully", TABLE_VULNERABILITIES)
         
         # Step 1: Create temporary table with same structure as vulnerabilities
         logger.info("Creating temporary table for data insertion...")
@@ -182,9 +191,9 @@ def save_vulnerabilities(connection, vulnerabilities: List[Dict[str, Any]], is_d
             CREATE TABLE IF NOT EXISTS {temp_table_name} LIKE {TABLE_VULNERABILITIES}
             """
             cursor.execute(create_temp_table_query)
-            logger.info(f"Temporary table {temp_table_name} created successfully")
+            logger.info("Temporary table %s created successfully", temp_table_name)
         except Error as e:
-            logger.error(f"Failed to create temporary table using LIKE: {e}")
+            logger.error("Failed to create temporary table using LIKE: %s", e)
             # Fallback: Create table with explicit structure
             logger.info("Attempting to create temporary table with explicit structure...")
             create_temp_table_query = f"""
@@ -193,6 +202,8 @@ def save_vulnerabilities(connection, vulnerabilities: List[Dict[str, Any]], is_d
                 cve_id VARCHAR(50),
                 device_id VARCHAR(100),
                 device_name VARCHAR(255),
+                device_tag VARCHAR(50),
+                {DEVICE_NAME_REV_COLUMN},
                 rbac_group_name VARCHAR(100),
                 os_platform VARCHAR(50),
                 os_version VARCHAR(50),
@@ -219,18 +230,23 @@ def save_vulnerabilities(connection, vulnerabilities: List[Dict[str, Any]], is_d
                 INDEX idx_cve_id (cve_id),
                 INDEX idx_device_id (device_id),
                 INDEX idx_cve_device (cve_id, device_id),
+                INDEX idx_cve_last_seen (cve_id, last_seen_timestamp),
+                INDEX idx_cve_covering ({CVE_COVERING_INDEX_COLUMNS}),
                 INDEX idx_status (status),
                 INDEX idx_severity (vulnerability_severity_level),
                 INDEX idx_autopatch_covered (autopatch_covered),
                 INDEX idx_last_seen (last_seen_timestamp),
-                INDEX idx_first_seen (first_seen_timestamp)
+                INDEX idx_first_seen (first_seen_timestamp),
+                INDEX idx_device_tag (device_tag),
+                INDEX idx_device_name_rev (device_name_rev),
+                FULLTEXT INDEX ft_software_name (software_name)
             ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
             """
             cursor.execute(create_temp_table_query)
-            logger.info(f"Temporary table {temp_table_name} created with explicit structure")
+            logger.info("Temporary table %s created with explicit structure", temp_table_name)
         
         # Step 2: Validate and prepare data for batch insert
-        logger.info(f"Validating and preparing {len(vulnerabilities)} records for batch insert...")
+        logger.info("Validating and preparing %s records for batch insert...", len(vulnerabilities))
         if len(vulnerabilities) == 0:
             logger.warning("No vulnerabilities to process after validation")
             return
@@ -239,14 +255,14 @@ def save_vulnerabilities(connection, vulnerabilities: List[Dict[str, Any]], is_d
         valid_count = 0
         for vuln in vulnerabilities:
             if not isinstance(vuln, dict):
-                logger.warning(f"Invalid vulnerability record (not a dict): {vuln}")
+                logger.warning("Invalid vulnerability record (not a dict): %s", vuln)
                 continue
             if 'id' not in vuln:
-                logger.warning(f"Vulnerability record missing 'id' field: {vuln}")
+                logger.warning("Vulnerability record missing 'id' field: %s", vuln)
                 continue
             valid_count += 1
         
-        logger.info(f"Validated {valid_count} out of {len(vulnerabilities)} records")
+        logger.info("Validated %s out of %s records", valid_count, len(vulnerabilities))
         if valid_count == 0:
             logger.error("No valid vulnerability records to save")
             return
@@ -279,8 +295,8 @@ def save_vulnerabilities(connection, vulnerabilities: List[Dict[str, Any]], is_d
             last_seen, first_seen, event_timestamp = parse_device_vulnerability_timestamps(vuln)
             
             # Convert disk paths and registry paths to JSON
-            disk_paths_json = json.dumps(vuln.get('diskPaths', [])) if 'diskPaths' in vuln else '[]'
-            registry_paths_json = json.dumps(vuln.get('registryPaths', [])) if 'registryPaths' in vuln else '[]'
+            disk_paths_json = _paths_json(vuln.get('diskPaths'))
+            registry_paths_json = _paths_json(vuln.get('registryPaths'))
             
             # Apply severity transformation
             transformed_severity = transform_severity(vuln.get('vulnerabilitySeverityLevel'))
@@ -319,14 +335,14 @@ def save_vulnerabilities(connection, vulnerabilities: List[Dict[str, Any]], is_d
             ))
         
         # Step 3: Batch insert data
-        logger.info(f"Inserting {len(batch_data)} records in batches of {batch_size}...")
+        logger.info("Inserting %s records in batches of %s...", len(batch_data), batch_size)
         for i in range(0, len(batch_data), batch_size):
             batch = batch_data[i:i + batch_size]
             cursor.executemany(insert_query, batch)
-            logger.info(f"Inserted batch {i // batch_size + 1} ({len(batch)} records)")
+            logger.info("Inserted batch %s (%s records)", i // batch_size + 1, len(batch))
         
         connection.commit()
-        logger.info(f"Successfully inserted {len(batch_data)} records into temporary table")
+        logger.info("Successfully inserted %s records into temporary table", len(batch_data))
         
         # Step 4: Atomically switch tables
         logger.info("Switching tables atomically...")
@@ -339,21 +355,21 @@ def save_vulnerabilities(connection, vulnerabilities: List[Dict[str, Any]], is_d
             cursor.fetchone()
             # Table exists, rename it
             cursor.execute(f"RENAME TABLE {TABLE_VULNERABILITIES} TO {old_table_name}")
-            logger.info(f"Renamed {TABLE_VULNERABILITIES} to {old_table_name}")
+            logger.info("Renamed %s to %s", TABLE_VULNERABILITIES, old_table_name)
         except Error:
             # Table doesn't exist, that's fine for first sync
-            logger.info(f"{TABLE_VULNERABILITIES} table doesn't exist, skipping rename")
+            logger.info("%s table doesn't exist, skipping rename", TABLE_VULNERABILITIES)
         
         # Rename temp table to main table
         cursor.execute(f"RENAME TABLE {temp_table_name} TO {TABLE_VULNERABILITIES}")
-        logger.info(f"Renamed {temp_table_name} to {TABLE_VULNERABILITIES}")
+        logger.info("Renamed %s to %s", temp_table_name, TABLE_VULNERABILITIES)
         
         # Drop old table if it exists
         try:
             cursor.execute(f"DROP TABLE IF EXISTS {old_table_name}")
-            logger.info(f"Dropped old table {old_table_name}")
+            logger.info("Dropped old table %s", old_table_name)
         except Error as e:
-            logger.warning(f"Error dropping old table: {e}")
+            logger.warning("Error dropping old table: %s", e)
         
         cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
         connection.commit()
@@ -364,43 +380,43 @@ def save_vulnerabilities(connection, vulnerabilities: List[Dict[str, Any]], is_d
         verify_cursor.execute(f"SELECT COUNT(*) as count FROM {TABLE_VULNERABILITIES}")
         saved_count = verify_cursor.fetchone()['count']
         verify_cursor.close()
-        logger.info(f"Verification: {saved_count} records found in {TABLE_VULNERABILITIES} table")
+        logger.info("Verification: %s records found in %s table", saved_count, TABLE_VULNERABILITIES)
         
         if saved_count == 0:
-            logger.error(f"CRITICAL: No records found in {TABLE_VULNERABILITIES} after save operation!")
+            logger.error("CRITICAL: No records found in %s after save operation!", TABLE_VULNERABILITIES)
             raise Exception(f"Data save verification failed: expected records but found 0")
         
         if saved_count != len(batch_data):
-            logger.warning(f"Record count mismatch: expected {len(batch_data)}, found {saved_count}")
+            logger.warning("Record count mismatch: expected %s, found %s", len(batch_data), saved_count)
         else:
-            logger.info(f"Data verification successful: {saved_count} records match expected count")
+            logger.info("Data verification successful: %s records match expected count", saved_count)
         
-        logger.info(f"Successfully saved {len(vulnerabilities)} vulnerability records using table switching method")
+        logger.info("Successfully saved %s vulnerability records using table switching method", len(vulnerabilities))
         
     except Error as e:
-        logger.error(f"Error saving vulnerability data: {e}", exc_info=True)
+        logger.error("Error saving vulnerability data: %s", e, exc_info=True)
         connection.rollback()
         
         # Clean up temp table on error
         try:
             if cursor:
                 cursor.execute(f"DROP TABLE IF EXISTS {temp_table_name}")
-                logger.info(f"Cleaned up temporary table {temp_table_name}")
+                logger.info("Cleaned up temporary table %s", temp_table_name)
         except Error as cleanup_error:
-            logger.warning(f"Error cleaning up temp table: {cleanup_error}")
+            logger.warning("Error cleaning up temp table: %s", cleanup_error)
         
         raise
     except Exception as e:
-        logger.error(f"Unknown error saving vulnerability data: {e}", exc_info=True)
+        logger.error("Unknown error saving vulnerability data: %s", e, exc_info=True)
         connection.rollback()
         
         # Clean up temp table on error
         try:
             if cursor:
                 cursor.execute(f"DROP TABLE IF EXISTS {temp_table_name}")
-                logger.info(f"Cleaned up temporary table {temp_table_name}")
+                logger.info("Cleaned up temporary table %s", temp_table_name)
         except Error as cleanup_error:
-            logger.warning(f"Error cleaning up temp table: {cleanup_error}")
+            logger.warning("Error cleaning up temp table: %s", cleanup_error)
         
         raise
     finally:
@@ -425,7 +441,7 @@ def get_last_snapshot(connection) -> Optional[int]:
         cursor.close()
         return result['id'] if result else None
     except Error as e:
-        logger.error(f"Error getting last snapshot: {e}")
+        logger.error("Error getting last snapshot: %s", e)
         return None
 
 
@@ -500,7 +516,7 @@ def record_snapshot(connection, snapshot_time: Optional[datetime.datetime] = Non
         cursor.execute(cve_device_query)
         cve_device_records = cursor.fetchall()
         
-        logger.info(f"Found {len(cve_device_records)} unique CVE-Device combinations after deduplication")
+        logger.info("Found %s unique CVE-Device combinations after deduplication", len(cve_device_records))
         
         # Batch insert CVE-Device snapshots using INSERT IGNORE to handle any remaining duplicates
         cve_device_snapshot_query = f"""
@@ -531,21 +547,21 @@ def record_snapshot(connection, snapshot_time: Optional[datetime.datetime] = Non
         for i in range(0, len(batch_data), batch_size):
             batch = batch_data[i:i + batch_size]
             cursor.executemany(cve_device_snapshot_query, batch)
-            logger.info(f"Inserted CVE-Device snapshot batch {i // batch_size + 1} ({len(batch)} records)")
+            logger.info("Inserted CVE-Device snapshot batch %s (%s records)", i // batch_size + 1, len(batch))
         
         connection.commit()
         cursor.close()
-        logger.info(f"Snapshot recorded successfully, snapshot ID: {snapshot_id}, CVE-Device records: {len(batch_data)}")
+        logger.info("Snapshot recorded successfully, snapshot ID: %s, CVE-Device records: %s", snapshot_id, len(batch_data))
         
         return snapshot_id
         
     except Error as e:
-        logger.error(f"Database error recording snapshot: {e}", exc_info=True)
+        logger.error("Database error recording snapshot: %s", e, exc_info=True)
         if connection:
             connection.rollback()
         return None
     except Exception as e:
-        logger.error(f"Unknown error recording snapshot: {e}", exc_info=True)
+        logger.error("Unknown error recording snapshot: %s", e, exc_info=True)
         if connection:
             connection.rollback()
         return None
@@ -569,12 +585,12 @@ def create_initial_snapshot(connection) -> Optional[int]:
         
         snapshot_id = record_snapshot(connection, is_initial=True)
         if snapshot_id:
-            logger.info(f"Initial snapshot created successfully, snapshot ID: {snapshot_id}")
+            logger.info("Initial snapshot created successfully, snapshot ID: %s", snapshot_id)
         else:
             logger.error("Initial snapshot creation failed: record_snapshot returned None")
         return snapshot_id
     except Exception as e:
-        logger.error(f"Exception occurred while creating initial snapshot: {e}", exc_info=True)
+        logger.error("Exception occurred while creating initial snapshot: %s", e, exc_info=True)
         if connection:
             connection.rollback()
         return None
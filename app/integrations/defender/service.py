@@ -56,19 +56,19 @@ class DefenderService:
             return []
         try:
             vulnerabilities = fetch_device_vulnerabilities(access_token)
-            logger.info(f"Successfully fetched {len(vulnerabilities)} vulnerability records")
+            logger.info("Successfully fetched %s vulnerability records", len(vulnerabilities))
             return vulnerabilities
         except Exception as e:
-            logger.error(f"Error fetching device vulnerabilities: {e}")
+            logger.error("Error fetching device vulnerabilities: %s", e)
             # Try refreshing token once
             access_token = self.refresh_access_token()
             if access_token:
                 try:
                     vulnerabilities = fetch_device_vulnerabilities(access_token)
-                    logger.info(f"Successfully fetched {len(vulnerabilities)} vulnerability records after token refresh")
+                    logger.info("Successfully fetched %s vulnerability records after token refresh", len(vulnerabilities))
                     return vulnerabilities
                 except Exception as retry_error:
-                    logger.error(f"Error fetching device vulnerabilities after token refresh: {retry_error}")
+                    logger.error("Error fetching device vulnerabilities after token refresh: %s", retry_error)
             return []
 
     def run_advanced_query(self, query: str) -> Optional[Dict[str, Any]]:
@@ -91,7 +91,7 @@ class DefenderService:
                 logger.info("Successfully executed advanced query")
             return result
         except Exception as e:
-            logger.error(f"Error running advanced query: {e}")
+            logger.error("Error running advanced query: %s", e)
             # Try refreshing token once
             access_token = self.refresh_access_token()
             if access_token:
@@ -101,7 +101,7 @@ class DefenderService:
                         logger.info("Successfully executed advanced query after token refresh")
                     return result
                 except Exception as retry_error:
-                    logger.error(f"Error running advanced query after token refresh: {retry_error}")
+                    logger.error("Error running advanced query after token refresh: %s", retry_error)
             return None
 
 
@@ -32,10 +32,10 @@ def sync_device_vulnerabilities_full(connection, access_token: Optional[str] = N
         logger.info("Fetching vulnerabilities from Microsoft Defender API...")
         vulnerabilities = service.fetch_device_vulnerabilities()
         
-        logger.info(f"API returned {len(vulnerabilities) if vulnerabilities else 0} vulnerability records")
+        logger.info("API returned %s vulnerability records", len(vulnerabilities) if vulnerabilities else 0)
         
         if vulnerabilities and len(vulnerabilities) > 0:
-            logger.info(f"Saving {len(vulnerabilities)} vulnerability records to database...")
+            logger.info("Saving %s vulnerability records to database...", len(vulnerabilities))
             save_vulnerabilities(connection, vulnerabilities, is_delta=False)
             
             # Verify data was saved
@@ -44,7 +44,7 @@ def sync_device_vulnerabilities_full(connection, access_token: Optional[str] = N
             saved_count = cursor.fetchone()['count']
             cursor.close()
             
-            logger.info(f"Database verification: {saved_count} records in database after save")
+            logger.info("Database verification: %s records in database after save", saved_count)
             
             if saved_count == 0:
                 raise Exception(f"CRITICAL: No records found in database after save operation! Expected {len(vulnerabilities)} records.")
@@ -55,20 +55,20 @@ def sync_device_vulnerabilities_full(connection, access_token: Optional[str] = N
             except Exception as tag_error:  # pragma: no cover - defensive logging
                 logger.warning("Device tag rule application failed: %s", tag_error, exc_info=True)
             
-            logger.info(f"Device vulnerability details full sync completed, fetched {len(vulnerabilities)} records, saved {saved_count} records")
+            logger.info("Device vulnerability details full sync completed, fetched %s records, saved %s records", len(vulnerabilities), saved_count)
             
             # Record sync time with record count
             current_time = datetime.datetime.now()
             update_sync_time(connection, current_time, sync_type=SYNC_TYPE_FULL, records_count=saved_count)
-            logger.info(f"Sync time recorded: {current_time}, records: {saved_count}")
+            logger.info("Sync time recorded: %s, records: %s", current_time, saved_count)
         else:
             logger.warning("No device vulnerability details data to sync (API returned empty or None)")
             # Still record sync time even if no data
             current_time = datetime.datetime.now()
             update_sync_time(connection, current_time, sync_type=SYNC_TYPE_FULL, records_count=0)
-            logger.info(f"Sync time recorded with 0 records: {current_time}")
+            logger.info("Sync time recorded with 0 records: %s", current_time)
     except Exception as e:
-        logger.error(f"Error syncing device vulnerability details: {e}", exc_info=True)
+        logger.error("Error syncing device vulnerability details: %s", e, exc_info=True)
         raise
 
 
@@ -92,13 +92,13 @@ def perform_full_sync(connection, access_token: Optional[str] = None):
         logger.info("Creating snapshot after sync...")
         snapshot_id = record_snapshot(connection)
         if snapshot_id:
-            logger.info(f"Snapshot created successfully with ID: {snapshot_id}")
+            logger.info("Snapshot created successfully with ID: %s", snapshot_id)
         else:
             logger.error("Failed to create snapshot after sync!")
             raise Exception("Snapshot creation failed after sync")
         logger.info("Full sync completed successfully")
     except Exception as e:
-        logger.error(f"Error during full sync: {e}")
+        logger.error("Error during full sync: %s", e)
         raise
 
 
@@ -124,7 +124,7 @@ def main():
         logger.info("Full sync process completed successfully")
     
     except Exception as e:
-        logger.error(f"CRITICAL ERROR occurred during sync: {e}", exc_info=True)
+        logger.error("CRITICAL ERROR occurred during sync: %s", e, exc_info=True)
         # Re-raise exception to ensure sync_service knows it failed
         raise
     
@@ -1,7 +1,8 @@
 """Repository helpers for integration integration settings and secrets."""
 import json
 import logging
-from typing import Any, Dict, Optional
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
 
 from app.constants.database import (
     TABLE_INTEGRATION_SECRET_VERSIONS,
@@ -10,13 +11,30 @@ from app.constants.database import (
 
 logger = logging.getLogger(__name__)
 
+# Column order for the hot single-row reads; rows are zipped against these
+# instead of going through the connector's dictionary cursor.
+_SETTING_COLS = (
+    "id", "provider", "metadata", "active_secret_version", "last_test_status",
+    "last_tested_at", "last_test_message", "created_at", "updated_at",
+)
+_SECRET_VERSION_COLS = ("id", "setting_id", "version", "ciphertext", "created_at")
+_SETTING_SELECT = ", ".join(_SETTING_COLS)
+_SECRET_VERSION_SELECT = ", ".join(_SECRET_VERSION_COLS)
+# Setting columns followed by those of its active secret version.
+_ACTIVE_SECRET_COLS = ("version", "ciphertext", "field_names", "created_at")
+_SETTING_WITH_SECRET_SQL = f"""
+    SELECT {", ".join(f"s.{column}" for column in _SETTING_COLS)},
+           {", ".join(f"v.{column}" for column in _ACTIVE_SECRET_COLS)}
+    FROM {TABLE_INTEGRATION_SETTINGS} s
+    LEFT JOIN {TABLE_INTEGRATION_SECRET_VERSIONS} v
+      ON v.setting_id = s.id AND v.version = s.active_secret_version
+    WHERE s.provider = %s
+"""
+
 
 def initialize_integration_settings_tables(connection) -> None:
     """Create tables required for integration settings if they do not exist."""
-    cursor = connection.cursor()
-    try:
-        cursor.execute(
-            f"""
+    settings_ddl = f"""
             CREATE TABLE IF NOT EXISTS {TABLE_INTEGRATION_SETTINGS} (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 provider VARCHAR(64) NOT NULL UNIQUE,
@@ -29,14 +47,13 @@ def initialize_integration_settings_tables(connection) -> None:
                 updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
             ) ENGINE=InnoDB
             """
-        )
-        cursor.execute(
-            f"""
+    secret_versions_ddl = f"""
             CREATE TABLE IF NOT EXISTS {TABLE_INTEGRATION_SECRET_VERSIONS} (
                 id INT AUTO_INCREMENT PRIMARY KEY,
                 setting_id INT NOT NULL,
                 version INT NOT NULL,
                 ciphertext LONGBLOB NOT NULL,
+                field_names JSON NULL,
                 created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
                 UNIQUE KEY uniq_setting_version (setting_id, version),
                 INDEX idx_setting_id (setting_id),
@@ -46,7 +63,24 @@ def initialize_integration_settings_tables(connection) -> None:
                     ON DELETE CASCADE
             ) ENGINE=InnoDB
             """
+    cursor = connection.cursor()
+    try:
+        # Send both statements in one round trip; the iterator must be drained
+        # so every result set is consumed before commit.
+        for _ in cursor.execute(
+            ";".join([settings_ddl, secret_versions_ddl]),
+            multi=True,
+        ):
+            pass
+        # Versions written before field_names existed keep NULL there.
+        cursor.execute(
+            f"SHOW COLUMNS FROM {TABLE_INTEGRATION_SECRET_VERSIONS} LIKE 'field_names'"
         )
+        if not cursor.fetchall():
+            cursor.execute(
+                f"ALTER TABLE {TABLE_INTEGRATION_SECRET_VERSIONS} "
+                f"ADD COLUMN field_names JSON NULL AFTER ciphertext"
+            )
         connection.commit()
     except Exception as exc:
         connection.rollback()
@@ -56,6 +90,22 @@ def initialize_integration_settings_tables(connection) -> None:
         cursor.close()
 
 
+@contextmanager
+def with_integration_tx(connection) -> Iterator[Any]:
+    """Run the enclosed repository writes as a single transaction.
+
+    The write helpers below never commit on their own, so grouping them here
+    costs one commit instead of one per statement.
+    """
+    connection.start_transaction()
+    try:
+        yield connection
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+
+
 def _parse_metadata(raw_value: Any) -> Dict[str, Any]:
     if not raw_value:
         return {}
@@ -69,12 +119,11 @@ def _parse_metadata(raw_value: Any) -> Dict[str, Any]:
 
 
 def get_setting_by_provider(connection, provider: str) -> Optional[Dict[str, Any]]:
-    cursor = connection.cursor(dictionary=True)
+    cursor = connection.cursor()
     try:
         cursor.execute(
             f"""
-            SELECT id, provider, metadata, active_secret_version, last_test_status,
-                   last_tested_at, last_test_message, created_at, updated_at
+            SELECT {_SETTING_SELECT}
             FROM {TABLE_INTEGRATION_SETTINGS}
             WHERE provider = %s
             """,
@@ -83,8 +132,43 @@ def get_setting_by_provider(connection, provider: str) -> Optional[Dict[str, Any
         row = cursor.fetchone()
         if not row:
             return None
-        row["metadata"] = _parse_metadata(row.get("metadata"))
-        return row
+        setting = dict(zip(_SETTING_COLS, row))
+        setting["metadata"] = _parse_metadata(setting.get("metadata"))
+        return setting
+    finally:
+        cursor.close()
+
+
+def _parse_field_names(raw_value: Any) -> List[str]:
+    if isinstance(raw_value, list):
+        return raw_value
+    try:
+        return list(json.loads(raw_value))
+    except (TypeError, json.JSONDecodeError):
+        logger.warning("Failed to parse secret field names, returning empty list")
+        return []
+
+
+def get_setting_with_active_secret(connection, provider: str) -> Optional[Dict[str, Any]]:
+    """Fetch a setting and its active secret version in one round trip.
+
+    The secret row, if any, is returned under ``"secret"`` with ``version``,
+    ``ciphertext``, ``field_names`` (None for legacy rows) and ``created_at``.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(_SETTING_WITH_SECRET_SQL, (provider,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        split = len(_SETTING_COLS)
+        setting = dict(zip(_SETTING_COLS, row[:split]))
+        setting["metadata"] = _parse_metadata(setting.get("metadata"))
+        secret = dict(zip(_ACTIVE_SECRET_COLS, row[split:]))
+        if secret["field_names"] is not None:
+            secret["field_names"] = _parse_field_names(secret["field_names"])
+        setting["secret"] = secret if secret["ciphertext"] is not None else None
+        return setting
     finally:
         cursor.close()
 
@@ -114,7 +198,17 @@ def upsert_setting(connection, provider: str, metadata: Dict[str, Any]) -> int:
         cursor.close()
 
 
-def create_secret_version(connection, setting_id: int, ciphertext: bytes) -> int:
+def create_secret_version(
+    connection,
+    setting_id: int,
+    ciphertext: Union[bytes, bytearray, memoryview],
+    field_names: Iterable[str] = (),
+) -> int:
+    """Store a new secret version; ``field_names`` lists the encrypted keys."""
+    # bytes/bytearray are bound as-is; mysql-connector has no memoryview
+    # converter, so only that case pays for a copy.
+    if isinstance(ciphertext, memoryview):
+        ciphertext = ciphertext.tobytes()
     cursor = connection.cursor()
     try:
         cursor.execute(
@@ -125,10 +219,10 @@ def create_secret_version(connection, setting_id: int, ciphertext: bytes) -> int
         next_version = int(current_max) + 1
         cursor.execute(
             f"""
-            INSERT INTO {TABLE_INTEGRATION_SECRET_VERSIONS} (setting_id, version, ciphertext)
-            VALUES (%s, %s, %s)
+            INSERT INTO {TABLE_INTEGRATION_SECRET_VERSIONS} (setting_id, version, ciphertext, field_names)
+            VALUES (%s, %s, %s, %s)
             """,
-            (setting_id, next_version, ciphertext),
+            (setting_id, next_version, ciphertext, json.dumps(sorted(field_names))),
         )
         return next_version
     finally:
@@ -151,13 +245,13 @@ def update_active_secret_version(connection, setting_id: int, version: int) -> N
 
 
 def get_secret_version(connection, setting_id: int, version: Optional[int] = None) -> Optional[Dict[str, Any]]:
-    cursor = connection.cursor(dictionary=True)
+    cursor = connection.cursor()
     try:
         params = (setting_id,)
         if version is None:
             cursor.execute(
                 f"""
-                SELECT id, setting_id, version, ciphertext, created_at
+                SELECT {_SECRET_VERSION_SELECT}
                 FROM {TABLE_INTEGRATION_SECRET_VERSIONS}
                 WHERE setting_id = %s
                 ORDER BY version DESC
@@ -168,13 +262,14 @@ def get_secret_version(connection, setting_id: int, version: Optional[int] = Non
         else:
             cursor.execute(
                 f"""
-                SELECT id, setting_id, version, ciphertext, created_at
+                SELECT {_SECRET_VERSION_SELECT}
                 FROM {TABLE_INTEGRATION_SECRET_VERSIONS}
                 WHERE setting_id = %s AND version = %s
                 """,
                 (setting_id, version),
             )
-        return cursor.fetchone()
+        row = cursor.fetchone()
+        return dict(zip(_SECRET_VERSION_COLS, row)) if row else None
     finally:
         cursor.close()
 
@@ -1,5 +1,7 @@
 """Simple query builder for reducing SQL string duplication."""
-from typing import Dict, List, Tuple, Any, Optional
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Tuple, Any, Optional
 
 from app.services.filter_registry import (
     FILTER_FIELD_DEFINITIONS,
@@ -61,6 +63,12 @@ DEVICE_VULNERABILITY_UPDATE_FIELDS = [
 ]
 
 
+@lru_cache(maxsize=64)
+def build_placeholders(count: int) -> str:
+    """Return a cached ``%s,%s,...`` placeholder list for ``count`` values."""
+    return ','.join(['%s'] * count)
+
+
 def build_insert_query(table_name: str, fields: List[str]) -> str:
     """Build INSERT query string.
     
@@ -72,7 +80,7 @@ def build_insert_query(table_name: str, fields: List[str]) -> str:
         str: INSERT query string
     """
     fields_str = ', '.join(fields)
-    placeholders = ', '.join(['%s'] * len(fields))
+    placeholders = build_placeholders(len(fields))
     return f"INSERT INTO {table_name} ({fields_str}) VALUES ({placeholders})"
 
 
@@ -107,7 +115,7 @@ def build_upsert_query(table_name: str, insert_fields: List[str], update_fields:
         update_fields = [f for f in insert_fields if f not in ('id', 'last_updated')]
     
     fields_str = ', '.join(insert_fields)
-    placeholders = ', '.join(['%s'] * len(insert_fields))
+    placeholders = build_placeholders(len(insert_fields))
     update_clause = ', '.join([f"{field} = VALUES({field})" for field in update_fields])
     
     return f"""
@@ -131,118 +139,237 @@ def extract_device_vulnerability_values(vuln: Dict[str, Any], field_mapping: Dic
     return {}
 
 
+THREAT_INTEL_COLUMNS = {
+    'metasploit': 'metasploit_detected',
+    'nuclei': 'nuclei_detected',
+    'recordfuture': 'recordfuture_detected',
+}
+
+# Boolean-mode operators and word separators are dropped from search terms
+_FULLTEXT_TERM_SPLIT = re.compile(r"[^\w]+")
+# innodb_ft_min_token_size default; shorter words are never indexed, so a
+# required term below it would make the MATCH return no rows at all.
+FULLTEXT_MIN_TOKEN_SIZE = 3
+
+# Shape entries are (kind, key, arity) tuples; kind selects the definition table.
+FilterShape = Tuple[Tuple[str, str, Any], ...]
+
+# Turns a raw request value into clause parameters; empty means "filter inactive".
+ParamExtractor = Callable[[Any], List[Any]]
+
+
 def build_vulnerability_filters(
     filters: Optional[Dict[str, Any]] = None,
     vuln_id: Optional[str] = None,
     table_alias: str = ""
 ) -> Tuple[str, List[Any]]:
-    """Build WHERE clause and parameters for vulnerability queries."""
-    where_clauses: List[str] = []
-    params: List[Any] = []
+    """Build WHERE clause and parameters for vulnerability queries.
 
-    def qualify(column: str) -> str:
-        return f"{table_alias}.{column}" if table_alias else column
+    Only the parameters are collected per call; the SQL text is compiled once
+    per filter shape (active keys and list lengths) and served from a cache.
+    """
+    shape: List[Tuple[str, str, Any]] = []
+    params: List[Any] = []
 
     if vuln_id:
-        where_clauses.append(f"{qualify('id')} = %s")
         params.append(vuln_id)
 
     if filters:
-        threat_intel_filter = filters.get('threat_intel')
-
-        for field, definition in FILTER_FIELD_DEFINITIONS.items():
-            raw_value = filters.get(field)
-            clause, clause_params = _build_field_clause(definition, raw_value, qualify)
-            if clause:
-                where_clauses.append(clause)
-                params.extend(clause_params)
-
-        if threat_intel_filter:
-            threat_values = (
-                threat_intel_filter
-                if isinstance(threat_intel_filter, list)
-                else [threat_intel_filter]
-            )
-            mapping = {
-                'metasploit': 'metasploit_detected',
-                'nuclei': 'nuclei_detected',
-                'recordfuture': 'recordfuture_detected',
-            }
-            conditions = []
-            for raw_value in threat_values:
-                if not raw_value:
-                    continue
-                column = mapping.get(str(raw_value).lower())
-                if column:
-                    conditions.append(f"{qualify(column)} = TRUE")
-            if conditions:
-                where_clauses.append("(" + " OR ".join(conditions) + ")")
-
-        for field, definition in RANGE_FILTER_DEFINITIONS.items():
+        for field, extract, fallback in _FIELD_EXTRACTORS:
             raw_value = filters.get(field)
-            clause, clause_params = _build_range_clause(definition, raw_value, qualify)
-            if clause:
-                where_clauses.append(clause)
-                params.extend(clause_params)
+            values = extract(raw_value)
+            kind = 'field'
+            if not values and fallback:
+                values = fallback(raw_value)
+                kind = 'field_like'
+            if values:
+                shape.append((kind, field, len(values)))
+                params.extend(values)
+
+        threat_columns = _extract_threat_intel_columns(filters.get('threat_intel'))
+        if threat_columns:
+            shape.append(('threat_intel', 'threat_intel', threat_columns))
+
+        for field, extract in _RANGE_EXTRACTORS:
+            values = extract(filters.get(field))
+            if values:
+                shape.append(('range', field, 1))
+                params.extend(values)
+
+        for field in DATE_FILTER_DEFINITIONS:
+            values = _extract_date_params(filters.get(field))
+            if values:
+                shape.append(('date', field, 1))
+                params.extend(values)
+
+    where_sql = _compile_where_sql(bool(vuln_id), tuple(shape), table_alias)
+    return where_sql, params
 
-        for field, definition in DATE_FILTER_DEFINITIONS.items():
-            raw_value = filters.get(field)
-            clause, clause_params = _build_date_clause(definition, raw_value, qualify)
-            if clause:
-                where_clauses.append(clause)
-                params.extend(clause_params)
 
-    where_sql = " AND ".join(where_clauses) if where_clauses else "1=1"
-    return where_sql, params
+def build_keyset_clause(cursor_after: Optional[Tuple[Any, Any, str]]) -> Tuple[str, List[Any]]:
+    """Build the HAVING predicate that resumes the CVE listing after a cursor.
 
+    The cursor is the (sort_cvss, sort_seen, cve_id) of the last row served and
+    mirrors ``ORDER BY sort_cvss DESC, sort_seen DESC, cve_id ASC``.
+    """
+    if not cursor_after:
+        return "", []
+    cvss, seen, cve_id = cursor_after
+    clause = (
+        "HAVING (sort_cvss < %s OR (sort_cvss = %s AND "
+        "(sort_seen < %s OR (sort_seen = %s AND v.cve_id > %s))))"
+    )
+    return clause, [cvss, cvss, seen, seen, cve_id]
+
+
+@lru_cache(maxsize=512)
+def _compile_where_sql(has_vuln_id: bool, shape: FilterShape, table_alias: str) -> str:
+    """Render the WHERE template for a filter shape."""
+    def qualify(column: str) -> str:
+        return f"{table_alias}.{column}" if table_alias else column
+
+    where_clauses: List[str] = []
+    if has_vuln_id:
+        where_clauses.append(f"{qualify('id')} = %s")
 
-def _build_field_clause(definition: Dict[str, Any], raw_value: Any, qualify) -> Tuple[Optional[str], List[Any]]:
+    for kind, key, arity in shape:
+        if kind == 'field':
+            where_clauses.append(_render_field_clause(FILTER_FIELD_DEFINITIONS[key], arity, qualify))
+        elif kind == 'field_like':
+            where_clauses.append(f"{qualify(FILTER_FIELD_DEFINITIONS[key]['column'])} LIKE %s")
+        elif kind == 'threat_intel':
+            conditions = [f"{qualify(column)} = TRUE" for column in arity]
+            where_clauses.append("(" + " OR ".join(conditions) + ")")
+        elif kind == 'range':
+            definition = RANGE_FILTER_DEFINITIONS[key]
+            where_clauses.append(f"{qualify(definition['column'])} {definition['operator']} %s")
+        elif kind == 'date':
+            definition = DATE_FILTER_DEFINITIONS[key]
+            where_clauses.append(f"{qualify(definition['column'])} {definition['operator']} %s")
+
+    return " AND ".join(where_clauses) if where_clauses else "1=1"
+
+
+def _render_field_clause(definition: Dict[str, Any], arity: int, qualify) -> str:
     strategy = definition.get('strategy', 'contains')
     column = qualify(definition['column'])
+    if strategy == 'in':
+        return f"{column} IN ({build_placeholders(arity)})"
+    if strategy in ('boolean', 'equals'):
+        return f"{column} = %s"
+    if definition.get('match_mode') == 'fulltext':
+        return f"MATCH({column}) AGAINST (%s IN BOOLEAN MODE)"
+    return f"{column} LIKE %s"
+
+
+def _compile_field_extractor(definition: Dict[str, Any]) -> ParamExtractor:
+    """Specialize parameter extraction for one field definition."""
+    strategy = definition.get('strategy', 'contains')
 
     if strategy == 'in':
-        values = normalize_list(raw_value)
-        if not values:
-            return None, []
-        placeholders = ','.join(['%s'] * len(values))
-        return f"{column} IN ({placeholders})", values
+        return normalize_list
 
     if strategy == 'boolean':
-        parsed = parse_boolean(raw_value)
-        if parsed is None:
-            return None, []
-        return f"{column} = %s", [parsed]
+        def extract_boolean(raw_value: Any) -> List[Any]:
+            parsed = parse_boolean(raw_value)
+            return [] if parsed is None else [parsed]
+        return extract_boolean
 
-    if isinstance(raw_value, str):
-        value = raw_value.strip()
-    else:
-        value = raw_value
+    if strategy == 'equals':
+        def extract_equals(raw_value: Any) -> List[Any]:
+            value = _clean_text(raw_value)
+            return [value] if value else []
+        return extract_equals
 
-    if not value:
-        return None, []
+    match_mode = definition.get('match_mode', 'contains')
+    return _compile_text_extractor(match_mode)
 
-    if strategy == 'equals':
-        return f"{column} = %s", [value]
 
-    return f"{column} LIKE %s", [f"%{value}%"]
+def _compile_text_extractor(match_mode: str) -> ParamExtractor:
+    if match_mode == 'fulltext':
+        def extract_fulltext(raw_value: Any) -> List[Any]:
+            value = _clean_text(raw_value)
+            search = _build_fulltext_search(str(value)) if value else ''
+            return [search] if search else []
+        return extract_fulltext
+
+    if match_mode == 'prefix':
+        def extract_prefix(raw_value: Any) -> List[Any]:
+            value = _clean_text(raw_value)
+            return [f"{value}%"] if value else []
+        return extract_prefix
 
+    def extract_contains(raw_value: Any) -> List[Any]:
+        value = _clean_text(raw_value)
+        return [f"%{value}%"] if value else []
+    return extract_contains
 
-def _build_range_clause(definition: Dict[str, Any], raw_value: Any, qualify) -> Tuple[Optional[str], List[Any]]:
-    if raw_value in (None, ''):
-        return None, []
+
+def _clean_text(raw_value: Any) -> Any:
+    return raw_value.strip() if isinstance(raw_value, str) else raw_value
+
+
+def _build_fulltext_search(value: str) -> str:
+    """Turn free text into a boolean-mode query requiring every word as a prefix.
+
+    Words shorter than ``FULLTEXT_MIN_TOKEN_SIZE`` are dropped; an empty result
+    means the caller should fall back to a LIKE search.
+    """
+    terms = _FULLTEXT_TERM_SPLIT.split(value)
+    return " ".join(f"+{term}*" for term in terms if len(term) >= FULLTEXT_MIN_TOKEN_SIZE)
+
+
+def _extract_threat_intel_columns(threat_intel_filter: Any) -> Tuple[str, ...]:
+    if not threat_intel_filter:
+        return ()
+    threat_values = (
+        threat_intel_filter
+        if isinstance(threat_intel_filter, list)
+        else [threat_intel_filter]
+    )
+    columns = []
+    for raw_value in threat_values:
+        if not raw_value:
+            continue
+        column = THREAT_INTEL_COLUMNS.get(str(raw_value).lower())
+        if column:
+            columns.append(column)
+    return tuple(columns)
+
+
+def _compile_range_extractor(definition: Dict[str, Any]) -> ParamExtractor:
+    """Specialize numeric range parsing for one range definition."""
     caster = definition.get('cast')
-    try:
-        value = caster(raw_value) if caster else raw_value
-    except (TypeError, ValueError):
-        return None, []
-    column = qualify(definition['column'])
-    operator = definition['operator']
-    return f"{column} {operator} %s", [value]
+
+    def extract_range(raw_value: Any) -> List[Any]:
+        if raw_value in (None, ''):
+            return []
+        try:
+            value = caster(raw_value) if caster else raw_value
+        except (TypeError, ValueError):
+            return []
+        return [value]
+    return extract_range
 
 
-def _build_date_clause(definition: Dict[str, Any], raw_value: Any, qualify) -> Tuple[Optional[str], List[Any]]:
+def _extract_date_params(raw_value: Any) -> List[Any]:
     if not raw_value:
-        return None, []
-    column = qualify(definition['column'])
-    operator = definition['operator']
-    return f"{column} {operator} %s", [raw_value]
+        return []
+    return [raw_value]
+
+
+# Per-filter extractors compiled once at import so the request path does not
+# re-branch on strategy / match_mode for every filter.
+# Fulltext fields carry a contains extractor used when no term is indexable.
+_FIELD_EXTRACTORS: Tuple[Tuple[str, ParamExtractor, Optional[ParamExtractor]], ...] = tuple(
+    (
+        field,
+        _compile_field_extractor(definition),
+        _compile_text_extractor('contains') if definition.get('match_mode') == 'fulltext' else None,
+    )
+    for field, definition in FILTER_FIELD_DEFINITIONS.items()
+)
+_RANGE_EXTRACTORS: Tuple[Tuple[str, ParamExtractor], ...] = tuple(
+    (field, _compile_range_extractor(definition))
+    for field, definition in RANGE_FILTER_DEFINITIONS.items()
+)
@@ -7,9 +7,15 @@ from app.constants.database import TABLE_RECORDFUTURE_INDICATORS
 
 logger = logging.getLogger(__name__)
 
+# Set once the DDL has succeeded so per-request callers skip the round trip.
+_table_initialized = False
+
 
 def initialize_recordfuture_table(connection) -> None:
     """Ensure the RecordFuture table exists before writes."""
+    global _table_initialized
+    if _table_initialized:
+        return
     cursor = connection.cursor()
     try:
         cursor.execute(
@@ -27,6 +33,7 @@ def initialize_recordfuture_table(connection) -> None:
             """
         )
         connection.commit()
+        _table_initialized = True
     except Exception as exc:
         connection.rollback()
         logger.error("Failed to initialize RecordFuture table: %s", exc)
@@ -36,7 +43,12 @@ def initialize_recordfuture_table(connection) -> None:
 
 
 def bulk_upsert_indicators(connection, indicators: List[Dict]) -> int:
-    """Insert or update a list of indicators."""
+    """Insert or update a list of indicators.
+
+    Returns the number of indicators submitted. MySQL's rowcount for
+    ``ON DUPLICATE KEY UPDATE`` counts updated rows twice and unchanged rows
+    as zero, so it is not a meaningful "rows saved" figure here.
+    """
     if not indicators:
         return 0
 
@@ -65,7 +77,7 @@ def bulk_upsert_indicators(connection, indicators: List[Dict]) -> int:
             payload,
         )
         connection.commit()
-        return cursor.rowcount
+        return len(payload)
     except Exception as exc:
         connection.rollback()
         logger.error("Failed to upsert RecordFuture indicators: %s", exc)
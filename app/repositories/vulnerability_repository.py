@@ -1,20 +1,152 @@
 """Repository functions for vulnerability data access."""
 from typing import Any, Dict, List, Optional, Tuple
 
-from app.repositories.query_builder import build_vulnerability_filters
-from app.constants.database import TABLE_VULNERABILITIES
+import orjson
+
+from app.repositories.query_builder import (
+    build_keyset_clause,
+    build_placeholders,
+    build_vulnerability_filters,
+)
+from app.constants.database import TABLE_CVE_SUMMARY, TABLE_VULNERABILITIES
+
+# Device grouping key for CVE reports: device_id, then device_name, then the
+# row id for rows that carry neither.
+_DEVICE_KEY_SQL = "COALESCE(NULLIF({a}device_id, ''), NULLIF({a}device_name, ''), CONCAT('unknown-', {a}id))"
+
+_PATH_COLUMNS = ('disk_paths', 'registry_paths')
+
+# Which row of a CVE counts as its latest (severity, CVSS, remediation). The
+# single-CVE report and the bulk summaries share it, so both pick the same row.
+_LATEST_ROW_ORDER = "last_seen_timestamp DESC, id DESC"
+
+# The CVE report queries only vary in their bound parameters, so their SQL
+# text is rendered once at import rather than on every request.
+_CVE_DEVICE_COLUMNS = """
+    v.device_id,
+    v.device_name,
+    v.rbac_group_name,
+    v.os_platform,
+    v.os_version,
+    v.status,
+    v.disk_paths,
+    v.registry_paths"""
+_V_DEVICE_KEY_SQL = _DEVICE_KEY_SQL.format(a='v.')
+_CVE_DEVICE_ROWS_SQL = f"""
+SELECT {_CVE_DEVICE_COLUMNS},
+    {_V_DEVICE_KEY_SQL} AS device_key
+FROM {TABLE_VULNERABILITIES} v
+WHERE v.cve_id = %s
+ORDER BY v.last_seen_timestamp DESC
+"""
+_CVE_TOP_DEVICE_ROWS_SQL = f"""
+SELECT {_CVE_DEVICE_COLUMNS},
+    d.device_key
+FROM {TABLE_VULNERABILITIES} v
+JOIN (
+    SELECT {_V_DEVICE_KEY_SQL} AS device_key, MAX(v.last_seen_timestamp) AS latest_seen
+    FROM {TABLE_VULNERABILITIES} v
+    WHERE v.cve_id = %s
+    GROUP BY device_key
+    ORDER BY latest_seen DESC
+    LIMIT %s
+) d ON d.device_key = {_V_DEVICE_KEY_SQL}
+WHERE v.cve_id = %s
+ORDER BY d.latest_seen DESC, v.last_seen_timestamp DESC
+"""
+_CVE_REPORT_TOTALS_SQL = f"""
+SELECT
+    COUNT(*) AS total_vulnerabilities,
+    COUNT(DISTINCT {_DEVICE_KEY_SQL.format(a='')}) AS total_devices
+FROM {TABLE_VULNERABILITIES}
+WHERE cve_id = %s
+"""
+
+# Rebuilds every CVE's totals and OS/RBAC distributions in one statement, using
+# the same bucketing as get_cve_distribution_buckets.
+_DISTRIBUTION_SQL = """
+    SELECT cve_id, JSON_OBJECTAGG(bucket, bucket_count) AS distribution
+    FROM (
+        SELECT cve_id, COALESCE(NULLIF(TRIM({column}), ''), 'Unknown') AS bucket, COUNT(*) AS bucket_count
+        FROM {table}
+        GROUP BY 1, 2
+    ) b
+    GROUP BY cve_id"""
+_REFRESH_CVE_SUMMARY_SQL = f"""
+INSERT INTO {TABLE_CVE_SUMMARY}
+    (cve_id, total_vulnerabilities, total_devices, os_distribution, department_distribution)
+SELECT t.cve_id, t.total_vulnerabilities, t.total_devices, os.distribution, dept.distribution
+FROM (
+    SELECT
+        cve_id,
+        COUNT(*) AS total_vulnerabilities,
+        COUNT(DISTINCT {_DEVICE_KEY_SQL.format(a='')}) AS total_devices
+    FROM {TABLE_VULNERABILITIES}
+    WHERE cve_id IS NOT NULL
+    GROUP BY cve_id
+) t
+JOIN ({_DISTRIBUTION_SQL.format(column='os_platform', table=TABLE_VULNERABILITIES)}) os ON os.cve_id = t.cve_id
+JOIN ({_DISTRIBUTION_SQL.format(column='rbac_group_name', table=TABLE_VULNERABILITIES)}) dept ON dept.cve_id = t.cve_id
+"""
+
+
+def _decode_path_columns(rows: List[Dict]) -> List[Dict]:
+    """Turn the JSON path columns into lists as rows leave the repository.
+
+    The sync stores clean string arrays, so callers receive lists and never
+    re-parse them; anything undecodable degrades to an empty list.
+    """
+    for row in rows:
+        for column in _PATH_COLUMNS:
+            raw_value = row.get(column)
+            if isinstance(raw_value, list):
+                continue
+            try:
+                value = orjson.loads(raw_value) if raw_value else []
+            except orjson.JSONDecodeError:
+                value = []
+            row[column] = value if isinstance(value, list) else []
+    return rows
+
+
+def count_vulnerabilities(connection, filters=None, vuln_id: Optional[str] = None) -> int:
+    """Count distinct CVEs matching the list filters."""
+    cursor = connection.cursor(dictionary=True)
+    try:
+        where_sql, params = build_vulnerability_filters(filters, vuln_id, table_alias="v")
+        cursor.execute(
+            f"SELECT COUNT(DISTINCT v.cve_id) as total FROM {TABLE_VULNERABILITIES} v WHERE {where_sql}",
+            params,
+        )
+        return cursor.fetchone()['total']
+    finally:
+        cursor.close()
 
 
-def get_vulnerabilities(connection, filters=None, page: int = 1, per_page: int = 50, vuln_id: Optional[str] = None) -> Tuple[List[Dict], int]:
-    """Fetch CVE-level vulnerability summaries with filters and pagination."""
+def get_vulnerabilities(
+    connection,
+    filters=None,
+    page: int = 1,
+    per_page: int = 50,
+    vuln_id: Optional[str] = None,
+    cursor_after: Optional[Tuple[Any, Any, str]] = None,
+    total: Optional[int] = None,
+) -> Tuple[List[Dict], int]:
+    """Fetch CVE-level vulnerability summaries with filters and pagination.
+
+    When ``cursor_after`` is given the page is resumed with a keyset predicate
+    on the sort keys instead of an OFFSET skip. Rows carry ``sort_cvss`` and
+    ``sort_seen`` so callers can build the next cursor. A known ``total``
+    skips the count query.
+    """
+    if total is None:
+        total = count_vulnerabilities(connection, filters, vuln_id)
     cursor = connection.cursor(dictionary=True)
     try:
         where_sql, params = build_vulnerability_filters(filters, vuln_id, table_alias="v")
-        count_query = f"SELECT COUNT(DISTINCT v.cve_id) as total FROM {TABLE_VULNERABILITIES} v WHERE {where_sql}"
-        cursor.execute(count_query, params.copy())
-        total = cursor.fetchone()['total']
 
-        offset = (page - 1) * per_page
+        having_sql, having_params = build_keyset_clause(cursor_after)
+        offset = 0 if cursor_after else (page - 1) * per_page
         summary_query = f"""
         SELECT
             MIN(v.id) AS id,
@@ -32,14 +164,18 @@ def get_vulnerabilities(connection, filters=None, page: int = 1, per_page: int =
             SUM(CASE WHEN COALESCE(v.nuclei_detected, 0) = 1 THEN 1 ELSE 0 END) > 0 AS nuclei_detected,
             SUM(CASE WHEN COALESCE(v.recordfuture_detected, 0) = 1 THEN 1 ELSE 0 END) > 0 AS recordfuture_detected,
             COUNT(DISTINCT v.device_id) AS affected_devices,
-            MAX(v.last_seen_timestamp) AS last_seen_timestamp
+            MAX(v.last_seen_timestamp) AS last_seen_timestamp,
+            CAST(COALESCE(MAX(v.cvss_score), -1) AS DECIMAL(4,1)) AS sort_cvss,
+            COALESCE(MAX(v.last_seen_timestamp), TIMESTAMP('1970-01-01')) AS sort_seen
         FROM {TABLE_VULNERABILITIES} v
         WHERE {where_sql}
         GROUP BY v.cve_id
-        ORDER BY MAX(v.cvss_score) DESC, MAX(v.last_seen_timestamp) DESC
+        {having_sql}
+        ORDER BY sort_cvss DESC, sort_seen DESC, v.cve_id ASC
         LIMIT %s OFFSET %s
         """
         data_params = params.copy()
+        data_params.extend(having_params)
         data_params.extend([per_page, offset])
         cursor.execute(summary_query, data_params)
         records = cursor.fetchall()
@@ -480,25 +616,131 @@ def get_devices_for_cve(connection, cve_id: str) -> List[Dict]:
         cursor.close()
 
 
-def get_vulnerabilities_by_cve(connection, cve_id: str) -> List[Dict]:
-    """Fetch raw vulnerability rows for a CVE."""
+def get_cve_report_totals(connection, cve_id: str) -> Dict:
+    """Count vulnerability rows and distinct devices for a CVE."""
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(_CVE_REPORT_TOTALS_SQL, (cve_id,))
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def refresh_cve_summaries(connection) -> int:
+    """Rebuild the cve_summary table from the vulnerabilities table.
+
+    Runs as one transaction, so readers keep seeing the previous summaries
+    until the new ones are committed. Returns the number of CVEs written.
+    """
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"DELETE FROM {TABLE_CVE_SUMMARY}")
+        cursor.execute(_REFRESH_CVE_SUMMARY_SQL)
+        written = cursor.rowcount
+        connection.commit()
+        return written
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def get_cve_summary(connection, cve_id: str) -> Optional[Dict]:
+    """Fetch the precomputed report aggregates of a CVE, if materialised."""
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"""
+            SELECT total_vulnerabilities, total_devices, os_distribution, department_distribution
+            FROM {TABLE_CVE_SUMMARY}
+            WHERE cve_id = %s
+            """,
+            (cve_id,)
+        )
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+    return _decode_summary_row(row) if row else None
+
+
+def get_cve_summaries(connection, cve_ids: List[str]) -> Dict[str, Dict]:
+    """Fetch materialised aggregates plus CVSS/severity for several CVEs at once.
+
+    CVSS and severity come from each CVE's latest row, as in the single-CVE
+    report. CVEs without vulnerability rows are absent from the result; CVEs
+    that have rows but no summary yet carry ``None`` aggregates.
+    """
+    if not cve_ids:
+        return {}
+    placeholders = build_placeholders(len(cve_ids))
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"""
+            SELECT
+                v.cve_id,
+                v.cvss_score,
+                v.severity,
+                s.total_vulnerabilities,
+                s.total_devices,
+                s.os_distribution,
+                s.department_distribution
+            FROM (
+                SELECT
+                    cve_id,
+                    cvss_score,
+                    vulnerability_severity_level AS severity,
+                    ROW_NUMBER() OVER (PARTITION BY cve_id ORDER BY {_LATEST_ROW_ORDER}) AS row_rank
+                FROM {TABLE_VULNERABILITIES}
+                WHERE cve_id IN ({placeholders})
+            ) v
+            LEFT JOIN {TABLE_CVE_SUMMARY} s ON s.cve_id = v.cve_id
+            WHERE v.row_rank = 1
+            """,
+            tuple(cve_ids)
+        )
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+    return {row['cve_id']: _decode_summary_row(row) for row in rows}
+
+
+def _decode_summary_row(row: Dict) -> Dict:
+    for column in ('os_distribution', 'department_distribution'):
+        raw_value = row.get(column)
+        row[column] = orjson.loads(raw_value) if raw_value else None
+    return row
+
+
+def get_cve_distribution_buckets(connection, cve_id: str) -> List[Dict]:
+    """Count a CVE's rows per (OS platform, RBAC group) pair."""
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute(
+            f"""
+            SELECT
+                COALESCE(NULLIF(TRIM(os_platform), ''), 'Unknown') AS os_platform,
+                COALESCE(NULLIF(TRIM(rbac_group_name), ''), 'Unknown') AS rbac_group_name,
+                COUNT(*) AS count
+            FROM {TABLE_VULNERABILITIES}
+            WHERE cve_id = %s
+            GROUP BY 1, 2
+            """,
+            (cve_id,)
+        )
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def get_latest_cve_row(connection, cve_id: str) -> Optional[Dict]:
+    """Fetch the most recently seen row of a CVE (software, remediation, description)."""
     cursor = connection.cursor(dictionary=True)
     try:
         cursor.execute(
             f"""
             SELECT
-                id,
-                cve_id,
-                device_id,
-                device_name,
-                device_tag,
-                rbac_group_name,
-                os_platform,
-                os_version,
-                os_architecture,
-                status,
-                disk_paths,
-                registry_paths,
                 software_vendor,
                 software_name,
                 software_version,
@@ -512,11 +754,28 @@ def get_vulnerabilities_by_cve(connection, cve_id: str) -> List[Dict]:
                 cve_description
             FROM {TABLE_VULNERABILITIES}
             WHERE cve_id = %s
-            ORDER BY last_seen_timestamp DESC
+            ORDER BY {_LATEST_ROW_ORDER}
+            LIMIT 1
             """,
             (cve_id,)
         )
-        return cursor.fetchall()
+        return cursor.fetchone()
+    finally:
+        cursor.close()
+
+
+def get_cve_device_rows(connection, cve_id: str, device_limit: Optional[int] = None) -> List[Dict]:
+    """Fetch device-level rows of a CVE, most recently seen devices first.
+
+    With ``device_limit`` only the rows of the first N devices are returned.
+    """
+    cursor = connection.cursor(dictionary=True)
+    try:
+        if device_limit is None:
+            cursor.execute(_CVE_DEVICE_ROWS_SQL, (cve_id,))
+        else:
+            cursor.execute(_CVE_TOP_DEVICE_ROWS_SQL, (cve_id, device_limit, cve_id))
+        return _decode_path_columns(cursor.fetchall())
     finally:
         cursor.close()
 
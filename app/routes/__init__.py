@@ -1,6 +1,8 @@
 """Register all FastAPI routers."""
 from fastapi import FastAPI
 
+from servicenow_client import ServiceNowAPIError
+
 from app.routes import (
     vulnerabilities,
     snapshots,
@@ -15,7 +17,7 @@ from app.routes import (
 
 
 def register_routers(app: FastAPI):
-    """Register all API routers with the FastAPI app."""
+    """Register all API routers (and their shared exception handlers) with the FastAPI app."""
     routers = [
         vulnerabilities.router,
         snapshots.router,
@@ -29,3 +31,4 @@ def register_routers(app: FastAPI):
     ]
     for router in routers:
         app.include_router(router)
+    app.add_exception_handler(ServiceNowAPIError, servicenow.servicenow_api_error_handler)
@@ -1,10 +1,11 @@
 """Dashboard trend API routes via FastAPI."""
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 
 from app.services import trend_service
 from app.utils.auth import auth_guard
+from app.utils.http_cache import conditional_json_response
 
 router = APIRouter(
     prefix="/api",
@@ -14,9 +15,16 @@ router = APIRouter(
 
 
 @router.get("/dashboard/trends")
-def get_dashboard_trends(period: Optional[List[str]] = Query(default=None)):
-    """Return materialized dashboard trend data."""
-    periods = [value.strip().lower() for value in period or [] if value.strip()]
+def get_dashboard_trends(request: Request, period: Optional[List[str]] = Query(default=None)):
+    """Return materialized dashboard trend data.
+
+    Responses carry an ETag so dashboard polling gets 304s until the
+    materialized trends change.
+    """
+    periods = tuple(value for value in map(str.lower, map(str.strip, period or ())) if value)
+    invalid = set(periods) - trend_service.SUPPORTED_PERIOD_SET
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Unsupported period types requested: {sorted(invalid)}")
 
     try:
         data = trend_service.fetch_trend_payload(periods or None)
@@ -25,4 +33,4 @@ def get_dashboard_trends(period: Optional[List[str]] = Query(default=None)):
     except Exception as exc:  # noqa: BLE001
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    return {"periods": data}
+    return conditional_json_response(request, {"periods": data})
@@ -2,8 +2,8 @@
 import logging
 from typing import Dict, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, Request, status
+from fastapi.responses import ORJSONResponse
 
 from app.services.integration_settings_service import (
     PROVIDER_AI,
@@ -11,6 +11,7 @@ from app.services.integration_settings_service import (
     integration_settings_service,
 )
 from app.utils.auth import auth_guard
+from app.utils.http_cache import conditional_json_response, etag_for, render_json
 
 logger = logging.getLogger(__name__)
 
@@ -58,7 +59,7 @@ def test_integration(provider: str, payload: Optional[Dict] = Body(default=None)
     try:
         result = integration_settings_service.test_provider(provider, metadata, secrets)
         status_code = result.pop("status_code", 200)
-        return JSONResponse(result, status_code=status_code)
+        return ORJSONResponse(result, status_code=status_code)
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:  # noqa: BLE001
@@ -85,12 +86,24 @@ def rotate_integration_secret(provider: str, payload: Dict = Body(...)):
         raise HTTPException(status_code=500, detail="Failed to rotate secret") from exc
 
 
-@router.get("/providers")
-def list_supported_providers():
-    """Helper endpoint returning providers to drive UI drop-downs."""
-    return {
+# The provider list is static, so its body and ETag are rendered once.
+_PROVIDERS_BODY = render_json(
+    {
         "providers": [
             {"id": PROVIDER_SERVICENOW, "label": "ServiceNow"},
             {"id": PROVIDER_AI, "label": "AI"},
         ]
     }
+)
+_PROVIDERS_ETAG = etag_for(_PROVIDERS_BODY)
+
+
+@router.get("/providers")
+def list_supported_providers(request: Request):
+    """Helper endpoint returning providers to drive UI drop-downs."""
+    return conditional_json_response(
+        request,
+        body=_PROVIDERS_BODY,
+        etag=_PROVIDERS_ETAG,
+        cache_control="public, max-age=3600",
+    )
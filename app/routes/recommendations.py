@@ -2,14 +2,23 @@
 import logging
 from typing import Dict, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, Query, Request, status
+from fastapi.responses import ORJSONResponse
 
 from app.services import recommendation_service as rec_service
 from app.services import vulnerability_service as vuln_service
 from app.utils.auth import auth_guard
+from app.utils.http_cache import (
+    REVALIDATE_PRIVATE_CACHE,
+    SHORT_PRIVATE_CACHE,
+    conditional_json_response,
+)
 
 logger = logging.getLogger(__name__)
 
+HISTORY_MAX_LIMIT = 200
+HISTORY_MAX_OFFSET = 10_000
+
 router = APIRouter(
     prefix="/api/recommendations",
     tags=["Recommendations"],
@@ -18,13 +27,18 @@ router = APIRouter(
 
 
 @router.get("/check/{cve_id}")
-def check_existing_report(cve_id: str):
-    """Check if a report exists for the given CVE within the last 7 days."""
+def check_existing_report(request: Request, cve_id: str):
+    """Check if a report exists for the given CVE within the last 7 days.
+
+    After an async ``/generate`` the response also carries ``status``
+    ("pending" or "failed", with ``error``) until the report is stored.
+    """
     try:
         result = rec_service.check_existing_report(cve_id)
-        if result:
-            return {"exists": True, "report": result}
-        return {"exists": False}
+        payload = {"exists": True, "report": result} if result else {"exists": False}
+        payload.update(rec_service.get_generation_status(cve_id) or {})
+        # Polled after an async /generate, so a cached "not yet" must not stick.
+        return conditional_json_response(request, payload, REVALIDATE_PRIVATE_CACHE)
     except Exception as exc:  # noqa: BLE001
         logger.error("Error checking existing report: %s", exc)
         raise HTTPException(status_code=500, detail=str(exc)) from exc
@@ -32,7 +46,11 @@ def check_existing_report(cve_id: str):
 
 @router.post("/generate")
 def generate_report(payload: Dict = Body(...)):
-    """Generate a recommendation report for a CVE using existing vulnerability data."""
+    """Generate a recommendation report for a CVE using existing vulnerability data.
+
+    With ``"async": true`` the report is built in the background and the
+    request returns 202 at once; poll ``/check/{cve_id}`` for the result.
+    """
     try:
         cve_id = payload.get("cve_id", "").strip()
         force_generate = payload.get("force", False)
@@ -40,24 +58,31 @@ def generate_report(payload: Dict = Body(...)):
         if not cve_id:
             raise HTTPException(status_code=400, detail="CVE ID is required")
 
-        if not force_generate:
-            existing = rec_service.check_existing_report(cve_id)
-            if existing:
-                raise HTTPException(
-                    status_code=409,
-                    detail={
-                        "error": "Report already exists",
-                        "exists": True,
-                        "report": existing,
-                    },
-                )
-
-        report_content = rec_service.build_report_from_data(cve_id)
-        report_id = rec_service.save_report(cve_id, report_content, "")
+        if payload.get("async"):
+            queued = rec_service.enqueue_report(cve_id, force=force_generate)
+            return ORJSONResponse(
+                {
+                    "status": "queued" if queued else "pending",
+                    "cve_id": cve_id,
+                    "poll_url": f"/api/recommendations/check/{cve_id}",
+                },
+                status_code=status.HTTP_202_ACCEPTED,
+            )
+
+        result = rec_service.generate_report(cve_id, force=force_generate)
+        if result.get("exists"):
+            raise HTTPException(
+                status_code=409,
+                detail={
+                    "error": "Report already exists",
+                    "exists": True,
+                    "report": result["report"],
+                },
+            )
 
         return {
             "success": True,
-            "report_id": report_id,
+            "report_id": result["report_id"],
             "cve_id": cve_id,
             "message": "Report generated successfully",
         }
@@ -71,25 +96,87 @@ def generate_report(payload: Dict = Body(...)):
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+@router.post("/generate_batch")
+def generate_reports_batch(payload: Dict = Body(...)):
+    """Generate recommendation reports for a list of CVEs concurrently."""
+    try:
+        cve_ids = payload.get("cve_ids") or []
+        if not isinstance(cve_ids, list) or not cve_ids:
+            raise HTTPException(status_code=400, detail="cve_ids must be a non-empty list")
+
+        results = rec_service.generate_reports_batch(cve_ids, force=payload.get("force", False))
+        return {
+            "results": results,
+            "generated": sum(1 for item in results if item.get("success")),
+            "total": len(results),
+        }
+
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Error generating reports in batch: %s", exc, exc_info=True)
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
+@router.post("/cve/bulk")
+def get_cve_summaries_bulk(payload: Dict = Body(...)):
+    """Return vulnerability summaries for several CVEs, keyed by CVE ID."""
+    try:
+        cve_ids = payload.get("cve_ids") or []
+        if not isinstance(cve_ids, list) or not all(isinstance(cve_id, str) for cve_id in cve_ids):
+            raise HTTPException(status_code=400, detail="cve_ids must be a list of strings")
+
+        summaries = vuln_service.get_cve_summaries_bulk(cve_ids)
+        return {"summaries": summaries}
+    except HTTPException:
+        raise
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    except Exception as exc:  # noqa: BLE001
+        logger.error("Error getting CVE summaries: %s", exc)
+        raise HTTPException(status_code=500, detail=str(exc)) from exc
+
+
 @router.get("/history")
-def get_report_history(limit: int = Query(50, ge=1, le=200), offset: int = Query(0, ge=0)):
-    """Get report history."""
+def get_report_history(
+    request: Request,
+    limit: int = Query(50, ge=1),
+    offset: int = Query(0, ge=0),
+    before_id: Optional[int] = Query(None, ge=1),
+):
+    """Get report history.
+
+    Deep pages should follow ``next_cursor`` (passed back as ``before_id``)
+    rather than growing ``offset``.
+    """
+    # Clamped rather than rejected so older callers asking for more still
+    # get a (shorter) page.
+    limit = min(limit, HISTORY_MAX_LIMIT)
+    offset = min(offset, HISTORY_MAX_OFFSET)
     try:
-        reports = rec_service.get_report_history(limit=limit, offset=offset)
-        return {"reports": reports, "total": len(reports)}
+        reports, has_more = rec_service.get_report_history(limit=limit, offset=offset, before_id=before_id)
+        next_cursor = reports[-1]["id"] if has_more else None
+        return conditional_json_response(
+            request,
+            {"reports": reports, "has_more": has_more, "next_cursor": next_cursor},
+            # Reloaded right after generating a report; must not serve stale.
+            REVALIDATE_PRIVATE_CACHE,
+        )
     except Exception as exc:  # noqa: BLE001
         logger.error("Error getting report history: %s", exc)
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
 @router.get("/{report_id}")
-def get_report(report_id: int = Path(..., ge=1)):
+def get_report(request: Request, report_id: int = Path(..., ge=1)):
     """Get a specific report by ID."""
     try:
         report = rec_service.get_report_by_id(report_id)
         if not report:
             raise HTTPException(status_code=404, detail="Report not found")
-        return {"report": report}
+        return conditional_json_response(request, {"report": report})
     except HTTPException:
         raise
     except Exception as exc:  # noqa: BLE001
@@ -98,13 +185,13 @@ def get_report(report_id: int = Path(..., ge=1)):
 
 
 @router.get("/cve/{cve_id}")
-def get_report_by_cve(cve_id: str):
+def get_report_by_cve(request: Request, cve_id: str):
     """Get the latest report for a CVE ID."""
     try:
         report = rec_service.get_report_by_cve_id(cve_id)
         if not report:
             raise HTTPException(status_code=404, detail="Report not found")
-        return {"report": report}
+        return conditional_json_response(request, {"report": report})
     except HTTPException:
         raise
     except Exception as exc:  # noqa: BLE001
@@ -113,20 +200,19 @@ def get_report_by_cve(cve_id: str):
 
 
 @router.get("/{report_id}/vulnerabilities")
-def get_cve_vulnerabilities_by_report(report_id: int = Path(..., ge=1)):
+def get_cve_vulnerabilities_by_report(request: Request, report_id: int = Path(..., ge=1)):
     """Get vulnerability data for a CVE ID from a report."""
     try:
-        report = rec_service.get_report_by_id(report_id)
-        if not report:
+        cve_id = rec_service.get_report_cve_id(report_id)
+        if cve_id is None:
             raise HTTPException(status_code=404, detail="Report not found")
-        cve_id = report.get("cve_id")
         if not cve_id:
             raise HTTPException(status_code=400, detail="CVE ID not found in report")
 
         report_data = vuln_service.get_cve_vulnerability_report_data(cve_id, device_limit=50)
         if not report_data:
             raise HTTPException(status_code=404, detail="No vulnerability data found")
-        return report_data
+        return conditional_json_response(request, report_data, SHORT_PRIVATE_CACHE)
     except HTTPException:
         raise
     except Exception as exc:  # noqa: BLE001
@@ -135,7 +221,7 @@ def get_cve_vulnerabilities_by_report(report_id: int = Path(..., ge=1)):
 
 
 @router.get("/cve/{cve_id}/vulnerabilities")
-def get_cve_vulnerabilities_by_cve(cve_id: str):
+def get_cve_vulnerabilities_by_cve(request: Request, cve_id: str):
     """Get vulnerability data for a CVE ID directly."""
     try:
         if not cve_id:
@@ -143,7 +229,7 @@ def get_cve_vulnerabilities_by_cve(cve_id: str):
         report_data = vuln_service.get_cve_vulnerability_report_data(cve_id, device_limit=50)
         if not report_data:
             raise HTTPException(status_code=404, detail="Vulnerability data not found")
-        return report_data
+        return conditional_json_response(request, report_data, SHORT_PRIVATE_CACHE)
     except HTTPException:
         raise
     except ValueError as exc:
@@ -1,16 +1,19 @@
 """ServiceNow integration routes for FastAPI."""
+import asyncio
 import logging
-from typing import Dict, Optional
+import time
+from typing import Dict, NamedTuple, Optional, Set, Tuple
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
 
 from app.services.integration_settings_service import (
     PROVIDER_SERVICENOW,
     integration_settings_service,
 )
 from app.utils.auth import auth_guard
-from servicenow_client import ServiceNowClient
+from servicenow_client import AsyncServiceNowClient, ServiceNowAPIError, credential_fingerprint
 
 logger = logging.getLogger(__name__)
 
@@ -21,15 +24,74 @@ router = APIRouter(
 )
 
 
-def _resolve_servicenow_context():
+# Health checks are polled by the dashboard and load balancers, so the upstream
+# probe runs in a background loop and the route only reads its last result.
+HEALTH_PROBE_INTERVAL = 30
+HEALTH_PROBE_STALE_AFTER = 90
+# (client, monotonic time of the probe, healthy)
+_health_probe: Optional[Tuple[AsyncServiceNowClient, float, bool]] = None
+
+# (credential fingerprint, client) of the last resolved context. The client
+# owns a pooled httpx.AsyncClient, so reusing it keeps HTTPS connections alive
+# across requests; it is rebuilt only when the stored credentials change.
+_cached_client: Optional[Tuple[Tuple[str, str, str], AsyncServiceNowClient]] = None
+
+# Replaced clients may still serve in-flight requests, so they are closed only
+# after this many seconds (longer than the client's 30s request timeout).
+CLIENT_CLOSE_GRACE = 60
+_retiring_tasks: Set["asyncio.Task[None]"] = set()
+
+
+async def _close_after_grace(client: AsyncServiceNowClient) -> None:
+    try:
+        await asyncio.sleep(CLIENT_CLOSE_GRACE)
+    finally:
+        await client.aclose()
+
+
+def _retire_client(client: AsyncServiceNowClient) -> None:
+    """Close a replaced client in the background once its requests are done."""
+    task = asyncio.create_task(_close_after_grace(client))
+    _retiring_tasks.add(task)
+    task.add_done_callback(_retiring_tasks.discard)
+
+
+async def servicenow_api_error_handler(_: Request, exc: ServiceNowAPIError) -> ORJSONResponse:
+    """Answer upstream ServiceNow failures with 502.
+
+    Already logged by the client; upstream outages are expected and must not
+    pay for a traceback per request.
+    """
+    return ORJSONResponse({"detail": str(exc)}, status_code=status.HTTP_502_BAD_GATEWAY)
+
+
+async def close_servicenow_client() -> None:
+    """Release the pooled ServiceNow connections on application shutdown."""
+    global _cached_client
+    cached, _cached_client = _cached_client, None
+    if cached:
+        await cached[1].aclose()
+    # Cancelling skips the grace period; each task still closes its client.
+    for task in list(_retiring_tasks):
+        task.cancel()
+    await asyncio.gather(*_retiring_tasks, return_exceptions=True)
+
+
+async def _resolve_servicenow_context():
     """Load runtime ServiceNow client and metadata from settings service."""
-    runtime = integration_settings_service.get_runtime_credentials(PROVIDER_SERVICENOW)
+    global _cached_client
+    # Credentials come from MySQL through the blocking connector.
+    runtime = await run_in_threadpool(integration_settings_service.get_runtime_credentials, PROVIDER_SERVICENOW)
     if not runtime:
         return None, None
     metadata = runtime.get("metadata") or {}
     secrets = runtime.get("secrets") or {}
+    fingerprint = credential_fingerprint(metadata, secrets)
+    cached = _cached_client
+    if cached and cached[0] == fingerprint:
+        return cached[1], metadata
     try:
-        client = ServiceNowClient(
+        client = AsyncServiceNowClient(
             instance_url=metadata.get("instance_url", ""),
             username=metadata.get("username", ""),
             password=secrets.get("password", ""),
@@ -37,34 +99,68 @@ def _resolve_servicenow_context():
     except Exception as exc:  # noqa: BLE001
         logger.error("Failed to init ServiceNow client: %s", exc, exc_info=True)
         return None, metadata
+    _cached_client = (fingerprint, client)
+    if cached:
+        _retire_client(cached[1])
     return client, metadata
 
 
+# Ticket fields forwarded on create, with their defaults; empty values are
+# left out so ServiceNow applies its own.
+_TICKET_FIELD_DEFAULTS = (
+    ("short_description", ""),
+    ("description", ""),
+    ("category", ""),
+    ("priority", "3"),
+    ("urgency", "3"),
+    ("impact", "3"),
+)
+
+
+class ServiceNowContext(NamedTuple):
+    client: AsyncServiceNowClient
+    table: str
+
+
+async def servicenow_context(table: Optional[str] = Query(default=None)) -> ServiceNowContext:
+    """Dependency resolving the configured client and the target table."""
+    client, metadata = await _resolve_servicenow_context()
+    if not client:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ServiceNow is not configured. Please configure it in settings.",
+        )
+    return ServiceNowContext(client, table or metadata.get("default_table", "incident"))
+
+
+@router.post("/reload-client")
+async def reload_servicenow_client():
+    """Drop the cached client and credentials so the next call uses fresh settings."""
+    global _cached_client
+    integration_settings_service.invalidate_runtime_credentials(PROVIDER_SERVICENOW)
+    cached, _cached_client = _cached_client, None
+    if cached:
+        _retire_client(cached[1])
+    return {"message": "ServiceNow client reloaded"}
+
+
 @router.get("/tickets")
-def list_servicenow_tickets(
-    table: Optional[str] = Query(default=None),
+async def list_servicenow_tickets(
     query: Optional[str] = Query(default=None),
     limit: int = Query(100, ge=1, le=500),
     offset: int = Query(0, ge=0),
+    ctx: ServiceNowContext = Depends(servicenow_context),
 ):
     """ServiceNow tickets list endpoint."""
     try:
-        client, metadata = _resolve_servicenow_context()
-        if not client:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="ServiceNow is not configured. Please configure it in settings.",
-            )
-        default_table = metadata.get("default_table", "incident") if metadata else "incident"
-        target_table = table or default_table
-        tickets = client.get_tickets(
-            table=target_table,
+        tickets = await ctx.client.get_tickets(
+            table=ctx.table,
             sysparm_query=query,
             sysparm_limit=limit,
             sysparm_offset=offset,
         )
         return {"tickets": tickets, "total": len(tickets)}
-    except HTTPException:
+    except (HTTPException, ServiceNowAPIError):
         raise
     except Exception as exc:  # noqa: BLE001
         logger.error("ServiceNow tickets error: %s", exc, exc_info=True)
@@ -72,25 +168,20 @@ def list_servicenow_tickets(
 
 
 @router.post("/tickets")
-def create_servicenow_ticket(payload: Dict = Body(...)):
+async def create_servicenow_ticket(
+    payload: Dict = Body(...),
+    ctx: ServiceNowContext = Depends(servicenow_context),
+):
     """Create ServiceNow ticket."""
     try:
-        client, metadata = _resolve_servicenow_context()
-        if not client:
-            raise HTTPException(status_code=400, detail="ServiceNow is not configured. Please configure it in settings.")
-        default_table = metadata.get("default_table", "incident") if metadata else "incident"
-        target_table = payload.get("table", default_table)
-        ticket_data = {
-            "short_description": payload.get("short_description", ""),
-            "description": payload.get("description", ""),
-            "category": payload.get("category", ""),
-            "priority": payload.get("priority", "3"),
-            "urgency": payload.get("urgency", "3"),
-            "impact": payload.get("impact", "3"),
-        }
-        ticket_data = {k: v for k, v in ticket_data.items() if v}
-        ticket = client.create_ticket(table=target_table, **ticket_data)
-        return JSONResponse(
+        target_table = payload.get("table", ctx.table)
+        ticket_data = {}
+        for field, default in _TICKET_FIELD_DEFAULTS:
+            value = payload.get(field, default)
+            if value:
+                ticket_data[field] = value
+        ticket = await ctx.client.create_ticket(table=target_table, **ticket_data)
+        return ORJSONResponse(
             {
                 "ticket": ticket,
                 "ticket_number": ticket.get("number", ticket.get("sys_id")),
@@ -98,7 +189,7 @@ def create_servicenow_ticket(payload: Dict = Body(...)):
             },
             status_code=status.HTTP_201_CREATED,
         )
-    except HTTPException:
+    except (HTTPException, ServiceNowAPIError):
         raise
     except Exception as exc:  # noqa: BLE001
         logger.error("ServiceNow tickets error: %s", exc, exc_info=True)
@@ -106,17 +197,12 @@ def create_servicenow_ticket(payload: Dict = Body(...)):
 
 
 @router.get("/tickets/{ticket_id}")
-def servicenow_ticket_detail(ticket_id: str, table: Optional[str] = Query(default=None)):
+async def servicenow_ticket_detail(ticket_id: str, ctx: ServiceNowContext = Depends(servicenow_context)):
     """Get ServiceNow ticket detail."""
     try:
-        client, metadata = _resolve_servicenow_context()
-        if not client:
-            raise HTTPException(status_code=400, detail="ServiceNow is not configured")
-        default_table = metadata.get("default_table", "incident") if metadata else "incident"
-        target_table = table or default_table
-        ticket = client.get_ticket(table=target_table, sys_id=ticket_id)
+        ticket = await ctx.client.get_ticket(table=ctx.table, sys_id=ticket_id)
         return {"ticket": ticket}
-    except HTTPException:
+    except (HTTPException, ServiceNowAPIError):
         raise
     except Exception as exc:  # noqa: BLE001
         logger.error("ServiceNow ticket detail error: %s", exc, exc_info=True)
@@ -124,17 +210,12 @@ def servicenow_ticket_detail(ticket_id: str, table: Optional[str] = Query(defaul
 
 
 @router.get("/tickets/{ticket_id}/notes")
-def get_servicenow_ticket_notes(ticket_id: str, table: Optional[str] = Query(default=None)):
+async def get_servicenow_ticket_notes(ticket_id: str, ctx: ServiceNowContext = Depends(servicenow_context)):
     """Get notes for a ServiceNow ticket."""
     try:
-        client, metadata = _resolve_servicenow_context()
-        if not client:
-            raise HTTPException(status_code=400, detail="ServiceNow is not configured")
-        default_table = metadata.get("default_table", "incident") if metadata else "incident"
-        target_table = table or default_table
-        notes = client.get_ticket_notes(table=target_table, sys_id=ticket_id)
+        notes = await ctx.client.get_ticket_notes(table=ctx.table, sys_id=ticket_id)
         return {"notes": notes, "total": len(notes)}
-    except HTTPException:
+    except (HTTPException, ServiceNowAPIError):
         raise
     except Exception as exc:  # noqa: BLE001
         logger.error("ServiceNow notes error: %s", exc, exc_info=True)
@@ -142,24 +223,24 @@ def get_servicenow_ticket_notes(ticket_id: str, table: Optional[str] = Query(def
 
 
 @router.post("/tickets/{ticket_id}/notes")
-def add_servicenow_ticket_note(
+async def add_servicenow_ticket_note(
     ticket_id: str,
-    payload: Dict = Body(...),
-    table: Optional[str] = Query(default=None),
+    payload: Optional[Dict] = Body(default=None),
+    ctx: ServiceNowContext = Depends(servicenow_context),
 ):
-    """Add note for a ServiceNow ticket."""
+    """Add note for a ServiceNow ticket.
+
+    ``table`` may come from the JSON body as well as the query string.
+    """
     try:
-        client, metadata = _resolve_servicenow_context()
-        if not client:
-            raise HTTPException(status_code=400, detail="ServiceNow is not configured")
-        default_table = metadata.get("default_table", "incident") if metadata else "incident"
-        target_table = table or default_table
-        note_text = payload.get("note", "")
+        data = payload or {}
+        note_text = data.get("note", "")
         if not note_text:
             raise HTTPException(status_code=400, detail="Note text is required")
-        note = client.add_ticket_note(table=target_table, sys_id=ticket_id, note_text=note_text)
-        return JSONResponse({"note": note, "message": "Note added successfully"}, status_code=status.HTTP_201_CREATED)
-    except HTTPException:
+        table = data.get("table") or ctx.table
+        note = await ctx.client.add_ticket_note(table=table, sys_id=ticket_id, note_text=note_text)
+        return ORJSONResponse({"note": note, "message": "Note added successfully"}, status_code=status.HTTP_201_CREATED)
+    except (HTTPException, ServiceNowAPIError):
         raise
     except Exception as exc:  # noqa: BLE001
         logger.error("ServiceNow notes error: %s", exc, exc_info=True)
@@ -177,28 +258,58 @@ def servicenow_test_connection(payload: Dict = Body(...)):
         secrets = {"password": payload.get("password")}
         result = integration_settings_service.test_provider(PROVIDER_SERVICENOW, metadata, secrets)
         status_code = result.pop("status_code", 200)
-        return JSONResponse(result, status_code=status_code)
+        return ORJSONResponse(result, status_code=status_code)
     except Exception as exc:  # noqa: BLE001
         logger.error("ServiceNow connection test error: %s", exc, exc_info=True)
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
+async def _probe_servicenow(client: AsyncServiceNowClient) -> bool:
+    global _health_probe
+    is_healthy = await client.test_connection()
+    _health_probe = (client, time.monotonic(), is_healthy)
+    return is_healthy
+
+
+async def run_health_probe_loop() -> None:
+    """Probe ServiceNow every ``HEALTH_PROBE_INTERVAL`` seconds; started from the app lifespan."""
+    while True:
+        try:
+            client, _ = await _resolve_servicenow_context()
+            if client:
+                await _probe_servicenow(client)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("ServiceNow background health probe failed: %s", exc)
+        await asyncio.sleep(HEALTH_PROBE_INTERVAL)
+
+
 @router.get("/health")
-def servicenow_health_check():
+async def servicenow_health_check():
     """Return basic health information for the ServiceNow integration."""
     try:
-        client, _ = _resolve_servicenow_context()
+        client, _ = await _resolve_servicenow_context()
         if not client:
             raise HTTPException(status_code=400, detail="ServiceNow is not configured")
-        is_healthy = client.test_connection()
-        status_payload = integration_settings_service.get_setting_summary(PROVIDER_SERVICENOW).get("status", {})
+        probe = _health_probe
+        if probe and probe[0] is client:
+            is_healthy = probe[2]
+            stale = time.monotonic() - probe[1] > HEALTH_PROBE_STALE_AFTER
+        else:
+            # First request after startup or a credential change.
+            is_healthy = await _probe_servicenow(client)
+            stale = False
+        summary = await run_in_threadpool(integration_settings_service.get_cached_setting_summary, PROVIDER_SERVICENOW)
+        status_payload = summary.get("status", {})
         return {
             "healthy": is_healthy,
+            "stale": stale,
             "status": status_payload.get("last_test_status"),
             "last_tested_at": status_payload.get("last_tested_at"),
             "message": status_payload.get("last_test_message"),
         }
-    except HTTPException:
+    except (HTTPException, ServiceNowAPIError):
         raise
     except Exception as exc:  # noqa: BLE001
         logger.error("ServiceNow health check error: %s", exc, exc_info=True)
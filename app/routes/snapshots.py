@@ -1,10 +1,11 @@
 """Snapshot routes using FastAPI."""
 import logging
 
-from fastapi import APIRouter, Depends, HTTPException, Path, Query
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
 
 from app.services import snapshot_service as snapshot_svc
 from app.utils.auth import auth_guard
+from app.utils.http_cache import SHORT_PRIVATE_CACHE, conditional_json_response, plain_json_response
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +43,7 @@ def get_snapshots(limit: int = Query(100, ge=1, le=500)):
 def get_snapshot_details(snapshot_id: int = Path(..., ge=1)):
     """Get detailed information for a specific snapshot."""
     try:
-        return snapshot_svc.get_snapshot_details(snapshot_id)
+        return plain_json_response(snapshot_svc.get_snapshot_details(snapshot_id))
     except Exception as exc:  # noqa: BLE001
         if "not found" in str(exc).lower():
             raise HTTPException(status_code=404, detail=str(exc)) from exc
@@ -54,17 +55,17 @@ def get_snapshot_details(snapshot_id: int = Path(..., ge=1)):
 def get_cve_history(cve_id: str):
     """Get historical changes for a specific CVE."""
     try:
-        return snapshot_svc.get_cve_history(cve_id)
+        return plain_json_response(snapshot_svc.get_cve_history(cve_id))
     except Exception as exc:  # noqa: BLE001
         logger.error("获取CVE历史时出错: %s", exc)
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
 @router.get("/snapshots/trend")
-def get_snapshots_trend():
+def get_snapshots_trend(request: Request):
     """Get snapshot trend data for line chart."""
     try:
-        return snapshot_svc.get_snapshots_trend()
+        return conditional_json_response(request, snapshot_svc.get_snapshots_trend(), SHORT_PRIVATE_CACHE)
     except Exception as exc:  # noqa: BLE001
         logger.error("获取快照趋势数据时出错: %s", exc)
         raise HTTPException(status_code=500, detail=str(exc)) from exc
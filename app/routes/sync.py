@@ -2,7 +2,7 @@
 import logging
 from typing import List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, status
 
 from app.services import sync_service as sync_svc
 from app.utils.auth import auth_guard
@@ -46,7 +46,7 @@ def list_sync_sources():
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
-@router.post("/sync")
+@router.post("/sync", status_code=status.HTTP_202_ACCEPTED)
 def trigger_sync(payload: Optional[dict] = Body(default=None)):
     """Trigger data sync in background (full sync)."""
     try:
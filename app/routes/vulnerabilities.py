@@ -5,7 +5,17 @@ from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, Request
 
 from app.services import vulnerability_service as vuln_service
+from app.services.filter_registry import (
+    LIST_FILTER_FIELDS,
+    RANGE_FILTER_CASTS,
+    SCALAR_FILTER_FIELDS,
+)
 from app.utils.auth import auth_guard
+from app.utils.http_cache import (
+    REVALIDATE_PRIVATE_CACHE,
+    SHORT_PRIVATE_CACHE,
+    conditional_json_response,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,42 +32,31 @@ def get_vulnerabilities(
     page: int = Query(1, ge=1),
     per_page: int = Query(50, ge=1, le=500),
     vuln_id: Optional[str] = Query(default=None, alias="id"),
+    cursor: Optional[str] = Query(default=None),
 ):
-    """Get vulnerability list with pagination and filters."""
+    """Get vulnerability list with pagination and filters.
+
+    ``cursor`` (the ``next_cursor`` of a previous response) resumes the listing
+    with keyset pagination and takes precedence over ``page``.
+    """
     try:
         filters: dict[str, object] = {}
-        filter_fields = [
-            "cve_id",
-            "device_name",
-            "os_platform",
-            "os_version",
-            "software_vendor",
-            "software_name",
-            "vulnerability_severity_level",
-            "status",
-            "exploitability_level",
-            "rbac_group_name",
-            "cve_public_exploit",
-        ]
-
-        query = request.query_params
-        for field in filter_fields:
-            if field == "software_vendor":
-                values = query.getlist(field)
-                if values:
-                    filters[field] = values
-            else:
-                value = query.get(field)
-                if value:
-                    filters[field] = value
-
-        threat_intel_values = query.getlist("threat_intel")
-        if threat_intel_values:
-            filters["threat_intel"] = threat_intel_values
-
-        for name in ("cvss_min", "cvss_max", "epss_min", "epss_max", "date_from", "date_to"):
-            value = query.get(name)
-            if value:
+        # One pass over the parameters actually sent; repeated scalar
+        # parameters keep the last value, as QueryParams.get does.
+        for name, value in request.query_params.multi_items():
+            if not value:
+                continue
+            if name in LIST_FILTER_FIELDS:
+                filters.setdefault(name, []).append(value)
+            elif name in SCALAR_FILTER_FIELDS:
+                caster = RANGE_FILTER_CASTS.get(name)
+                if caster:
+                    # Cast once here so equal values share one count-cache
+                    # key; unparsable bounds are ignored as before.
+                    try:
+                        value = caster(value)
+                    except ValueError:
+                        continue
                 filters[name] = value
 
         result = vuln_service.get_vulnerabilities(
@@ -65,8 +64,14 @@ def get_vulnerabilities(
             page=page,
             per_page=per_page,
             vuln_id=vuln_id,
+            cursor=cursor,
         )
-        return result
+        # Changes with every sync and tag run, so always revalidate.
+        response = conditional_json_response(request, result, REVALIDATE_PRIVATE_CACHE)
+        response.headers["X-Total-Count"] = str(result["total"])
+        return response
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     except Exception as exc:  # noqa: BLE001
         logger.error("获取漏洞数据时出错: %s", exc)
         raise HTTPException(status_code=500, detail=str(exc)) from exc
@@ -87,40 +92,40 @@ def get_patch_this(
 
 
 @router.get("/statistics")
-def get_statistics():
+def get_statistics(request: Request):
     """Get vulnerability statistics for charts."""
     try:
-        return vuln_service.get_statistics()
+        return conditional_json_response(request, vuln_service.get_statistics(), SHORT_PRIVATE_CACHE)
     except Exception as exc:  # noqa: BLE001
         logger.error("获取统计信息时出错: %s", exc)
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
 @router.get("/unique-cve-count")
-def get_unique_cve_count():
+def get_unique_cve_count(request: Request):
     """Get count of unique CVE IDs."""
     try:
-        return vuln_service.get_unique_cve_count()
+        return conditional_json_response(request, vuln_service.get_unique_cve_count(), SHORT_PRIVATE_CACHE)
     except Exception as exc:  # noqa: BLE001
         logger.error("获取去重CVE数量时出错: %s", exc)
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
 @router.get("/severity-counts")
-def get_severity_counts():
+def get_severity_counts(request: Request):
     """Get vulnerability counts by severity level."""
     try:
-        return vuln_service.get_severity_counts()
+        return conditional_json_response(request, vuln_service.get_severity_counts(), SHORT_PRIVATE_CACHE)
     except Exception as exc:  # noqa: BLE001
         logger.error("获取严重程度统计时出错: %s", exc)
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
 
 @router.get("/filter-options")
-def get_filter_options():
+def get_filter_options(request: Request):
     """Get filter option lists for dropdowns."""
     try:
-        return vuln_service.get_filter_options()
+        return conditional_json_response(request, vuln_service.get_filter_options(), SHORT_PRIVATE_CACHE)
     except Exception as exc:  # noqa: BLE001
         logger.error("获取过滤选项时出错: %s", exc)
         raise HTTPException(status_code=500, detail=str(exc)) from exc
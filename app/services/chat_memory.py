@@ -0,0 +1,106 @@
+"""Per-session chat history backed by Redis."""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.utils.cache import get_cache_client
+
+logger = logging.getLogger(__name__)
+
+HISTORY_KEY_PREFIX = "chat:history:"
+HISTORY_MAX_MESSAGES = 20
+# On overflow the list is cut back to this many messages in one go so the
+# replayed prefix stays identical for several turns (prompt-cache friendly).
+HISTORY_KEEP_AFTER_TRIM = HISTORY_MAX_MESSAGES // 2
+HISTORY_TTL = 86400
+
+# Used only when Redis is unavailable, so chat keeps working in single-worker
+# development setups. Kept in least-recently-used order and bounded like the
+# Redis keys: at most LOCAL_HISTORY_MAX_SESSIONS, each idle for up to HISTORY_TTL.
+LOCAL_HISTORY_MAX_SESSIONS = 1000
+_local_history: "OrderedDict[str, Tuple[float, List[Dict[str, str]]]]" = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _local_session(session_id: str, create: bool = False) -> Optional[List[Dict[str, str]]]:
+    """Return a session's local history, refreshing its idle timer.
+
+    Callers must hold ``_local_lock``.
+    """
+    now = time.monotonic()
+    while _local_history:
+        oldest_id, (last_used, _) = next(iter(_local_history.items()))
+        if now - last_used < HISTORY_TTL:
+            break
+        del _local_history[oldest_id]
+    entry = _local_history.get(session_id)
+    if entry is None:
+        if not create:
+            return None
+        entry = (now, [])
+    _local_history[session_id] = (now, entry[1])
+    _local_history.move_to_end(session_id)
+    while len(_local_history) > LOCAL_HISTORY_MAX_SESSIONS:
+        _local_history.popitem(last=False)
+    return entry[1]
+
+
+def _history_key(session_id: str) -> str:
+    return f"{HISTORY_KEY_PREFIX}{session_id}"
+
+
+def get(session_id: str) -> List[Dict[str, str]]:
+    """Return the stored messages for a session, oldest first."""
+    client = get_cache_client()
+    if not client:
+        with _local_lock:
+            return list(_local_session(session_id) or [])
+    try:
+        return [json.loads(item) for item in client.lrange(_history_key(session_id), 0, -1)]
+    except Exception as exc:
+        logger.warning("Failed to load chat history for %s: %s", session_id, exc)
+        return []
+
+
+def append(session_id: str, *messages: Dict[str, str]) -> None:
+    """Append messages, trimming to ``HISTORY_KEEP_AFTER_TRIM`` on overflow."""
+    if not messages:
+        return
+    client = get_cache_client()
+    if not client:
+        with _local_lock:
+            history = _local_session(session_id, create=True)
+            history.extend(messages)
+            if len(history) > HISTORY_MAX_MESSAGES:
+                del history[:-HISTORY_KEEP_AFTER_TRIM]
+        return
+    key = _history_key(session_id)
+    try:
+        pipe = client.pipeline(transaction=True)
+        pipe.rpush(key, *(json.dumps(message, ensure_ascii=False) for message in messages))
+        pipe.expire(key, HISTORY_TTL)
+        length, _ = pipe.execute()
+        if length > HISTORY_MAX_MESSAGES:
+            client.ltrim(key, -HISTORY_KEEP_AFTER_TRIM, -1)
+    except Exception as exc:
+        logger.warning("Failed to store chat history for %s: %s", session_id, exc)
+
+
+def drop_oldest(session_id: str, count: int) -> None:
+    """Remove the ``count`` oldest messages of a session."""
+    if count <= 0:
+        return
+    client = get_cache_client()
+    if not client:
+        with _local_lock:
+            history = _local_session(session_id)
+            if history:
+                del history[:count]
+        return
+    try:
+        client.ltrim(_history_key(session_id), count, -1)
+    except Exception as exc:
+        logger.warning("Failed to trim chat history for %s: %s", session_id, exc)
@@ -0,0 +1,285 @@
+"""AI chat service: provider clients, prompt assembly and response caching."""
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import ssl
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, DefaultDict, Dict, List, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+from app.services import chat_memory
+from app.services.integration_settings_service import (
+    PROVIDER_AI,
+    integration_settings_service,
+)
+from app.utils.cache import cache_get, cache_set
+
+logger = logging.getLogger(__name__)
+
+# Caps on the history replayed to the model; characters are a cheap proxy for
+# tokens that keeps long chats from blowing past the context window.
+MAX_PROMPT_MESSAGES = 20
+MAX_PROMPT_CHARS = 16000
+
+RESPONSE_CACHE_KEY_PREFIX = "chat:exact:"
+RESPONSE_CACHE_TTL = 3600
+
+# Classifies provider errors in one pass. Bare "url" is not matched because
+# most provider messages quote a URL regardless of the actual cause.
+_ERROR_HINT_RE = re.compile(
+    r"(?P<auth>api[_ ]?key|authentication)"
+    r"|(?P<url>base[_ ]?url|invalid url|request url)"
+    r"|(?P<model>\bmodel\b)",
+    re.IGNORECASE,
+)
+_ERROR_HINTS = (
+    ("auth", "Invalid API key. Please check your API key in Chat Config."),
+    ("url", "Invalid Base URL. Please check your Base URL in Chat Config."),
+    ("model", "Invalid model. Please check your model selection in Chat Config."),
+)
+
+# Async handlers interleave, so turns within one session are serialised.
+# Locks are dropped again once no request holds or awaits them, so idle
+# sessions do not accumulate.
+_session_locks: DefaultDict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+_session_lock_users: DefaultDict[str, int] = defaultdict(int)
+
+# Building an SSL context is the bulk of OpenAI client construction cost, so
+# one context is shared by every cached client.
+_SHARED_SSL_CTX = ssl.create_default_context()
+
+# Sized for concurrent chat traffic so overflow requests reuse pooled sockets
+# instead of opening new TLS connections; LLM replies can be slow, hence the
+# long timeout. Idle sockets are kept for five minutes so the connection
+# opened by prewarm_provider_connection() survives until the first chat.
+_OPENAI_HTTP_LIMITS = httpx.Limits(
+    max_connections=2000,
+    max_keepalive_connections=500,
+    keepalive_expiry=300.0,
+)
+_PREWARM_TIMEOUT = httpx.Timeout(5.0)
+_OPENAI_HTTP_TIMEOUT = httpx.Timeout(120.0)
+
+# One connection pool for every provider/credential pair; the cached OpenAI
+# clients are thin wrappers that share it. Closed from the app lifespan.
+_HTTP_CLIENT = httpx.AsyncClient(
+    verify=_SHARED_SSL_CTX,
+    limits=_OPENAI_HTTP_LIMITS,
+    timeout=_OPENAI_HTTP_TIMEOUT,
+)
+
+
+@lru_cache(maxsize=32)
+def get_openai_client(api_key: str, base_url: str) -> AsyncOpenAI:
+    """Return a reusable OpenAI client per credential pair."""
+    return AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=_HTTP_CLIENT)
+
+
+async def close_http_client() -> None:
+    """Release pooled provider connections on application shutdown."""
+    get_openai_client.cache_clear()
+    await _HTTP_CLIENT.aclose()
+
+
+async def prewarm_provider_connection() -> None:
+    """Open a pooled connection to the configured AI provider ahead of use.
+
+    Saves the first chat after startup a TCP/TLS handshake. Any failure is
+    logged and ignored; chat simply connects on demand.
+    """
+    try:
+        runtime_config = await asyncio.to_thread(load_ai_runtime_config, None)
+        if not runtime_config:
+            return
+        await _HTTP_CLIENT.head(runtime_config["base_url"], timeout=_PREWARM_TIMEOUT)
+        logger.info("Pre-warmed AI provider connection to %s", runtime_config["base_url"])
+    except Exception as exc:  # noqa: BLE001
+        logger.warning("Failed to pre-warm AI provider connection: %s", exc)
+
+
+def load_ai_runtime_config(override: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Merge stored AI configuration with optional request override."""
+    override = override or {}
+    stored = integration_settings_service.get_runtime_credentials(PROVIDER_AI)
+    metadata = (stored or {}).get("metadata") or {}
+    secrets = (stored or {}).get("secrets") or {}
+
+    api_key = override.get("apiKey") or secrets.get("api_key")
+    base_url = override.get("baseUrl") or metadata.get("base_url")
+    if not api_key or not base_url:
+        return None
+
+    return {
+        "api_key": api_key,
+        "base_url": base_url,
+        "model": override.get("model") or metadata.get("model", "deepseek-chat"),
+        "temperature": override.get("temperature", metadata.get("temperature", 0.7)),
+        "max_tokens": override.get("maxTokens", metadata.get("max_tokens", 1000)),
+        "system_prompt": override.get("systemPrompt", metadata.get("system_prompt", "")),
+    }
+
+
+def describe_error(exc: Exception) -> str:
+    """Map provider errors to hints about the Chat Config page."""
+    error_message = str(exc)
+    matched = {match.lastgroup for match in _ERROR_HINT_RE.finditer(error_message)}
+    for group, hint in _ERROR_HINTS:
+        if group in matched:
+            return hint
+    return error_message
+
+
+async def complete(session_id: str, runtime_config: Dict[str, Any], message: str) -> str:
+    """Answer one user turn and record it in the session history."""
+    client = get_openai_client(runtime_config["api_key"], runtime_config["base_url"])
+    async with _session_turn(session_id):
+        conversation = await _build_conversation(session_id, runtime_config, message)
+        cache_key = _response_cache_key(runtime_config, conversation)
+        ai_response = await asyncio.to_thread(cache_get, cache_key)
+        if ai_response is None:
+            response = await client.chat.completions.create(
+                **_completion_kwargs(runtime_config, conversation),
+                stream=False,
+            )
+            ai_response = response.choices[0].message.content
+            await asyncio.to_thread(cache_set, cache_key, ai_response, RESPONSE_CACHE_TTL)
+        await _record_turn(session_id, message, ai_response)
+    return ai_response
+
+
+async def stream(session_id: str, runtime_config: Dict[str, Any], message: str) -> AsyncIterator[str]:
+    """Yield the answer to one user turn as text deltas while it is generated.
+
+    Only completed answers are recorded; an aborted stream leaves the history
+    untouched.
+    """
+    client = get_openai_client(runtime_config["api_key"], runtime_config["base_url"])
+    async with _session_turn(session_id):
+        conversation = await _build_conversation(session_id, runtime_config, message)
+        cache_key = _response_cache_key(runtime_config, conversation)
+        ai_response = await asyncio.to_thread(cache_get, cache_key)
+        if ai_response is not None:
+            yield ai_response
+        else:
+            parts: List[str] = []
+            chunks = await client.chat.completions.create(
+                **_completion_kwargs(runtime_config, conversation),
+                stream=True,
+            )
+            async for chunk in chunks:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            ai_response = "".join(parts)
+            await asyncio.to_thread(cache_set, cache_key, ai_response, RESPONSE_CACHE_TTL)
+        await _record_turn(session_id, message, ai_response)
+
+
+def _bound_history(
+    history: List[Dict[str, str]],
+    reserved_chars: int = 0,
+    max_messages: int = MAX_PROMPT_MESSAGES,
+    max_chars: int = MAX_PROMPT_CHARS,
+) -> List[Dict[str, str]]:
+    """Drop the oldest messages once the prompt exceeds either cap.
+
+    ``reserved_chars`` accounts for messages that are always sent (system
+    prompt and the new user turn). On overflow the history is cut down to half
+    of each cap rather than just under it, so the following turns keep an
+    unchanged prefix until the next overflow.
+    """
+    total_chars = reserved_chars + sum(len(msg.get("content") or "") for msg in history)
+    if len(history) <= max_messages and total_chars <= max_chars:
+        return history
+    start = 0
+    while start < len(history) and (
+        len(history) - start > max_messages // 2 or total_chars > max_chars // 2
+    ):
+        total_chars -= len(history[start].get("content") or "")
+        start += 1
+    return history[start:]
+
+
+def _response_cache_key(runtime_config: Dict[str, Any], conversation: List[Dict[str, str]]) -> str:
+    """Hash everything that shapes the completion into a cache key."""
+    material = json.dumps(
+        [
+            runtime_config.get("base_url"),
+            runtime_config.get("model"),
+            runtime_config.get("temperature"),
+            runtime_config.get("max_tokens"),
+            conversation,
+        ],
+        ensure_ascii=False,
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return RESPONSE_CACHE_KEY_PREFIX + hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+@asynccontextmanager
+async def _session_turn(session_id: str) -> AsyncIterator[None]:
+    """Serialise the read-modify-write of one session's history."""
+    _session_lock_users[session_id] += 1
+    try:
+        async with _session_locks[session_id]:
+            yield
+    finally:
+        _session_lock_users[session_id] -= 1
+        if not _session_lock_users[session_id]:
+            del _session_lock_users[session_id]
+            _session_locks.pop(session_id, None)
+
+
+async def _build_conversation(
+    session_id: str,
+    runtime_config: Dict[str, Any],
+    message: str,
+) -> List[Dict[str, str]]:
+    """Assemble the prompt for a new user turn; call with the session lock held."""
+    history = await asyncio.to_thread(chat_memory.get, session_id)
+
+    # Prompt layout is append-only so provider-side prefix caches
+    # (DeepSeek context caching, OpenAI prompt caching) keep hitting:
+    # the configured system prompt always leads, followed by the
+    # stored turns in order, and older turns are only dropped in
+    # blocks, with the cut persisted so later turns share the new
+    # prefix.
+    system_prompt = runtime_config.get("system_prompt") or ""
+    conversation = _bound_history(
+        history,
+        reserved_chars=len(system_prompt) + len(message),
+    )
+    dropped = len(history) - len(conversation)
+    if dropped:
+        await asyncio.to_thread(chat_memory.drop_oldest, session_id, dropped)
+    if system_prompt:
+        conversation.insert(0, {"role": "system", "content": system_prompt})
+
+    conversation.append({"role": "user", "content": message})
+    return conversation
+
+
+async def _record_turn(session_id: str, message: str, ai_response: str) -> None:
+    await asyncio.to_thread(
+        chat_memory.append,
+        session_id,
+        {"role": "user", "content": message},
+        {"role": "assistant", "content": ai_response},
+    )
+
+
+def _completion_kwargs(runtime_config: Dict[str, Any], conversation: List[Dict[str, str]]) -> Dict[str, Any]:
+    return {
+        "model": runtime_config.get("model", "deepseek-chat"),
+        "messages": conversation,
+        "temperature": runtime_config.get("temperature", 0.7),
+        "max_tokens": runtime_config.get("max_tokens", 1000),
+    }
@@ -2,18 +2,23 @@
 from __future__ import annotations
 
 import logging
-from typing import Dict, List
+import re
+from typing import Callable, Dict, List, Optional, Tuple
 
 from mysql.connector import Error
 
 from app.constants.database import (
     TABLE_DEVICE_TAG_RULES,
+    TABLE_DEVICE_TAG_SUMMARY,
     TABLE_DEVICE_TAGS,
     TABLE_VULNERABILITIES,
 )
 
 logger = logging.getLogger(__name__)
 
+_MATCH_TABLE = "tmp_device_tag_matches"
+_MATCH_BATCH_SIZE = 5000
+
 DEFAULT_DEVICE_TAG_RULES: List[Dict] = [
     {
         "tag": "panjin",
@@ -39,6 +44,77 @@ DEFAULT_DEVICE_TAG_RULES: List[Dict] = [
 ]
 
 
+def _like_to_regex(pattern: str) -> str:
+    """Translate a SQL LIKE pattern (``%``, ``_``, ``\\`` escape) to a regex."""
+    parts: List[str] = []
+    escaped = False
+    for char in pattern:
+        if escaped:
+            parts.append(re.escape(char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "%":
+            parts.append(".*")
+        elif char == "_":
+            parts.append(".")
+        else:
+            parts.append(re.escape(char))
+    return "".join(parts)
+
+
+def classify_pattern(pattern: str) -> Tuple[str, Optional[str]]:
+    """Classify a LIKE pattern as exact/prefix/suffix/substring or generic like.
+
+    Returns the kind and the literal anchor with its ``%`` wildcards stripped;
+    patterns using ``_``, escapes or inner ``%`` stay ``like`` without anchor.
+    """
+    leading = pattern.startswith("%")
+    trailing = len(pattern) > int(leading) and pattern.endswith("%")
+    anchor = pattern[int(leading):len(pattern) - int(trailing)]
+    if not anchor or any(char in anchor for char in "%_\\"):
+        return "like", None
+    if leading and trailing:
+        return "substring", anchor
+    if leading:
+        return "suffix", anchor
+    if trailing:
+        return "prefix", anchor
+    return "exact", anchor
+
+
+def _rule_predicate(pattern: str) -> Callable[[str], bool]:
+    """Build a matcher for one rule pattern over lower-cased device names.
+
+    Anchored kinds are plain string comparisons; only ``like`` rules need a
+    regex. Comparison is case-insensitive like the default MySQL collation.
+    """
+    kind, anchor = classify_pattern(pattern)
+    if kind == "like":
+        regex = re.compile(_like_to_regex(pattern), re.IGNORECASE | re.DOTALL)
+        return lambda name: regex.fullmatch(name) is not None
+    anchor = anchor.lower()
+    if kind == "exact":
+        return anchor.__eq__
+    if kind == "prefix":
+        return lambda name: name.startswith(anchor)
+    if kind == "suffix":
+        return lambda name: name.endswith(anchor)
+    return lambda name: anchor in name
+
+
+def _backfill_rule_kinds(cursor) -> None:
+    """Classify rules stored before the kind/anchor columns existed."""
+    cursor.execute(f"SELECT id, pattern FROM {TABLE_DEVICE_TAG_RULES} WHERE kind IS NULL")
+    rows = cursor.fetchall()
+    if not rows:
+        return
+    cursor.executemany(
+        f"UPDATE {TABLE_DEVICE_TAG_RULES} SET kind = %s, anchor = %s WHERE id = %s",
+        [(*classify_pattern(row["pattern"]), row["id"]) for row in rows],
+    )
+
+
 def seed_default_rules(connection) -> None:
     """Insert built-in rules when table is empty."""
     cursor = connection.cursor(dictionary=True)
@@ -46,11 +122,13 @@ def seed_default_rules(connection) -> None:
         cursor.execute(f"SELECT COUNT(*) AS count FROM {TABLE_DEVICE_TAG_RULES}")
         count = cursor.fetchone()["count"]
         if count:
+            _backfill_rule_kinds(cursor)
+            connection.commit()
             return
         logger.info("Seeding default device tag rules...")
         insert_query = f"""
-            INSERT INTO {TABLE_DEVICE_TAG_RULES} (tag, pattern, priority, enabled, notes)
-            VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO {TABLE_DEVICE_TAG_RULES} (tag, pattern, kind, anchor, priority, enabled, notes)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
         """
         for rule in DEFAULT_DEVICE_TAG_RULES:
             cursor.execute(
@@ -58,6 +136,7 @@ def seed_default_rules(connection) -> None:
                 (
                     rule["tag"],
                     rule["pattern"],
+                    *classify_pattern(rule["pattern"]),
                     rule.get("priority", 100),
                     1 if rule.get("enabled", True) else 0,
                     rule.get("notes"),
@@ -75,7 +154,7 @@ def apply_device_tag_rules(connection) -> int:
     try:
         cursor.execute(
             f"""
-            SELECT id, tag, pattern, priority
+            SELECT id, tag, pattern, kind, anchor, priority
             FROM {TABLE_DEVICE_TAG_RULES}
             WHERE enabled = TRUE
             ORDER BY priority ASC, id ASC
@@ -85,43 +164,131 @@ def apply_device_tag_rules(connection) -> int:
         if not rules:
             logger.info("No device tag rules enabled; skipping tagging step")
             return 0
+        # Matching always classifies the pattern itself; stored kind/anchor
+        # that no longer match it (e.g. a pattern edited in SQL) are rewritten
+        # so they stay accurate for readers of the table.
+        drifted = []
+        for rule in rules:
+            kind, anchor = classify_pattern(rule["pattern"])
+            if (rule["kind"], rule["anchor"]) != (kind, anchor):
+                logger.warning(
+                    "Device tag rule %s has stale kind/anchor for pattern %r; reclassifying",
+                    rule["id"], rule["pattern"],
+                )
+                drifted.append((kind, anchor, rule["id"]))
+        # Only the rule rows need named columns; the name scan and the writes
+        # below use a plain tuple cursor.
+        cursor.close()
+        cursor = connection.cursor()
+        if drifted:
+            cursor.executemany(
+                f"UPDATE {TABLE_DEVICE_TAG_RULES} SET kind = %s, anchor = %s WHERE id = %s",
+                drifted,
+            )
 
-        logger.info("Clearing previous device_tag assignments...")
+        # Rules only depend on the device name, so they are matched once per
+        # distinct name in Python (read via the device_name_rev index) instead
+        # of once per vulnerability row in SQL. Rules are in priority order,
+        # so the first hit wins as with SQL CASE.
+        predicates = [(rule["tag"], _rule_predicate(rule["pattern"])) for rule in rules]
         cursor.execute(
-            f"UPDATE {TABLE_VULNERABILITIES} SET device_tag = NULL WHERE device_tag IS NOT NULL"
+            f"""
+            SELECT DISTINCT device_name_rev
+            FROM {TABLE_VULNERABILITIES}
+            WHERE device_name_rev IS NOT NULL
+            """
         )
+        matches = []
+        for (name_rev,) in cursor:
+            name = name_rev[::-1].lower()
+            for tag, predicate in predicates:
+                if predicate(name):
+                    matches.append((name_rev, tag))
+                    break
 
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS {_MATCH_TABLE}")
+        cursor.execute(
+            f"""
+            CREATE TEMPORARY TABLE {_MATCH_TABLE} (
+                device_name_rev VARCHAR(255) PRIMARY KEY,
+                tag VARCHAR(50) NOT NULL
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+            """
+        )
+        for start in range(0, len(matches), _MATCH_BATCH_SIZE):
+            cursor.executemany(
+                f"INSERT INTO {_MATCH_TABLE} (device_name_rev, tag) VALUES (%s, %s)",
+                matches[start:start + _MATCH_BATCH_SIZE],
+            )
+        # Both updates are driven by indexes (the small match table joined on
+        # idx_device_name_rev, then the idx_device_tag range for stale tags).
+        cursor.execute(
+            f"""
+            UPDATE {TABLE_VULNERABILITIES} v
+            JOIN {_MATCH_TABLE} m ON m.device_name_rev = v.device_name_rev
+            SET v.device_tag = m.tag
+            """
+        )
+        cursor.execute(
+            f"""
+            UPDATE {TABLE_VULNERABILITIES} v
+            LEFT JOIN {_MATCH_TABLE} m ON m.device_name_rev = v.device_name_rev
+            SET v.device_tag = NULL
+            WHERE v.device_tag IS NOT NULL AND m.device_name_rev IS NULL
+            """
+        )
+        cursor.execute(f"DROP TEMPORARY TABLE {_MATCH_TABLE}")
+
+        cursor.execute(
+            f"""
+            SELECT device_tag AS tag, COUNT(*) AS count,
+                   COUNT(DISTINCT device_id) AS device_count
+            FROM {TABLE_VULNERABILITIES}
+            WHERE device_tag IS NOT NULL AND device_tag != ''
+            GROUP BY device_tag
+            """
+        )
+        tag_counts = cursor.fetchall()
         applied = 0
-        for rule in rules:
-            cursor.execute(
-                f"""
-                UPDATE {TABLE_VULNERABILITIES}
-                SET device_tag = %s
-                WHERE device_tag IS NULL
-                  AND device_name IS NOT NULL
-                  AND device_name LIKE %s
-                """,
-                (rule["tag"], rule["pattern"]),
+        for tag, count, _ in tag_counts:
+            applied += count
+            logger.info("Tag %s matched %s records", tag, count)
+
+        # The dashboard reads per-tag device counts from this summary instead
+        # of aggregating the vulnerabilities table on every request.
+        cursor.execute(f"DELETE FROM {TABLE_DEVICE_TAG_SUMMARY}")
+        if tag_counts:
+            cursor.executemany(
+                f"INSERT INTO {TABLE_DEVICE_TAG_SUMMARY} (tag, device_count) VALUES (%s, %s)",
+                [(tag, device_count) for tag, _, device_count in tag_counts],
             )
-            affected = cursor.rowcount or 0
-            applied += affected
-            if affected:
-                logger.info(
-                    "Rule #%s (%s) matched %s records",
-                    rule["id"],
-                    rule["tag"],
-                    affected,
-                )
 
-        logger.info("Rebuilding device_tags materialized table...")
-        cursor.execute(f"DELETE FROM {TABLE_DEVICE_TAGS}")
+        # Upsert on the uk_device_name key and drop devices that lost their
+        # tag, so unchanged rows (and their detected_at) are left alone.
+        logger.info("Refreshing device_tags materialized table...")
         cursor.execute(
             f"""
             INSERT INTO {TABLE_DEVICE_TAGS} (device_id, device_name, tag, source)
-            SELECT DISTINCT device_id, device_name, device_tag, 'rule'
+            SELECT MAX(device_id), device_name, MAX(device_tag), 'rule'
             FROM {TABLE_VULNERABILITIES}
             WHERE device_tag IS NOT NULL AND device_tag != ''
-        """
+            GROUP BY device_name
+            ON DUPLICATE KEY UPDATE
+                device_id = VALUES(device_id),
+                tag = VALUES(tag),
+                source = VALUES(source)
+            """
+        )
+        cursor.execute(
+            f"""
+            DELETE dt FROM {TABLE_DEVICE_TAGS} dt
+            LEFT JOIN (
+                SELECT DISTINCT device_name
+                FROM {TABLE_VULNERABILITIES}
+                WHERE device_tag IS NOT NULL AND device_tag != ''
+            ) tagged ON tagged.device_name = dt.device_name
+            WHERE tagged.device_name IS NULL
+            """
         )
 
         connection.commit()
@@ -136,15 +303,13 @@ def apply_device_tag_rules(connection) -> int:
 
 
 def get_device_tag_distribution(connection) -> List[Dict]:
-    """Return per-tag device counts."""
+    """Return per-tag device counts from the summary built at tagging time."""
     cursor = connection.cursor(dictionary=True)
     try:
         cursor.execute(
             f"""
-            SELECT device_tag AS tag, COUNT(DISTINCT device_id) AS device_count
-            FROM {TABLE_VULNERABILITIES}
-            WHERE device_tag IS NOT NULL AND device_tag != ''
-            GROUP BY device_tag
+            SELECT tag, device_count
+            FROM {TABLE_DEVICE_TAG_SUMMARY}
             ORDER BY device_count DESC
             """
         )
@@ -159,10 +324,9 @@ def get_distinct_device_tags(connection) -> List[str]:
     try:
         cursor.execute(
             f"""
-            SELECT DISTINCT device_tag AS tag
-            FROM {TABLE_VULNERABILITIES}
-            WHERE device_tag IS NOT NULL AND device_tag != ''
-            ORDER BY device_tag
+            SELECT tag
+            FROM {TABLE_DEVICE_TAG_SUMMARY}
+            ORDER BY tag
             """
         )
         return [row["tag"] for row in cursor.fetchall()]
@@ -1,14 +1,19 @@
 """Filter configuration for vulnerability queries."""
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional
 
 # Field-level filter strategies
 # strategy options: contains, equals, boolean, in
+# match_mode (contains strategy only): contains, prefix, fulltext
+#   prefix   -> LIKE 'value%' (can use a BTREE index)
+#   fulltext -> MATCH ... AGAINST in boolean mode (needs a FULLTEXT index);
+#               word-prefix matching only, falls back to contains when no
+#               search term is long enough to be indexed
 FILTER_FIELD_DEFINITIONS: Dict[str, Dict[str, str]] = {
     "cve_id": {"column": "cve_id", "strategy": "contains"},
     "device_name": {"column": "device_name", "strategy": "contains"},
-    "software_name": {"column": "software_name", "strategy": "contains"},
+    "software_name": {"column": "software_name", "strategy": "contains", "match_mode": "fulltext"},
     "os_platform": {"column": "os_platform", "strategy": "equals"},
     "os_version": {"column": "os_version", "strategy": "equals"},
     "vulnerability_severity_level": {"column": "vulnerability_severity_level", "strategy": "equals"},
@@ -35,6 +40,23 @@ DATE_FILTER_DEFINITIONS: Dict[str, Dict[str, str]] = {
 }
 
 
+# Request parameter names, derived once at import. ``threat_intel`` is a
+# multi-value filter resolved to columns by the query builder itself.
+LIST_FILTER_FIELDS = frozenset(
+    field for field, definition in FILTER_FIELD_DEFINITIONS.items()
+    if definition["strategy"] == "in"
+) | {"threat_intel"}
+SCALAR_FILTER_FIELDS = (
+    frozenset(FILTER_FIELD_DEFINITIONS) - LIST_FILTER_FIELDS
+) | frozenset(RANGE_FILTER_DEFINITIONS) | frozenset(DATE_FILTER_DEFINITIONS)
+# Casts applied to range parameters as they are read from the request.
+RANGE_FILTER_CASTS: Dict[str, Callable[[str], Any]] = {
+    field: definition["cast"]
+    for field, definition in RANGE_FILTER_DEFINITIONS.items()
+    if "cast" in definition
+}
+
+
 def normalize_list(value: Any) -> List[Any]:
     if value is None:
         return []
@@ -45,12 +67,19 @@ def normalize_list(value: Any) -> List[Any]:
     return []
 
 
+_BOOL_MAP: Dict[str, bool] = {
+    "true": True,
+    "1": True,
+    "yes": True,
+    "false": False,
+    "0": False,
+    "no": False,
+}
+
+
 def parse_boolean(value: Any) -> Optional[bool]:
-    if value in (None, "", "all"):
-        return None
-    normalized = str(value).strip().lower()
-    if normalized in {"true", "1", "yes"}:
-        return True
-    if normalized in {"false", "0", "no"}:
-        return False
-    return None
+    if value is None or isinstance(value, bool):
+        return value
+    if not isinstance(value, str):
+        value = str(value)
+    return _BOOL_MAP.get(value.strip().lower())
@@ -1,11 +1,17 @@
 """Service logic for integration settings management."""
 import logging
+import threading
+import time
+from contextlib import nullcontext
 from datetime import datetime
-from typing import Any, Dict, Optional, Tuple
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
 
+import httpx
+import requests
 from openai import OpenAI
 
-from database import get_db_connection
+from database import db_conn
 from servicenow_client import ServiceNowClient
 from app.repositories import integration_settings_repository as repo
 from app.services.secret_manager import SecretManager
@@ -15,30 +21,72 @@ logger = logging.getLogger(__name__)
 PROVIDER_SERVICENOW = "servicenow"
 PROVIDER_AI = "ai"
 SUPPORTED_PROVIDERS = {PROVIDER_SERVICENOW, PROVIDER_AI}
+# Runtime credentials are read on hot paths (every chat turn); other workers
+# pick up saved changes within this many seconds.
+RUNTIME_CREDENTIALS_TTL = 30
+AI_TEST_TIMEOUT = httpx.Timeout(5.0)
+
+# Read-only defaults; callers that need to modify them take a copy.
+_EMPTY_METADATA: Mapping[str, Any] = MappingProxyType({})
+_DEFAULT_METADATA: Dict[str, Mapping[str, Any]] = {
+    PROVIDER_SERVICENOW: MappingProxyType({
+        "instance_url": "",
+        "username": "",
+        "default_table": "incident",
+    }),
+    PROVIDER_AI: MappingProxyType({
+        "api_provider": "openai",
+        "base_url": "https://api.openai.com/v1",
+        "model": "gpt-3.5-turbo",
+        "temperature": 0.7,
+        "max_tokens": 1000,
+        "system_prompt": "",
+    }),
+}
+_EXPECTED_SECRET_FIELDS: Dict[str, Tuple[str, ...]] = {
+    PROVIDER_SERVICENOW: ("password",),
+    PROVIDER_AI: ("api_key",),
+}
+
+_SECRET_MANAGER: Optional[SecretManager] = None
+_secret_manager_lock = threading.Lock()
+
+
+def _get_secret_manager() -> SecretManager:
+    """Return the process-wide SecretManager, building it on first use.
+
+    Key validation raises when INTEGRATIONS_SECRET_KEY is missing, so a failed
+    build is not cached and the error surfaces on every call.
+    """
+    global _SECRET_MANAGER
+    if _SECRET_MANAGER is None:
+        with _secret_manager_lock:
+            if _SECRET_MANAGER is None:
+                _SECRET_MANAGER = SecretManager()
+    return _SECRET_MANAGER
 
 
 class IntegrationSettingsService:
     """Provides CRUD, encryption, and runtime helpers for integrations."""
 
     def __init__(self) -> None:
-        self._secret_manager: Optional[SecretManager] = None
+        self._runtime_cache: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self._summary_cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+        # Serialises cache misses so concurrent requests share one DB read and
+        # decrypt instead of each doing their own.
+        self._runtime_lock = threading.Lock()
 
     @property
     def secret_manager(self) -> SecretManager:
-        if not self._secret_manager:
-            self._secret_manager = SecretManager()
-        return self._secret_manager
+        return _get_secret_manager()
 
     # ------------------------------------------------------------------
     # Public API
     # ------------------------------------------------------------------
     def get_setting_summary(self, provider: str) -> Dict[str, Any]:
         provider = self._normalize_provider(provider)
-        connection = get_db_connection()
-        if not connection:
-            raise RuntimeError("数据库连接失败")
-        try:
-            setting = repo.get_setting_by_provider(connection, provider)
+        with db_conn() as connection:
+            setting = repo.get_setting_with_active_secret(connection, provider)
             metadata = self._default_metadata(provider)
             secret_info: Dict[str, Dict[str, Any]] = {}
             status = {
@@ -53,7 +101,7 @@ class IntegrationSettingsService:
                     "last_tested_at": self._format_datetime(setting.get("last_tested_at")),
                     "last_test_message": setting.get("last_test_message"),
                 }
-                secret_info = self._build_secret_descriptor(connection, setting)
+                secret_info = self._build_secret_descriptor(setting)
             else:
                 expected = self._expected_secret_fields(provider)
                 secret_info = {field: {"configured": False} for field in expected}
@@ -63,9 +111,20 @@ class IntegrationSettingsService:
                 "secrets": secret_info,
                 "status": status,
             }
-        finally:
-            if connection:
-                connection.close()
+
+    def get_cached_setting_summary(self, provider: str) -> Dict[str, Any]:
+        """``get_setting_summary`` cached for ``RUNTIME_CREDENTIALS_TTL`` seconds.
+
+        Meant for polled endpoints such as health checks; the settings page
+        keeps reading fresh summaries.
+        """
+        provider = self._normalize_provider(provider)
+        cached = self._summary_cache.get(provider)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        summary = self.get_setting_summary(provider)
+        self._summary_cache[provider] = (time.monotonic() + RUNTIME_CREDENTIALS_TTL, summary)
+        return summary
 
     def save_settings(
         self,
@@ -76,29 +135,23 @@ class IntegrationSettingsService:
         provider = self._normalize_provider(provider)
         metadata = metadata or {}
         secrets = secrets or {}
-        connection = get_db_connection()
-        if not connection:
-            raise RuntimeError("数据库连接失败")
-        try:
-            connection.start_transaction()
-            existing = repo.get_setting_by_provider(connection, provider)
-            merged_metadata = self._merge_metadata(
-                (existing or {}).get("metadata"),
-                metadata,
-                provider,
-            )
-            setting_id = repo.upsert_setting(connection, provider, merged_metadata)
-            cleaned_secrets = self._clean_secret_values(secrets)
-            if cleaned_secrets:
-                ciphertext = self.secret_manager.encrypt_dict(cleaned_secrets)
-                version = repo.create_secret_version(connection, setting_id, ciphertext)
-                repo.update_active_secret_version(connection, setting_id, version)
-            connection.commit()
-        except Exception:
-            connection.rollback()
-            raise
-        finally:
-            connection.close()
+        with db_conn() as connection:
+            with repo.with_integration_tx(connection):
+                existing = repo.get_setting_by_provider(connection, provider)
+                merged_metadata = self._merge_metadata(
+                    (existing or {}).get("metadata"),
+                    metadata,
+                    provider,
+                )
+                setting_id = repo.upsert_setting(connection, provider, merged_metadata)
+                cleaned_secrets = self._clean_secret_values(secrets)
+                if cleaned_secrets:
+                    ciphertext = self.secret_manager.encrypt_dict(cleaned_secrets)
+                    version = repo.create_secret_version(
+                        connection, setting_id, ciphertext, cleaned_secrets.keys()
+                    )
+                    repo.update_active_secret_version(connection, setting_id, version)
+        self.invalidate_runtime_credentials(provider)
         return self.get_setting_summary(provider)
 
     def test_provider(
@@ -110,16 +163,21 @@ class IntegrationSettingsService:
         provider = self._normalize_provider(provider)
         metadata = metadata or {}
         secrets = secrets or {}
-        runtime = self._compose_runtime_config(provider, metadata, secrets)
-        persist_result = not metadata and not secrets and runtime.get("setting_id")
-        if provider == PROVIDER_SERVICENOW:
-            success, message = self._test_servicenow(runtime)
-        elif provider == PROVIDER_AI:
-            success, message = self._test_ai(runtime)
-        else:
-            raise ValueError(f"Unsupported provider: {provider}")
-        if persist_result:
-            self._persist_test_result(runtime["setting_id"], success, message)
+        # One pooled connection serves both the settings read and the
+        # test-result write.
+        with db_conn() as connection:
+            runtime = self._compose_runtime_config(provider, metadata, secrets, connection)
+            # End the read snapshot so nothing stays open during the probe.
+            connection.commit()
+            persist_result = not metadata and not secrets and runtime.get("setting_id")
+            if provider == PROVIDER_SERVICENOW:
+                success, message = self._test_servicenow(runtime)
+            elif provider == PROVIDER_AI:
+                success, message = self._test_ai(runtime)
+            else:
+                raise ValueError(f"Unsupported provider: {provider}")
+            if persist_result:
+                self._persist_test_result(runtime["setting_id"], success, message, connection)
         status_code = 200 if success else 400
         return {
             "success": success,
@@ -129,7 +187,32 @@ class IntegrationSettingsService:
         }
 
     def get_runtime_credentials(self, provider: str) -> Optional[Dict[str, Any]]:
+        """Return decrypted runtime credentials, cached for a short TTL.
+
+        The returned dict is shared between callers and must not be mutated.
+        """
+        provider = self._normalize_provider(provider)
+        cached = self._runtime_cache.get(provider)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        with self._runtime_lock:
+            cached = self._runtime_cache.get(provider)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            credentials = self._build_runtime_credentials(provider)
+            self._runtime_cache[provider] = (time.monotonic() + RUNTIME_CREDENTIALS_TTL, credentials)
+            return credentials
+
+    def invalidate_runtime_credentials(self, provider: str) -> None:
+        """Drop cached credentials so the next read goes back to the database."""
         provider = self._normalize_provider(provider)
+        self._runtime_cache.pop(provider, None)
+        self._summary_cache.pop(provider, None)
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _build_runtime_credentials(self, provider: str) -> Optional[Dict[str, Any]]:
         runtime = self._load_setting_with_secret(provider)
         if not runtime:
             return None
@@ -145,9 +228,6 @@ class IntegrationSettingsService:
             "setting_id": runtime.get("id"),
         }
 
-    # ------------------------------------------------------------------
-    # Helpers
-    # ------------------------------------------------------------------
     def _normalize_provider(self, provider: str) -> str:
         if not provider:
             raise ValueError("Provider is required")
@@ -157,29 +237,11 @@ class IntegrationSettingsService:
         return provider
 
     def _default_metadata(self, provider: str) -> Dict[str, Any]:
-        if provider == PROVIDER_SERVICENOW:
-            return {
-                "instance_url": "",
-                "username": "",
-                "default_table": "incident",
-            }
-        if provider == PROVIDER_AI:
-            return {
-                "api_provider": "openai",
-                "base_url": "https://api.openai.com/v1",
-                "model": "gpt-3.5-turbo",
-                "temperature": 0.7,
-                "max_tokens": 1000,
-                "system_prompt": "",
-            }
-        return {}
+        """Return a mutable copy of the provider defaults."""
+        return dict(_DEFAULT_METADATA.get(provider, _EMPTY_METADATA))
 
     def _expected_secret_fields(self, provider: str) -> Tuple[str, ...]:
-        if provider == PROVIDER_SERVICENOW:
-            return ("password",)
-        if provider == PROVIDER_AI:
-            return ("api_key",)
-        return ()
+        return _EXPECTED_SECRET_FIELDS.get(provider, ())
 
     def _merge_metadata(
         self,
@@ -187,50 +249,48 @@ class IntegrationSettingsService:
         updates: Dict[str, Any],
         provider: str,
     ) -> Dict[str, Any]:
-        merged = self._default_metadata(provider)
-        if existing:
-            merged.update(existing)
-        for key, value in (updates or {}).items():
+        # A None update removes the key, including a default.
+        updates = updates or {}
+        merged = {
+            **_DEFAULT_METADATA.get(provider, _EMPTY_METADATA),
+            **(existing or {}),
+            **{key: value for key, value in updates.items() if value is not None},
+        }
+        for key, value in updates.items():
             if value is None:
                 merged.pop(key, None)
-            else:
-                merged[key] = value
         return merged
 
     def _clean_secret_values(self, secrets: Dict[str, Any]) -> Dict[str, Any]:
-        cleaned: Dict[str, Any] = {}
-        for key, value in (secrets or {}).items():
-            if value is None:
-                continue
-            if isinstance(value, str) and value.strip() == "":
-                continue
-            cleaned[key] = value
-        return cleaned
+        return {
+            key: value
+            for key, value in (secrets or {}).items()
+            if value is not None and (not isinstance(value, str) or value.strip())
+        }
 
-    def _build_secret_descriptor(
-        self,
-        connection,
-        setting: Dict[str, Any],
-    ) -> Dict[str, Dict[str, Any]]:
+    def _build_secret_descriptor(self, setting: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Describe the secrets of a ``get_setting_with_active_secret`` row."""
         descriptor: Dict[str, Dict[str, Any]] = {
             field: {"configured": False}
             for field in self._expected_secret_fields(setting["provider"])
         }
-        version = setting.get("active_secret_version")
-        if not version:
-            return descriptor
-        secret_row = repo.get_secret_version(connection, setting["id"], version)
+        secret_row = setting.get("secret")
         if not secret_row:
             return descriptor
-        try:
-            decrypted = self.secret_manager.decrypt_dict(secret_row["ciphertext"])
-        except Exception as exc:  # noqa: BLE001
-            logger.error("Failed to decrypt secrets for provider %s: %s", setting["provider"], exc)
-            return descriptor
+        # The configured field names are stored next to the ciphertext; only
+        # versions saved before that column existed need a decrypt.
+        field_names = secret_row.get("field_names")
+        if field_names is None:
+            try:
+                field_names = list(self.secret_manager.decrypt_dict(secret_row["ciphertext"]))
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Failed to decrypt secrets for provider %s: %s", setting["provider"], exc)
+                return descriptor
+        configured = set(field_names)
         ts = self._format_datetime(secret_row.get("created_at"))
-        for key in set(list(descriptor.keys()) + list(decrypted.keys())):
+        for key in set(descriptor) | configured:
             descriptor[key] = {
-                "configured": key in decrypted,
+                "configured": key in configured,
                 "last_rotated_at": ts,
                 "version": secret_row.get("version"),
             }
@@ -243,30 +303,24 @@ class IntegrationSettingsService:
             return value
         return None
 
-    def _load_setting_with_secret(self, provider: str) -> Optional[Dict[str, Any]]:
-        connection = get_db_connection()
-        if not connection:
-            raise RuntimeError("数据库连接失败")
-        try:
-            setting = repo.get_setting_by_provider(connection, provider)
+    def _load_setting_with_secret(self, provider: str, connection=None) -> Optional[Dict[str, Any]]:
+        with nullcontext(connection) if connection else db_conn() as connection:
+            setting = repo.get_setting_with_active_secret(connection, provider)
             if not setting:
                 return None
-            version = setting.get("active_secret_version")
-            if version:
-                secret_row = repo.get_secret_version(connection, setting["id"], version)
-                if secret_row:
-                    setting["secrets"] = self.secret_manager.decrypt_dict(secret_row["ciphertext"])
+            secret_row = setting.pop("secret")
+            if secret_row:
+                setting["secrets"] = self.secret_manager.decrypt_dict(secret_row["ciphertext"])
             return setting
-        finally:
-            connection.close()
 
     def _compose_runtime_config(
         self,
         provider: str,
         metadata_overrides: Dict[str, Any],
         secrets_overrides: Dict[str, Any],
+        connection=None,
     ) -> Dict[str, Any]:
-        stored = self._load_setting_with_secret(provider)
+        stored = self._load_setting_with_secret(provider, connection)
         metadata = self._default_metadata(provider)
         secrets: Dict[str, Any] = {}
         if stored:
@@ -284,19 +338,15 @@ class IntegrationSettingsService:
             "setting_id": stored.get("id") if stored else None,
         }
 
-    def _persist_test_result(self, setting_id: int, success: bool, message: str) -> None:
-        connection = get_db_connection()
-        if not connection:
-            logger.warning("Skipping test result persistence due to missing DB connection")
-            return
+    def _persist_test_result(self, setting_id: int, success: bool, message: str, connection=None) -> None:
         try:
-            repo.update_test_result(connection, setting_id, "success" if success else "failed", message)
-            connection.commit()
+            with nullcontext(connection) if connection else db_conn() as connection, \
+                    repo.with_integration_tx(connection):
+                repo.update_test_result(connection, setting_id, "success" if success else "failed", message)
+            # The stored test status is part of every cached summary.
+            self._summary_cache.clear()
         except Exception:
-            connection.rollback()
             logger.exception("Failed to persist integration test result")
-        finally:
-            connection.close()
 
     # ------------------------------------------------------------------
     # Provider specific tests
@@ -309,7 +359,14 @@ class IntegrationSettingsService:
         password = secrets.get("password")
         if not instance_url or not username or not password:
             return False, "ServiceNow实例、用户名与密码均为必填项"
-        client = ServiceNowClient(instance_url=instance_url, username=username, password=password)
+        # A plain session has no retry adapter, so a bad instance URL fails
+        # within TEST_CONNECTION_TIMEOUT instead of after several retries.
+        client = ServiceNowClient(
+            instance_url=instance_url,
+            username=username,
+            password=password,
+            session=requests.Session(),
+        )
         return (True, "连接成功") if client.test_connection() else (False, "连接测试失败")
 
     def _test_ai(self, runtime: Dict[str, Any]) -> Tuple[bool, str]:
@@ -320,8 +377,37 @@ class IntegrationSettingsService:
         if not base_url or not api_key:
             return False, "AI配置缺少Base URL或API Key"
         model = metadata.get("model", "gpt-3.5-turbo")
+        # Only the status of a one-model listing is needed; the body (which
+        # can list hundreds of models) is never downloaded.
+        try:
+            with httpx.stream(
+                "GET",
+                f"{base_url.rstrip('/')}/models",
+                params={"limit": 1},
+                headers={"Authorization": f"Bearer {api_key}"},
+                timeout=AI_TEST_TIMEOUT,
+            ) as response:
+                status_code = response.status_code
+        except httpx.HTTPError as exc:
+            logger.error("AI configuration test failed: %s", exc)
+            return False, str(exc)
+        if status_code == 200:
+            logger.info("AI provider test succeeded for model %s", model)
+            return True, "AI配置测试成功"
+        if status_code in (401, 403):
+            logger.error("AI configuration test failed: HTTP %s", status_code)
+            return False, f"AI服务拒绝了API Key (HTTP {status_code})"
+        # Some providers reject the limit parameter or expose no plain
+        # /models route; fall back to the SDK listing.
         try:
-            client = OpenAI(api_key=api_key, base_url=base_url)
+            # Same budget as the probe above; the SDK default (600s, two
+            # retries) would pin the caller's DB connection for minutes.
+            client = OpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                timeout=AI_TEST_TIMEOUT,
+                max_retries=0,
+            )
             client.models.list()
             logger.info("AI provider test succeeded for model %s", model)
             return True, "AI配置测试成功"
@@ -331,3 +417,11 @@ class IntegrationSettingsService:
 
 
 integration_settings_service = IntegrationSettingsService()
+
+# Warm the Fernet key at import so the first request does not pay for it.
+# SecretManager holds no sockets or file handles, so forked workers can share
+# the instance built here.
+try:
+    _get_secret_manager()
+except ValueError as exc:
+    logger.warning("集成密钥未就绪，将在首次使用时重试: %s", exc)
@@ -1,15 +1,55 @@
 """Recommendation report service for business logic."""
 import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from textwrap import dedent
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
-from database import get_db_connection
+from config import config
+from database import db_conn, db_cursor
 from app.constants.database import TABLE_RECOMMENDATION_REPORTS
+from app.repositories.query_builder import build_placeholders
 from app.services import vulnerability_service as vuln_service
+from app.utils.cache import cache_delete, cache_get, cache_set
 
 logger = logging.getLogger(__name__)
 
+# Each report build borrows one MySQL connection at a time; the fan-out is kept
+# to a quarter of the shared pool (4 workers with the default 16).
+BATCH_REPORT_WORKERS = max(1, config.DB_POOL_SIZE // 4)
+BATCH_REPORT_MAX_CVES = 50
+# Seconds to wait for a concurrent insert of the same CVE's report to finish.
+REPORT_LOCK_TIMEOUT = 30
+# Reports list five sample devices and a few evidence paths, so only the most
+# recently seen devices are loaded rather than every affected device.
+REPORT_DEVICE_SAMPLE = 50
+
+# Report lookups polled by the UI are served from Redis; every insert drops
+# the CVE's entries, so the TTL only bounds staleness at the 7-day edge.
+REPORT_CACHE_TTL = 300
+REPORT_EXISTS_CACHE_PREFIX = "reco:exists:"
+REPORT_LATEST_CACHE_PREFIX = "reco:latest:"
+
+# Outcome of background generation, polled through /check until the report
+# exists: "pending" while queued or running, "failed" with the error after.
+# Shared through Redis so any worker can answer; the in-process records cover
+# setups without Redis.
+REPORT_STATUS_CACHE_PREFIX = "reco:status:"
+REPORT_STATUS_TTL = 600
+
+# Background generation for /generate requests that ask not to wait. Requests
+# for a CVE that is already queued join the pending job instead of adding one.
+_background_executor = ThreadPoolExecutor(
+    max_workers=BATCH_REPORT_WORKERS,
+    thread_name_prefix="rec-report",
+)
+_pending_reports: Dict[str, Future] = {}
+_failed_reports: Dict[str, Tuple[float, str]] = {}
+_pending_lock = threading.Lock()
+
 
 def check_existing_report(cve_id: str):
     """Check if a report exists for the given CVE within the last 7 days.
@@ -20,13 +60,31 @@ def check_existing_report(cve_id: str):
     Returns:
         dict: Report info if exists (id, cve_id, created_at), None otherwise
     """
-    connection = get_db_connection()
-    if not connection:
-        raise Exception("数据库连接失败")
-    
+    def _load() -> Optional[Dict]:
+        with db_conn() as connection:
+            return _find_recent_report(connection, cve_id)
+
+    return _cached_lookup(f"{REPORT_EXISTS_CACHE_PREFIX}{cve_id}", _load)
+
+
+def _cached_lookup(key: str, loader: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+    """Return ``loader()`` through Redis; "no report" results are cached too."""
+    cached = cache_get(key)
+    if cached is not None:
+        return cached.get("value")
+    value = loader()
+    cache_set(key, {"value": value}, ttl=REPORT_CACHE_TTL)
+    return value
+
+
+def _invalidate_report_cache(cve_id: str) -> None:
+    cache_delete(f"{REPORT_EXISTS_CACHE_PREFIX}{cve_id}", f"{REPORT_LATEST_CACHE_PREFIX}{cve_id}")
+
+
+def _find_recent_report(connection, cve_id: str) -> Optional[Dict]:
+    """Look up the newest report of a CVE from the last 7 days on ``connection``."""
+    cursor = connection.cursor(dictionary=True)
     try:
-        cursor = connection.cursor(dictionary=True)
-        
         # Check for reports created within last 7 days
         query = f"""
         SELECT id, cve_id, created_at
@@ -41,21 +99,17 @@ def check_existing_report(cve_id: str):
         
         if result:
             # Format datetime
-            if result.get('created_at'):
-                if isinstance(result['created_at'], datetime):
-                    result['created_at'] = result['created_at'].isoformat()
-                elif isinstance(result['created_at'], str):
-                    pass  # Already a string
+            if isinstance(result.get('created_at'), datetime):
+                result['created_at'] = result['created_at'].isoformat()
             return result
         return None
     finally:
         cursor.close()
-        connection.close()
 
 
 def build_report_from_data(cve_id: str) -> str:
     """Create a recommendation report purely from stored vulnerability data."""
-    vulnerability_data = vuln_service.get_cve_vulnerability_report_data(cve_id, device_limit=None)
+    vulnerability_data = vuln_service.get_cve_vulnerability_report_data(cve_id, device_limit=REPORT_DEVICE_SAMPLE)
     if not vulnerability_data:
         raise ValueError('未找到该CVE的漏洞数据，无法生成报告')
 
@@ -63,6 +117,215 @@ def build_report_from_data(cve_id: str) -> str:
     return _render_report_template(cve_id, summary)
 
 
+@contextmanager
+def _report_generation_lock(cve_id: str):
+    """Hold a MySQL named lock so one CVE is never generated twice at once.
+
+    Yields the connection holding the lock so the caller can run its check
+    and insert on it instead of opening further connections.
+    """
+    lock_name = f"rec_report:{cve_id}"
+    with db_conn() as connection:
+        cursor = connection.cursor()
+        try:
+            cursor.execute("SELECT GET_LOCK(%s, %s)", (lock_name, REPORT_LOCK_TIMEOUT))
+            if cursor.fetchone()[0] != 1:
+                raise RuntimeError(f"Report generation for {cve_id} is already in progress")
+            try:
+                yield connection
+            finally:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (lock_name,))
+                cursor.fetchone()
+        finally:
+            cursor.close()
+
+
+def generate_report(cve_id: str, force: bool = False) -> Dict:
+    """Build and store a report unless a recent one exists (when not forced).
+
+    The report is built before the per-CVE named lock is taken, so the lock
+    connection is never held while the vulnerability reads borrow their own.
+    The recent-report check is repeated under the lock, so concurrent
+    requests still store a single report.
+    """
+    if not force:
+        existing = check_existing_report(cve_id)
+        if existing:
+            return {"cve_id": cve_id, "success": False, "exists": True, "report": existing}
+    report_content = build_report_from_data(cve_id)
+    with _report_generation_lock(cve_id) as connection:
+        if not force:
+            existing = _find_recent_report(connection, cve_id)
+            if existing:
+                return {"cve_id": cve_id, "success": False, "exists": True, "report": existing}
+        report_id = _insert_report(connection, cve_id, report_content, '')
+    return {"cve_id": cve_id, "success": True, "report_id": report_id}
+
+
+def enqueue_report(cve_id: str, force: bool = False) -> bool:
+    """Schedule report generation in the background.
+
+    Returns False when a generation for the CVE is already pending, in which
+    case the existing job is reused.
+    """
+    with _pending_lock:
+        if cve_id in _pending_reports:
+            return False
+        _failed_reports.pop(cve_id, None)
+        cache_set(f"{REPORT_STATUS_CACHE_PREFIX}{cve_id}", {"status": "pending"}, ttl=REPORT_STATUS_TTL)
+        future = _background_executor.submit(_generate_in_background, cve_id, force)
+        _pending_reports[cve_id] = future
+    future.add_done_callback(lambda _: _forget_pending(cve_id))
+    return True
+
+
+def get_generation_status(cve_id: str) -> Optional[Dict]:
+    """Return the background generation status of a CVE, if one is known."""
+    cached = cache_get(f"{REPORT_STATUS_CACHE_PREFIX}{cve_id}")
+    if cached is not None:
+        return cached
+    with _pending_lock:
+        if cve_id in _pending_reports:
+            return {"status": "pending"}
+        failed = _failed_reports.get(cve_id)
+        if failed and failed[0] > time.monotonic():
+            return {"status": "failed", "error": failed[1]}
+    return None
+
+
+def _generate_in_background(cve_id: str, force: bool) -> None:
+    status_key = f"{REPORT_STATUS_CACHE_PREFIX}{cve_id}"
+    try:
+        result = generate_report(cve_id, force)
+        if result.get("success"):
+            logger.info("Background report for %s saved with ID %s", cve_id, result["report_id"])
+        cache_delete(status_key)
+    except Exception as exc:  # noqa: BLE001
+        logger.error("后台生成报告失败 %s: %s", cve_id, exc, exc_info=True)
+        cache_set(status_key, {"status": "failed", "error": str(exc)}, ttl=REPORT_STATUS_TTL)
+        now = time.monotonic()
+        with _pending_lock:
+            for stale_id in [key for key, (expires, _) in _failed_reports.items() if expires <= now]:
+                del _failed_reports[stale_id]
+            _failed_reports[cve_id] = (now + REPORT_STATUS_TTL, str(exc))
+
+
+def _forget_pending(cve_id: str) -> None:
+    with _pending_lock:
+        _pending_reports.pop(cve_id, None)
+
+
+def generate_reports_batch(cve_ids: Sequence[str], force: bool = False) -> List[Dict]:
+    """Generate reports for several CVEs concurrently.
+
+    Report bodies are built first on a small thread pool, since that part is
+    I/O-bound on the vulnerability reads, and no connection is held meanwhile.
+    One connection then takes the per-CVE named locks, re-checks for recent
+    reports in a single query and stores every new report with one multi-row
+    insert and commit. Failures are reported per CVE instead of aborting the
+    batch; results keep the input order.
+    """
+    unique_ids = list(dict.fromkeys(cve_id.strip() for cve_id in cve_ids if cve_id and cve_id.strip()))
+    if len(unique_ids) > BATCH_REPORT_MAX_CVES:
+        raise ValueError(f"一次最多生成 {BATCH_REPORT_MAX_CVES} 个CVE报告")
+    if not unique_ids:
+        return []
+
+    results: Dict[str, Dict] = {}
+
+    def _build(cve_id: str) -> Optional[str]:
+        try:
+            return build_report_from_data(cve_id)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Error generating report for %s: %s", cve_id, exc)
+            results[cve_id] = {"cve_id": cve_id, "success": False, "error": str(exc)}
+            return None
+
+    def _record_existing(existing: Dict[str, Dict]) -> None:
+        for cve_id, report in existing.items():
+            results[cve_id] = {"cve_id": cve_id, "success": False, "exists": True, "report": report}
+
+    existing: Dict[str, Dict] = {}
+    if not force:
+        with db_conn() as connection:
+            existing = _find_recent_reports(connection, unique_ids)
+        _record_existing(existing)
+
+    to_build = [cve_id for cve_id in unique_ids if cve_id not in existing]
+    if not to_build:
+        return [results[cve_id] for cve_id in unique_ids]
+    with ThreadPoolExecutor(max_workers=min(BATCH_REPORT_WORKERS, len(to_build))) as executor:
+        contents = dict(zip(to_build, executor.map(_build, to_build)))
+    built = sorted(cve_id for cve_id, content in contents.items() if content is not None)
+    if not built:
+        return [results[cve_id] for cve_id in unique_ids]
+
+    with db_conn() as connection:
+        cursor = connection.cursor()
+        try:
+            # Sorted so two overlapping batches take their locks in the same order.
+            # No wait here: a CVE whose report is being stored elsewhere is
+            # reported as in progress.
+            locked: List[str] = []
+            for cve_id in built:
+                cursor.execute("SELECT GET_LOCK(%s, 0)", (f"rec_report:{cve_id}",))
+                if cursor.fetchone()[0] == 1:
+                    locked.append(cve_id)
+                else:
+                    results[cve_id] = {
+                        "cve_id": cve_id,
+                        "success": False,
+                        "error": f"Report generation for {cve_id} is already in progress",
+                    }
+
+            existing = {} if force else _find_recent_reports(connection, locked)
+            _record_existing(existing)
+            rows = [(cve_id, contents[cve_id], '') for cve_id in locked if cve_id not in existing]
+            try:
+                report_ids = _insert_reports(connection, rows)
+            except Exception as exc:  # noqa: BLE001
+                report_ids = {}
+                for cve_id, _, _ in rows:
+                    results[cve_id] = {"cve_id": cve_id, "success": False, "error": str(exc)}
+            for cve_id, report_id in report_ids.items():
+                results[cve_id] = {"cve_id": cve_id, "success": True, "report_id": report_id}
+        finally:
+            cursor.execute("SELECT RELEASE_ALL_LOCKS()")
+            cursor.fetchone()
+            cursor.close()
+
+    return [results[cve_id] for cve_id in unique_ids]
+
+
+def _find_recent_reports(connection, cve_ids: Sequence[str]) -> Dict[str, Dict]:
+    """Batch form of ``_find_recent_report``: newest recent report per CVE."""
+    if not cve_ids:
+        return {}
+    cursor = connection.cursor(dictionary=True)
+    try:
+        placeholders = build_placeholders(len(cve_ids))
+        cursor.execute(
+            f"""
+            SELECT id, cve_id, created_at
+            FROM {TABLE_RECOMMENDATION_REPORTS}
+            WHERE cve_id IN ({placeholders})
+              AND created_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
+            ORDER BY created_at DESC, id DESC
+            """,
+            tuple(cve_ids),
+        )
+        reports: Dict[str, Dict] = {}
+        for row in cursor.fetchall():
+            if row['cve_id'] in reports:
+                continue
+            if isinstance(row.get('created_at'), datetime):
+                row['created_at'] = row['created_at'].isoformat()
+            reports[row['cve_id']] = row
+        return reports
+    finally:
+        cursor.close()
+
+
 def _build_report_summary_from_payload(vulnerability_data: Dict) -> Dict:
     """Convert API payload into template-friendly summary."""
     summary = vulnerability_data.get('summary') or {}
@@ -184,13 +447,14 @@ def save_report(cve_id: str, report_content: str, ai_prompt: str = ''):
     Returns:
         int: Report ID
     """
-    connection = get_db_connection()
-    if not connection:
-        raise Exception("数据库连接失败")
-    
+    with db_conn() as connection:
+        return _insert_report(connection, cve_id, report_content, ai_prompt)
+
+
+def _insert_report(connection, cve_id: str, report_content: str, ai_prompt: str = '') -> int:
+    """Insert and commit one report on ``connection``, returning its ID."""
+    cursor = connection.cursor()
     try:
-        cursor = connection.cursor()
-        
         query = f"""
         INSERT INTO {TABLE_RECOMMENDATION_REPORTS} (cve_id, report_content, ai_prompt)
         VALUES (%s, %s, %s)
@@ -199,43 +463,95 @@ def save_report(cve_id: str, report_content: str, ai_prompt: str = ''):
         connection.commit()
         
         report_id = cursor.lastrowid
-        logger.info(f"Saved report for CVE {cve_id} with ID {report_id}")
+        logger.info("Saved report for CVE %s with ID %s", cve_id, report_id)
+        _invalidate_report_cache(cve_id)
         
         return report_id
     except Exception as e:
-        logger.error(f"Error saving report: {e}", exc_info=True)
+        logger.error("Error saving report: %s", e, exc_info=True)
         connection.rollback()
         raise
     finally:
         cursor.close()
-        connection.close()
 
 
-def get_report_history(limit: int = 50, offset: int = 0):
+def _insert_reports(connection, rows: Sequence[Tuple[str, str, str]]) -> Dict[str, int]:
+    """Insert ``(cve_id, report_content, ai_prompt)`` rows in one transaction.
+
+    Returns the new report ID per CVE. Callers must hold the CVEs' report
+    locks, so the newest ID of each CVE right after the commit is ours.
+    """
+    if not rows:
+        return {}
+    cursor = connection.cursor()
+    try:
+        cursor.executemany(
+            f"""
+            INSERT INTO {TABLE_RECOMMENDATION_REPORTS} (cve_id, report_content, ai_prompt)
+            VALUES (%s, %s, %s)
+            """,
+            list(rows),
+        )
+        connection.commit()
+        cve_ids = [row[0] for row in rows]
+        placeholders = build_placeholders(len(cve_ids))
+        cursor.execute(
+            f"""
+            SELECT cve_id, MAX(id)
+            FROM {TABLE_RECOMMENDATION_REPORTS}
+            WHERE cve_id IN ({placeholders})
+            GROUP BY cve_id
+            """,
+            tuple(cve_ids),
+        )
+        report_ids = {cve_id: report_id for cve_id, report_id in cursor.fetchall()}
+        logger.info("Saved %s reports in one batch", len(report_ids))
+        for cve_id in cve_ids:
+            _invalidate_report_cache(cve_id)
+        return report_ids
+    except Exception as e:
+        logger.error("Error saving report batch: %s", e, exc_info=True)
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def get_report_history(limit: int = 50, offset: int = 0, before_id: Optional[int] = None):
     """Get report history.
     
     Args:
         limit: Maximum number of reports to return
-        offset: Offset for pagination
+        offset: Offset for pagination (ignored when ``before_id`` is given)
+        before_id: Keyset cursor; return reports older than this report ID
         
     Returns:
-        list: List of reports
+        tuple: (reports, has_more). One extra row is fetched to detect a
+        further page, so no COUNT(*) over the table is needed.
     """
-    connection = get_db_connection()
-    if not connection:
-        raise Exception("数据库连接失败")
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
-        query = f"""
-        SELECT id, cve_id, report_content, ai_prompt, created_at, updated_at
-        FROM {TABLE_RECOMMENDATION_REPORTS}
-        ORDER BY created_at DESC
-        LIMIT %s OFFSET %s
-        """
-        cursor.execute(query, (limit, offset))
+    with db_cursor(dictionary=True) as cursor:
+        # IDs are auto-increment, so ordering by the primary key matches
+        # creation order and lets the keyset cursor seek instead of skipping.
+        if before_id is not None:
+            query = f"""
+            SELECT id, cve_id, report_content, ai_prompt, created_at, updated_at
+            FROM {TABLE_RECOMMENDATION_REPORTS}
+            WHERE id < %s
+            ORDER BY id DESC
+            LIMIT %s
+            """
+            cursor.execute(query, (before_id, limit + 1))
+        else:
+            query = f"""
+            SELECT id, cve_id, report_content, ai_prompt, created_at, updated_at
+            FROM {TABLE_RECOMMENDATION_REPORTS}
+            ORDER BY id DESC
+            LIMIT %s OFFSET %s
+            """
+            cursor.execute(query, (limit + 1, offset))
         results = cursor.fetchall()
+        has_more = len(results) > limit
+        results = results[:limit]
         
         # Format datetime fields
         for row in results:
@@ -244,10 +560,7 @@ def get_report_history(limit: int = 50, offset: int = 0):
             if row.get('updated_at') and isinstance(row['updated_at'], datetime):
                 row['updated_at'] = row['updated_at'].isoformat()
         
-        return results
-    finally:
-        cursor.close()
-        connection.close()
+        return results, has_more
 
 
 def get_report_by_id(report_id: int):
@@ -259,13 +572,7 @@ def get_report_by_id(report_id: int):
     Returns:
         dict: Report data or None if not found
     """
-    connection = get_db_connection()
-    if not connection:
-        raise Exception("数据库连接失败")
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
+    with db_cursor(dictionary=True) as cursor:
         query = f"""
         SELECT id, cve_id, report_content, ai_prompt, created_at, updated_at
         FROM {TABLE_RECOMMENDATION_REPORTS}
@@ -282,9 +589,20 @@ def get_report_by_id(report_id: int):
                 result['updated_at'] = result['updated_at'].isoformat()
         
         return result
-    finally:
-        cursor.close()
-        connection.close()
+
+
+def get_report_cve_id(report_id: int) -> Optional[str]:
+    """Return only the CVE ID of a report (None if the report does not exist).
+
+    Avoids loading the report body when callers just need to resolve the CVE.
+    """
+    with db_cursor() as cursor:
+        cursor.execute(
+            f"SELECT cve_id FROM {TABLE_RECOMMENDATION_REPORTS} WHERE id = %s",
+            (report_id,),
+        )
+        row = cursor.fetchone()
+        return (row[0] or '') if row else None
 
 
 def get_report_by_cve_id(cve_id: str):
@@ -296,13 +614,11 @@ def get_report_by_cve_id(cve_id: str):
     Returns:
         dict: Report data or None if not found
     """
-    connection = get_db_connection()
-    if not connection:
-        raise Exception("数据库连接失败")
-    
-    try:
-        cursor = connection.cursor(dictionary=True)
-        
+    return _cached_lookup(f"{REPORT_LATEST_CACHE_PREFIX}{cve_id}", lambda: _load_latest_report(cve_id))
+
+
+def _load_latest_report(cve_id: str) -> Optional[Dict]:
+    with db_cursor(dictionary=True) as cursor:
         query = f"""
         SELECT id, cve_id, report_content, ai_prompt, created_at, updated_at
         FROM {TABLE_RECOMMENDATION_REPORTS}
@@ -321,6 +637,3 @@ def get_report_by_cve_id(cve_id: str):
                 result['updated_at'] = result['updated_at'].isoformat()
         
         return result
-    finally:
-        cursor.close()
-        connection.close()
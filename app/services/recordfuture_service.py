@@ -4,6 +4,7 @@ from typing import Dict, List
 
 from database import get_db_connection
 from app.constants.database import TABLE_VULNERABILITIES
+from app.repositories.query_builder import build_placeholders
 from app.repositories.recordfuture_repository import (
     bulk_upsert_indicators,
     fetch_indicator_values_by_type,
@@ -39,7 +40,7 @@ def _apply_recordfuture_detection_flags(connection, cves: List[str]) -> None:
         batch_size = 500
         for index in range(0, len(normalized), batch_size):
             batch = normalized[index:index + batch_size]
-            placeholders = ','.join(['%s'] * len(batch))
+            placeholders = build_placeholders(len(batch))
             cursor.execute(
                 f"""
                 UPDATE {TABLE_VULNERABILITIES}
@@ -2,6 +2,7 @@
 import logging
 from datetime import datetime
 from database import get_db_connection
+from app.utils.cache import local_ttl_cache
 from app.utils.formatters import format_datetime_fields
 from app.constants.database import (
     TABLE_VULNERABILITY_SNAPSHOTS,
@@ -38,7 +39,7 @@ def create_initial_snapshot():
         else:
             raise Exception('Failed to create initial snapshot')
     except ImportError as e:
-        logger.error(f"导入defender模块失败: {e}")
+        logger.error("导入defender模块失败: %s", e)
         raise Exception(f'Import error: {str(e)}')
     finally:
         if connection and connection.is_connected():
@@ -256,6 +257,7 @@ def get_cve_history(cve_id):
         connection.close()
 
 
+@local_ttl_cache(60)
 def get_snapshots_trend():
     """Get snapshot trend data for line chart.
     
@@ -2,16 +2,19 @@
 import json
 import logging
 import threading
-from typing import List, Optional
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, FrozenSet, List, Optional, Tuple
 from mysql.connector import Error
 from database import get_db_connection
-from app.utils.cache import get_cache_client
+from app.utils.cache import clear_local_caches, get_cache_client
 from app.services.sync_sources import (
     get_default_source_keys,
     get_sync_source_map,
     get_sync_sources,
 )
 from app.services import trend_service
+from app.services import vulnerability_service as vuln_service
 from app.services.sync_sources.base import SyncSource, SyncSourceResult
 
 logger = logging.getLogger(__name__)
@@ -19,6 +22,15 @@ logger = logging.getLogger(__name__)
 # Global sync status
 sync_in_progress = False
 
+# Syncs run one at a time on a dedicated worker so request threads only
+# enqueue them.
+_sync_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sync")
+
+# Single-flight registry: callers asking for a source set that is already
+# queued or running join that job instead of starting another one.
+_inflight: Dict[FrozenSet[str], Tuple[str, Future]] = {}
+_inflight_lock = threading.Lock()
+
 # Global sync progress tracking
 sync_progress = {
     'stage': '',
@@ -26,11 +38,17 @@ sync_progress = {
     'message': '',
     'is_complete': False,
     'is_syncing': False,
-    'sources': []
+    'sources': [],
+    'job_id': None
 }
 
 SYNC_PROGRESS_CACHE_KEY = "sync:progress"
 
+# MySQL named lock held for the whole job, so with several app workers only
+# one of them syncs at a time; it is released automatically if that worker's
+# connection dies.
+SYNC_LOCK_NAME = "vm:sync"
+
 
 def list_sync_sources():
     """Return available sync sources for UI consumption."""
@@ -203,7 +221,8 @@ def get_sync_progress():
         'message': source.get('message', ''),
         'is_complete': source.get('is_complete', False),
         'is_syncing': source.get('is_syncing', sync_in_progress),
-        'sources': source.get('sources', [])
+        'sources': source.get('sources', []),
+        'job_id': source.get('job_id')
     }
 
 
@@ -224,32 +243,111 @@ def _resolve_selected_sources(data_sources: Optional[List[str]]) -> List[SyncSou
     return sorted(selected)
 
 
+def _acquire_sync_lock():
+    """Take the cross-process sync lock without waiting.
+
+    Returns the connection holding it, or None when another process holds it.
+    """
+    connection = get_db_connection()
+    if not connection:
+        raise Exception("数据库连接失败")
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT GET_LOCK(%s, 0)", (SYNC_LOCK_NAME,))
+        acquired = cursor.fetchone()[0] == 1
+    except Exception:
+        connection.close()
+        raise
+    finally:
+        cursor.close()
+    if acquired:
+        return connection
+    connection.close()
+    return None
+
+
+def _release_sync_lock(connection) -> None:
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT RELEASE_LOCK(%s)", (SYNC_LOCK_NAME,))
+        cursor.fetchone()
+    except Error as exc:
+        logger.warning("释放同步锁失败: %s", exc)
+    finally:
+        cursor.close()
+        connection.close()
+
+
 def trigger_sync(data_sources: Optional[List[str]] = None):
-    """Trigger modular data sync in background thread."""
-    global sync_in_progress
-    if sync_in_progress:
-        raise Exception('Sync is already in progress. Please wait for it to complete.')
+    """Queue a modular data sync on the background sync worker.
 
+    Returns immediately with a ``job_id`` that is echoed by
+    ``get_sync_progress`` while the job runs. A request for the same source
+    set as the running job joins it and gets that job's id back; while
+    another worker process syncs, its job id (from the shared progress
+    cache) is returned instead.
+    """
+    global sync_in_progress
     selected_sources = _resolve_selected_sources(data_sources)
-    sync_in_progress = True
-    _initialize_source_states(selected_sources)
-    _set_progress('initializing', 0, 'Starting sync...', is_complete=False, is_syncing=True)
+    source_keys = [source.key for source in selected_sources]
+    inflight_key = frozenset(source_keys)
+
+    with _inflight_lock:
+        existing = _inflight.get(inflight_key)
+        if existing:
+            return {
+                'message': 'Sync already running',
+                'status': 'running',
+                'job_id': existing[0],
+                'data_sources': source_keys
+            }
+        if sync_in_progress:
+            raise Exception('Sync is already in progress. Please wait for it to complete.')
+
+        lock_connection = _acquire_sync_lock()
+        if lock_connection is None:
+            holder = _load_progress_from_cache() or {}
+            return {
+                'message': 'Sync already running',
+                'status': 'running',
+                'job_id': holder.get('job_id'),
+                'data_sources': source_keys
+            }
 
-    def run_sync():
-        _run_sync_job(selected_sources)
+        sync_in_progress = True
+        job_id = uuid.uuid4().hex
+        sync_progress['job_id'] = job_id
+        _initialize_source_states(selected_sources)
+        _set_progress('initializing', 0, 'Starting sync...', is_complete=False, is_syncing=True)
 
-    thread = threading.Thread(target=run_sync, daemon=True)
-    thread.start()
+        try:
+            future = _sync_executor.submit(_run_sync_job, selected_sources, lock_connection)
+        except Exception:
+            sync_in_progress = False
+            _release_sync_lock(lock_connection)
+            raise
+        _inflight[inflight_key] = (job_id, future)
+    future.add_done_callback(lambda _: _forget_inflight(inflight_key))
     return {
         'message': 'Sync started',
-        'data_sources': [source.key for source in selected_sources]
+        'status': 'queued',
+        'job_id': job_id,
+        'data_sources': source_keys
     }
 
 
-def _run_sync_job(selected_sources: List[SyncSource]):
-    """Execute sync sources sequentially."""
+def _forget_inflight(inflight_key: FrozenSet[str]):
+    with _inflight_lock:
+        _inflight.pop(inflight_key, None)
+
+
+def _run_sync_job(selected_sources: List[SyncSource], lock_connection):
+    """Execute sync sources sequentially, then release the sync lock."""
     global sync_in_progress
     total = len(selected_sources)
+    # Every source writes to the vulnerabilities table, so cve_summary must be
+    # rebuilt once any of them has succeeded, even if a later one fails.
+    vulnerabilities_changed = False
     try:
         for index, source in enumerate(selected_sources):
             start_progress = int((index / total) * 100)
@@ -259,6 +357,7 @@ def _run_sync_job(selected_sources: List[SyncSource]):
                 result: Optional[SyncSourceResult] = source.runner()
                 if result and not result.success:
                     raise Exception(result.message or 'Sync source reported failure')
+                vulnerabilities_changed = True
                 success_message = (result.message if result else '') or 'Completed successfully'
                 _update_source_state(source.key, 'success', success_message)
                 end_progress = int(((index + 1) / total) * 100)
@@ -270,9 +369,17 @@ def _run_sync_job(selected_sources: List[SyncSource]):
                 return
 
         _refresh_dashboard_trends()
+        _refresh_cve_summaries()
+        clear_local_caches()
+        vulnerabilities_changed = False
         _set_progress('complete', 100, 'Sync completed successfully', is_complete=True, is_syncing=False)
     finally:
+        # Reached with the flag still set only when a later source failed.
+        if vulnerabilities_changed:
+            _refresh_cve_summaries()
+            clear_local_caches()
         sync_in_progress = False
+        _release_sync_lock(lock_connection)
 
 
 def _refresh_dashboard_trends():
@@ -282,3 +389,12 @@ def _refresh_dashboard_trends():
         logger.info("Dashboard trend periods refreshed (updated=%s)", updated)
     except Exception as exc:  # pragma: no cover - defensive logging only
         logger.warning("Failed to refresh dashboard trends post-sync: %s", exc)
+
+
+def _refresh_cve_summaries():
+    """Rebuild per-CVE report aggregates after any source changed the data."""
+    try:
+        written = vuln_service.refresh_cve_summaries()
+        logger.info("CVE summaries refreshed (cves=%s)", written)
+    except Exception as exc:  # pragma: no cover - defensive logging only
+        logger.warning("Failed to refresh CVE summaries post-sync: %s", exc)
@@ -11,6 +11,7 @@ from app.constants.database import (
     TABLE_RAPID_VULNERABILITIES,
     TABLE_NUCLEI_VULNERABILITIES,
 )
+from app.repositories.query_builder import build_placeholders
 
 logger = logging.getLogger(__name__)
 
@@ -137,7 +138,7 @@ def _fetch_local_stats(cursor, cves: Set[str]) -> List[Dict]:
     stats: List[Dict] = []
     cve_list = [cve.upper() for cve in cves if cve]
     for batch in _chunk(cve_list):
-        placeholders = ",".join(["%s"] * len(batch))
+        placeholders = build_placeholders(len(batch))
         query = f"""
             SELECT 
                 cve_id,
@@ -209,7 +210,7 @@ def _apply_detection_flag(cursor, column: str, cves: Sequence[str]):
     if not cves:
         return
     for batch in _chunk(list(cves)):
-        placeholders = ",".join(["%s"] * len(batch))
+        placeholders = build_placeholders(len(batch))
         cursor.execute(
             f"UPDATE {TABLE_VULNERABILITIES} SET {column} = TRUE WHERE cve_id IN ({placeholders})",
             batch,
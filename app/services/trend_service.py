@@ -1,6 +1,7 @@
 """Dashboard trend rollup utilities."""
 import json
 import logging
+import time
 from bisect import bisect_right
 from calendar import monthrange
 from dataclasses import dataclass
@@ -12,14 +13,20 @@ from app.constants.database import (
     TABLE_VULNERABILITY_SNAPSHOTS,
     TABLE_VULNERABILITY_TREND_PERIODS,
 )
+from app.repositories.query_builder import build_placeholders
 from app.utils.cache import cache_get, cache_set
 
 logger = logging.getLogger(__name__)
 
 PeriodType = str
 SUPPORTED_PERIODS: Tuple[PeriodType, ...] = ("week", "month", "year")
+SUPPORTED_PERIOD_SET = frozenset(SUPPORTED_PERIODS)
 TREND_CACHE_PREFIX = "dashboard:trend-periods"
 TREND_CACHE_TTL = 300
+# Short in-process layer in front of Redis for dashboard polling.
+LOCAL_TREND_CACHE_TTL = 30
+
+_local_trend_cache: Dict[Tuple[PeriodType, ...], Tuple[float, Dict[PeriodType, List[Dict[str, int]]]]] = {}
 
 
 @dataclass
@@ -84,6 +91,7 @@ def refresh_trend_periods(period_types: Optional[Sequence[PeriodType]] = None, r
             updated += 1
 
         connection.commit()
+        _local_trend_cache.clear()
         return updated
     finally:
         if connection and connection.is_connected():
@@ -100,8 +108,12 @@ def fetch_trend_payload(
     target_periods = _normalize_periods(period_types)
     cache_key = _build_cache_key(target_periods)
     if use_cache:
+        local = _local_trend_cache.get(target_periods)
+        if local and local[0] > time.monotonic():
+            return local[1]
         cached = cache_get(cache_key)
         if cached:
+            _local_trend_cache[target_periods] = (time.monotonic() + LOCAL_TREND_CACHE_TTL, cached)
             return cached
 
     trends = get_trend_periods(target_periods)
@@ -115,6 +127,7 @@ def fetch_trend_payload(
 
     if use_cache:
         cache_set(cache_key, normalized, ttl=TREND_CACHE_TTL)
+        _local_trend_cache[target_periods] = (time.monotonic() + LOCAL_TREND_CACHE_TTL, normalized)
     return normalized
 
 
@@ -136,7 +149,7 @@ def get_trend_periods(period_types: Optional[Sequence[PeriodType]] = None) -> Di
 
     try:
         cursor = connection.cursor(dictionary=True)
-        placeholders = ",".join(["%s"] * len(target_periods))
+        placeholders = build_placeholders(len(target_periods))
         query = f"""
         SELECT period_type, data_points
         FROM {TABLE_VULNERABILITY_TREND_PERIODS}
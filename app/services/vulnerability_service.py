@@ -1,16 +1,20 @@
 """Vulnerability service for business logic."""
+import base64
 import json
 import logging
+from collections import Counter
 from datetime import datetime
-from typing import Dict, Optional, List
+from decimal import Decimal
+from typing import Dict, Optional, List, Tuple
 from database import get_db_connection
 from app.utils.formatters import format_datetime_fields
-from app.utils.cache import cache_get, cache_set
+from app.utils.cache import cache_get, cache_set, local_ttl_cache
 from app.repositories import vulnerability_repository as vuln_repo
 from app.integrations.nvd import fetch_cve_description
 from app.services import device_tag_service
 from app.constants.database import (
     TABLE_VULNERABILITIES,
+    TABLE_DEVICE_TAG_SUMMARY,
     TABLE_CVE_DEVICE_SNAPSHOTS,
     TABLE_VULNERABILITY_SNAPSHOTS
 )
@@ -19,9 +23,35 @@ logger = logging.getLogger(__name__)
 
 STATISTICS_CACHE_KEY = "stats:overview"
 STATISTICS_CACHE_TTL = 300
+BULK_SUMMARY_MAX_CVES = 100
+# Dashboard feeders only change on sync, which clears these caches.
+DASHBOARD_LOCAL_CACHE_TTL = 60
+VULNERABILITY_COUNT_CACHE_SIZE = 256
+
+
+def _encode_page_cursor(row: Dict) -> str:
+    """Encode the sort keys of the last row into an opaque page cursor."""
+    seen = row.get('sort_seen')
+    payload = [
+        str(row.get('sort_cvss')),
+        seen.isoformat() if isinstance(seen, datetime) else str(seen),
+        row.get('cve_id'),
+    ]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_page_cursor(token: str) -> Tuple[Decimal, datetime, str]:
+    """Decode a page cursor produced by ``_encode_page_cursor``."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cvss, seen, cve_id = json.loads(base64.urlsafe_b64decode(padded))
+        return Decimal(cvss), datetime.fromisoformat(seen), str(cve_id)
+    except Exception as exc:  # noqa: BLE001
+        raise ValueError("无效的分页游标") from exc
 
 
-def get_vulnerabilities(filters=None, page=1, per_page=50, vuln_id=None):
+def get_vulnerabilities(filters=None, page=1, per_page=50, vuln_id=None, cursor=None):
     """Get paginated vulnerability list with filters.
     
     Args:
@@ -29,10 +59,24 @@ def get_vulnerabilities(filters=None, page=1, per_page=50, vuln_id=None):
         page (int): Page number
         per_page (int): Items per page
         vuln_id (str): Specific vulnerability ID (optional)
+        cursor (str): ``next_cursor`` from a previous page (optional)
     
     Returns:
-        dict: Response with data, total, page, per_page, total_pages
+        dict: Response with data, total, page, per_page, total_pages, next_cursor
     """
+    cursor_after = _decode_page_cursor(cursor) if cursor else None
+    total = get_vulnerability_count(filters, vuln_id)
+    if not cursor_after and (page - 1) * per_page >= total:
+        # Past the last page: nothing to fetch.
+        return {
+            'data': [],
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'total_pages': (total + per_page - 1) // per_page,
+            'next_cursor': None
+        }
+
     connection = get_db_connection()
     if not connection:
         raise Exception("数据库连接失败")
@@ -43,10 +87,18 @@ def get_vulnerabilities(filters=None, page=1, per_page=50, vuln_id=None):
             filters=filters,
             page=page,
             per_page=per_page,
-            vuln_id=vuln_id
+            vuln_id=vuln_id,
+            cursor_after=cursor_after,
+            total=total
         )
         
+        next_cursor = None
+        if records and len(records) == per_page:
+            next_cursor = _encode_page_cursor(records[-1])
+        
         for row in records:
+            row.pop('sort_cvss', None)
+            row.pop('sort_seen', None)
             row['metasploit_detected'] = bool(row.get('metasploit_detected'))
             row['nuclei_detected'] = bool(row.get('nuclei_detected'))
             row['recordfuture_detected'] = bool(row.get('recordfuture_detected'))
@@ -61,12 +113,31 @@ def get_vulnerabilities(filters=None, page=1, per_page=50, vuln_id=None):
             'total': total,
             'page': page,
             'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
+            'total_pages': (total + per_page - 1) // per_page,
+            'next_cursor': next_cursor
         }
     finally:
         connection.close()
 
 
+def get_vulnerability_count(filters=None, vuln_id=None) -> int:
+    """Count CVEs matching the list filters, cached briefly per filter set."""
+    filter_key = json.dumps([filters or {}, vuln_id], sort_keys=True, separators=(',', ':'))
+    return _cached_vulnerability_count(filter_key)
+
+
+@local_ttl_cache(DASHBOARD_LOCAL_CACHE_TTL, maxsize=VULNERABILITY_COUNT_CACHE_SIZE)
+def _cached_vulnerability_count(filter_key: str) -> int:
+    filters, vuln_id = json.loads(filter_key)
+    connection = get_db_connection()
+    if not connection:
+        raise Exception("数据库连接失败")
+    try:
+        return vuln_repo.count_vulnerabilities(connection, filters or None, vuln_id)
+    finally:
+        connection.close()
+
+
 def get_cve_vulnerability_report_data(cve_id: str, device_limit: Optional[int] = 50):
     """Assemble device-level vulnerability data for CVE reports."""
     if not cve_id:
@@ -77,11 +148,25 @@ def get_cve_vulnerability_report_data(cve_id: str, device_limit: Optional[int] =
         raise Exception("数据库连接失败")
 
     try:
-        vulnerabilities = vuln_repo.get_vulnerabilities_by_cve(connection, cve_id)
-        if not vulnerabilities:
+        # Counts and distributions come from the cve_summary table refreshed
+        # after each sync, falling back to aggregating in MySQL for CVEs not
+        # materialised yet; only the rows of the returned devices are fetched.
+        latest = vuln_repo.get_latest_cve_row(connection, cve_id)
+        if not latest:
             return None
+        summary = vuln_repo.get_cve_summary(connection, cve_id)
+        if summary:
+            totals = summary
+            os_distribution = summary['os_distribution'] or {}
+            dept_distribution = summary['department_distribution'] or {}
+        else:
+            totals = vuln_repo.get_cve_report_totals(connection, cve_id)
+            os_distribution, dept_distribution = _fold_distribution_buckets(
+                vuln_repo.get_cve_distribution_buckets(connection, cve_id)
+            )
+        device_rows = vuln_repo.get_cve_device_rows(connection, cve_id, device_limit)
 
-        description = vulnerabilities[0].get('cve_description')
+        description = latest.get('cve_description')
         if not description:
             fetched_description = fetch_cve_description(cve_id)
             if fetched_description:
@@ -91,33 +176,85 @@ def get_cve_vulnerability_report_data(cve_id: str, device_limit: Optional[int] =
                 except Exception as update_error:
                     logger.warning("Failed to persist fetched description for %s: %s", cve_id, update_error)
 
-        aggregation = _aggregate_device_vulnerabilities(vulnerabilities)
-        affected_devices = aggregation['affected_devices']
-        if device_limit is not None:
-            affected_devices = affected_devices[:device_limit]
+        affected_devices = _merge_device_rows(device_rows)
 
         summary_payload = {
-            'total_affected_hosts': aggregation['total_devices'],
-            'os_distribution': aggregation['os_distribution'],
-            'department_distribution': aggregation['dept_distribution'],
-            'cvss_score': aggregation['cvss_score'],
-            'severity': aggregation['severity']
+            'total_affected_hosts': int(totals['total_devices']),
+            'os_distribution': os_distribution,
+            'department_distribution': dept_distribution,
+            'cvss_score': latest.get('cvss_score'),
+            'severity': latest.get('vulnerability_severity_level')
         }
 
         return {
             'cve_id': cve_id,
             'summary': summary_payload,
-            'software': aggregation['software'],
+            'software': {
+                'vendor': latest.get('software_vendor') or '',
+                'name': latest.get('software_name') or '',
+                'version': latest.get('software_version') or ''
+            },
             'affected_devices': affected_devices,
-            'evidence': aggregation['evidence'],
-            'remediation': aggregation['remediation'],
+            'evidence': {
+                'disk_paths': _collect_unique_paths(affected_devices, 'disk_paths', limit=10),
+                'registry_paths': _collect_unique_paths(affected_devices, 'registry_paths', limit=10)
+            },
+            'remediation': {
+                'security_update_available': _coerce_bool(latest.get('security_update_available')),
+                'recommended_security_update': latest.get('recommended_security_update') or '',
+                'recommended_security_update_id': latest.get('recommended_security_update_id') or '',
+                'recommended_security_update_url': latest.get('recommended_security_update_url') or '',
+                'recommendation_reference': latest.get('recommendation_reference') or ''
+            },
             'description': description or None,
-            'total_vulnerabilities': aggregation['total_vulnerabilities']
+            'total_vulnerabilities': int(totals['total_vulnerabilities'])
         }
     finally:
         connection.close()
 
 
+def get_cve_summaries_bulk(cve_ids: List[str]) -> Dict[str, Dict]:
+    """Return the report ``summary`` block of several CVEs in one round trip.
+
+    CVEs not materialised in cve_summary yet are aggregated live; unknown
+    CVEs are left out of the result.
+    """
+    cve_ids = list(dict.fromkeys(cve_id.strip() for cve_id in cve_ids if cve_id and cve_id.strip()))
+    if len(cve_ids) > BULK_SUMMARY_MAX_CVES:
+        raise ValueError(f"一次最多查询 {BULK_SUMMARY_MAX_CVES} 个CVE")
+    if not cve_ids:
+        return {}
+
+    connection = get_db_connection()
+    if not connection:
+        raise Exception("数据库连接失败")
+
+    try:
+        rows = vuln_repo.get_cve_summaries(connection, cve_ids)
+        summaries = {}
+        for cve_id, row in rows.items():
+            if row['total_devices'] is None:
+                totals = vuln_repo.get_cve_report_totals(connection, cve_id)
+                os_distribution, dept_distribution = _fold_distribution_buckets(
+                    vuln_repo.get_cve_distribution_buckets(connection, cve_id)
+                )
+            else:
+                totals = row
+                os_distribution = row['os_distribution'] or {}
+                dept_distribution = row['department_distribution'] or {}
+            summaries[cve_id] = {
+                'total_affected_hosts': int(totals['total_devices']),
+                'total_vulnerabilities': int(totals['total_vulnerabilities']),
+                'os_distribution': os_distribution,
+                'department_distribution': dept_distribution,
+                'cvss_score': row.get('cvss_score'),
+                'severity': row.get('severity')
+            }
+        return summaries
+    finally:
+        connection.close()
+
+
 def get_patchthis_vulnerabilities(limit: Optional[int] = None, vendor_scope: Optional[str] = None):
     """Get high-priority vulnerabilities for PatchThis table."""
     connection = get_db_connection()
@@ -139,6 +276,7 @@ def get_patchthis_vulnerabilities(limit: Optional[int] = None, vendor_scope: Opt
         connection.close()
 
 
+@local_ttl_cache(DASHBOARD_LOCAL_CACHE_TTL)
 def get_statistics():
     """Get vulnerability statistics for charts.
     
@@ -270,6 +408,7 @@ def get_statistics():
         connection.close()
 
 
+@local_ttl_cache(DASHBOARD_LOCAL_CACHE_TTL)
 def get_unique_cve_count():
     """Get count of unique CVE IDs.
     
@@ -300,6 +439,7 @@ def get_unique_cve_count():
         connection.close()
 
 
+@local_ttl_cache(DASHBOARD_LOCAL_CACHE_TTL)
 def get_severity_counts():
     """Get vulnerability counts by severity level.
     
@@ -434,10 +574,10 @@ def get_fixed_vulnerabilities(limit: int = 50):
             WHERE snapshot_id = %s
         """, (previous_snapshot_id,))
         snapshot_records_count = cursor.fetchone()['count']
-        logger.info(f"Found {snapshot_records_count} CVE-Device combinations in previous snapshot")
+        logger.info("Found %s CVE-Device combinations in previous snapshot", snapshot_records_count)
         
         if snapshot_records_count == 0:
-            logger.warning(f"No CVE-Device combinations found in snapshot {previous_snapshot_id}")
+            logger.warning("No CVE-Device combinations found in snapshot %s", previous_snapshot_id)
             return []
         
         # Get fixed vulnerabilities: exist in previous snapshot but not in current vulnerabilities (latest data)
@@ -467,7 +607,7 @@ def get_fixed_vulnerabilities(limit: int = 50):
         )
         results = cursor.fetchall()
         
-        logger.info(f"Found {len(results)} fixed vulnerabilities (limit: {limit})")
+        logger.info("Found %s fixed vulnerabilities (limit: %s)", len(results), limit)
         
         # Format datetime fields
         for row in results:
@@ -476,7 +616,7 @@ def get_fixed_vulnerabilities(limit: int = 50):
         
         return results
     except Exception as e:
-        logger.error(f"Error getting fixed vulnerabilities: {e}", exc_info=True)
+        logger.error("Error getting fixed vulnerabilities: %s", e, exc_info=True)
         return []
     finally:
         cursor.close()
@@ -518,99 +658,49 @@ def get_catalog_details(cve_id: str) -> Optional[Dict]:
         connection.close()
 
 
-def _aggregate_device_vulnerabilities(vulnerabilities: List[Dict]) -> Dict:
-    """Normalize device-level records and compute aggregation stats."""
-    device_map: Dict[str, Dict] = {}
-    os_distribution: Dict[str, int] = {}
-    dept_distribution: Dict[str, int] = {}
+def refresh_cve_summaries() -> int:
+    """Rebuild the per-CVE report aggregates; returns the number of CVEs."""
+    connection = get_db_connection()
+    if not connection:
+        raise Exception("数据库连接失败")
+    try:
+        return vuln_repo.refresh_cve_summaries(connection)
+    finally:
+        connection.close()
 
-    for vuln in vulnerabilities:
-        os_platform = vuln.get('os_platform') or 'Unknown'
-        if isinstance(os_platform, str):
-            os_platform = os_platform.strip() or 'Unknown'
-        dept = vuln.get('rbac_group_name') or 'Unknown'
-        if isinstance(dept, str):
-            dept = dept.strip() or 'Unknown'
 
-        os_distribution[os_platform] = os_distribution.get(os_platform, 0) + 1
-        dept_distribution[dept] = dept_distribution.get(dept, 0) + 1
+def _fold_distribution_buckets(buckets: List[Dict]) -> Tuple[Dict[str, int], Dict[str, int]]:
+    """Fold (OS platform, RBAC group) bucket counts into the two distributions."""
+    os_distribution: Counter = Counter()
+    dept_distribution: Counter = Counter()
+    for bucket in buckets:
+        count = int(bucket['count'])
+        os_distribution[bucket['os_platform']] += count
+        dept_distribution[bucket['rbac_group_name']] += count
+    return dict(os_distribution), dict(dept_distribution)
 
-        device_key = _build_device_key(vuln)
-        device_entry = device_map.get(device_key)
-        disk_paths = _normalize_path_list(vuln.get('disk_paths'))
-        registry_paths = _normalize_path_list(vuln.get('registry_paths'))
 
+def _merge_device_rows(rows: List[Dict]) -> List[Dict]:
+    """Collapse device-level rows into one entry per device, merging evidence paths."""
+    device_map: Dict[str, Dict] = {}
+    for row in rows:
+        device_entry = device_map.get(row['device_key'])
         if not device_entry:
             device_entry = {
-                'device_id': vuln.get('device_id'),
-                'device_name': vuln.get('device_name'),
-                'os_platform': vuln.get('os_platform') or 'Unknown',
-                'os_version': vuln.get('os_version') or '',
-                'rbac_group_name': vuln.get('rbac_group_name') or 'Unknown',
-                'status': vuln.get('status') or 'Vulnerable',
+                'device_id': row.get('device_id'),
+                'device_name': row.get('device_name'),
+                'os_platform': row.get('os_platform') or 'Unknown',
+                'os_version': row.get('os_version') or '',
+                'rbac_group_name': row.get('rbac_group_name') or 'Unknown',
+                'status': row.get('status') or 'Vulnerable',
                 'disk_paths': [],
                 'registry_paths': []
             }
-            device_map[device_key] = device_entry
-
-        device_entry['disk_paths'] = _merge_unique_lists(device_entry['disk_paths'], disk_paths)
-        device_entry['registry_paths'] = _merge_unique_lists(device_entry['registry_paths'], registry_paths)
-
-    affected_devices = list(device_map.values())
-    first_vuln = vulnerabilities[0]
-
-    software_info = {
-        'vendor': first_vuln.get('software_vendor') or '',
-        'name': first_vuln.get('software_name') or '',
-        'version': first_vuln.get('software_version') or ''
-    }
-    remediation = {
-        'security_update_available': _coerce_bool(first_vuln.get('security_update_available')),
-        'recommended_security_update': first_vuln.get('recommended_security_update') or '',
-        'recommended_security_update_id': first_vuln.get('recommended_security_update_id') or '',
-        'recommended_security_update_url': first_vuln.get('recommended_security_update_url') or '',
-        'recommendation_reference': first_vuln.get('recommendation_reference') or ''
-    }
-
-    evidence = {
-        'disk_paths': _collect_unique_paths(affected_devices, 'disk_paths', limit=10),
-        'registry_paths': _collect_unique_paths(affected_devices, 'registry_paths', limit=10)
-    }
-
-    return {
-        'affected_devices': affected_devices,
-        'total_devices': len(affected_devices),
-        'os_distribution': os_distribution,
-        'dept_distribution': dept_distribution,
-        'severity': first_vuln.get('vulnerability_severity_level') or first_vuln.get('severity'),
-        'cvss_score': first_vuln.get('cvss_score'),
-        'software': software_info,
-        'remediation': remediation,
-        'evidence': evidence,
-        'total_vulnerabilities': len(vulnerabilities)
-    }
-
-
-def _normalize_path_list(raw_value) -> List[str]:
-    """Ensure evidence paths are returned as a clean list of strings."""
-    if raw_value is None:
-        return []
-    if isinstance(raw_value, list):
-        return [str(item).strip() for item in raw_value if str(item).strip()]
-    if isinstance(raw_value, (bytes, bytearray)):
-        raw_value = raw_value.decode('utf-8', errors='ignore')
-    if isinstance(raw_value, str):
-        trimmed = raw_value.strip()
-        if not trimmed:
-            return []
-        try:
-            parsed = json.loads(trimmed)
-            if isinstance(parsed, list):
-                return [str(item).strip() for item in parsed if str(item).strip()]
-        except ValueError:
-            return [trimmed]
-        return [trimmed]
-    return [str(raw_value).strip()]
+            device_map[row['device_key']] = device_entry
+
+        device_entry['disk_paths'] = _merge_unique_lists(device_entry['disk_paths'], row['disk_paths'])
+        device_entry['registry_paths'] = _merge_unique_lists(device_entry['registry_paths'], row['registry_paths'])
+    return list(device_map.values())
 
 
 def _merge_unique_lists(existing: List[str], new_items: List[str]) -> List[str]:
@@ -654,14 +744,6 @@ def _coerce_bool(value) -> bool:
     return bool(value)
 
 
-def _build_device_key(vuln: Dict) -> str:
-    """Generate a stable key for grouping device rows."""
-    key = vuln.get('device_id') or vuln.get('device_name')
-    if key:
-        return str(key)
-    return f"unknown-{vuln.get('id') or id(vuln)}"
-
-
 def _parse_device_tags(raw_value) -> List[str]:
     if not raw_value:
         return []
@@ -670,6 +752,7 @@ def _parse_device_tags(raw_value) -> List[str]:
     return [tag.strip() for tag in str(raw_value).split(',') if tag.strip()]
 
 
+@local_ttl_cache(DASHBOARD_LOCAL_CACHE_TTL)
 def get_filter_options():
     """Get filter option lists for dropdowns.
     
@@ -681,9 +764,8 @@ def get_filter_options():
         raise Exception("数据库连接失败")
     
     try:
-        cursor = connection.cursor(dictionary=True)
+        cursor = connection.cursor()
         
-        options = {}
         fields = [
             'vulnerability_severity_level',
             'status',
@@ -693,18 +775,31 @@ def get_filter_options():
             'software_vendor'
         ]
         
-        for field in fields:
-            query = f"""
-            SELECT DISTINCT {field} as value
-            FROM vulnerabilities
-            WHERE {field} IS NOT NULL AND {field} != ''
-            ORDER BY {field}
-            LIMIT 100
+        # One round trip: each branch keeps its own first-100 cut, and the
+        # outer ORDER BY restores the per-field ordering.
+        branches = [
+            f"""
+            (SELECT '{field}' AS field, {field} AS value
+             FROM {TABLE_VULNERABILITIES}
+             WHERE {field} IS NOT NULL AND {field} != ''
+             GROUP BY {field}
+             ORDER BY {field}
+             LIMIT 100)
+            """
+            for field in fields
+        ]
+        branches.append(
+            f"""
+            (SELECT 'device_tag' AS field, tag AS value
+             FROM {TABLE_DEVICE_TAG_SUMMARY})
             """
-            cursor.execute(query)
-            options[field] = [row['value'] for row in cursor.fetchall()]
+        )
+        cursor.execute(" UNION ALL ".join(branches) + " ORDER BY field, value")
         
-        options['device_tag'] = device_tag_service.get_distinct_device_tags(connection)
+        options = {field: [] for field in fields}
+        options['device_tag'] = []
+        for field, value in cursor.fetchall():
+            options[field].append(value)
         
         return options
     finally:
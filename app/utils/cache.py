@@ -1,7 +1,10 @@
-"""Caching utilities backed by Redis."""
+"""Caching utilities backed by Redis, plus a small in-process TTL memo."""
+import functools
 import json
 import logging
-from typing import Any, Optional
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import redis
 
@@ -11,6 +14,9 @@ logger = logging.getLogger(__name__)
 
 _redis_client: Optional[redis.Redis] = None
 
+# Every local_ttl_cache store, so a finished sync can drop them all at once.
+_local_caches: List[Dict[Any, Tuple[float, Any]]] = []
+
 
 def get_cache_client() -> Optional[redis.Redis]:
     """Get Redis client instance, initialize lazily."""
@@ -58,3 +64,58 @@ def cache_set(key: str, value: Any, ttl: int = 300) -> None:
         client.setex(key, ttl, json.dumps(value))
     except Exception as exc:
         logger.warning("Failed to set cache key %s: %s", key, exc)
+
+
+def cache_delete(*keys: str) -> None:
+    """Remove cached keys, e.g. after the underlying data changed."""
+    client = get_cache_client()
+    if not client or not keys:
+        return
+    try:
+        client.delete(*keys)
+    except Exception as exc:
+        logger.warning("Failed to delete cache keys %s: %s", keys, exc)
+
+
+def local_ttl_cache(ttl: float, maxsize: Optional[int] = None) -> Callable:
+    """Memoise a function's result in this process for ``ttl`` seconds.
+
+    Concurrent callers that miss on the same arguments wait on a per-key lock,
+    so a burst of identical requests runs the underlying query once. With
+    ``maxsize`` the store is emptied once it fills up, which bounds caches
+    keyed by user input.
+    """
+    def decorator(func: Callable) -> Callable:
+        store: Dict[Any, Tuple[float, Any]] = {}
+        key_locks: Dict[Any, threading.Lock] = {}
+        guard = threading.Lock()
+        _local_caches.append(store)
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            cached = store.get(args)
+            if cached and cached[0] > time.monotonic():
+                return cached[1]
+            with guard:
+                key_lock = key_locks.setdefault(args, threading.Lock())
+            with key_lock:
+                cached = store.get(args)
+                if cached and cached[0] > time.monotonic():
+                    return cached[1]
+                value = func(*args)
+                if maxsize is not None and len(store) >= maxsize:
+                    store.clear()
+                    with guard:
+                        key_locks.clear()
+                store[args] = (time.monotonic() + ttl, value)
+                return value
+
+        wrapper.cache_clear = store.clear
+        return wrapper
+    return decorator
+
+
+def clear_local_caches() -> None:
+    """Drop every ``local_ttl_cache`` entry, e.g. after new data is synced."""
+    for store in _local_caches:
+        store.clear()
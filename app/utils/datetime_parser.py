@@ -22,7 +22,7 @@ def parse_timestamp(timestamp_str: Optional[str], format_str: str = "%Y-%m-%d %H
     try:
         return datetime.datetime.strptime(timestamp_str, format_str)
     except ValueError:
-        logger.warning(f"Failed to parse timestamp: {timestamp_str} with format: {format_str}")
+        logger.warning("Failed to parse timestamp: %s with format: %s", timestamp_str, format_str)
         return None
 
 
@@ -53,7 +53,7 @@ def parse_iso_timestamp(timestamp_str: Optional[str]) -> Optional[datetime.datet
         try:
             return datetime.datetime.strptime(clean_str, "%Y-%m-%dT%H:%M:%S.%f")
         except ValueError:
-            logger.warning(f"Failed to parse ISO timestamp: {timestamp_str}")
+            logger.warning("Failed to parse ISO timestamp: %s", timestamp_str)
             return None
 
 
@@ -0,0 +1,85 @@
+"""Conditional GET helpers (ETag / Cache-Control) for read-only JSON routes."""
+import hashlib
+from decimal import Decimal
+from typing import Any, Optional
+
+import orjson
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+# For reads whose data only changes on sync or report generation: browsers may
+# reuse the body briefly, then revalidate with If-None-Match.
+SHORT_PRIVATE_CACHE = "private, max-age=30"
+# For reads the client polls or reloads right after its own writes: every
+# use revalidates, so only unchanged bodies are saved (as 304s).
+REVALIDATE_PRIVATE_CACHE = "private, no-cache"
+
+
+def _orjson_default(value: Any) -> Any:
+    # MySQL SUM()/DECIMAL columns come back as Decimal; match jsonable_encoder.
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError
+
+
+def _encoder_fallback(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    # Anything else orjson cannot handle natively (models, sets, bytes).
+    return jsonable_encoder(value)
+
+
+def render_json(payload: Any) -> bytes:
+    """Serialise a payload the same way every time so its ETag is stable.
+
+    orjson walks the rows directly; ``jsonable_encoder`` is only consulted
+    for the few values orjson has no native encoding for.
+    """
+    return orjson.dumps(
+        payload,
+        default=_encoder_fallback,
+        option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS,
+    )
+
+
+def plain_json_response(payload: Any) -> Response:
+    """Serialise plain dict/list rows straight with orjson.
+
+    Skips FastAPI's recursive ``jsonable_encoder`` pass, which dominates the
+    cost of large row-set payloads.
+    """
+    body = orjson.dumps(payload, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+    return Response(content=body, media_type="application/json")
+
+
+def etag_for(body: bytes) -> str:
+    return f'"{hashlib.sha1(body).hexdigest()}"'
+
+
+def conditional_json_response(
+    request: Request,
+    payload: Any = None,
+    cache_control: str = REVALIDATE_PRIVATE_CACHE,
+    body: Optional[bytes] = None,
+    etag: Optional[str] = None,
+) -> Response:
+    """Return the payload as JSON, or 304 when the client's ETag still matches.
+
+    ``body``/``etag`` may be passed precomputed for static payloads.
+    """
+    if body is None:
+        body = render_json(payload)
+    if etag is None:
+        etag = etag_for(body)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control,
+        "Vary": "Authorization",
+    }
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (
+        if_none_match.strip() == "*"
+        or etag in (tag.strip() for tag in if_none_match.split(","))
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
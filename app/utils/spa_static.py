@@ -0,0 +1,58 @@
+"""Static file serving for the built React frontend."""
+import os
+import posixpath
+from typing import FrozenSet
+
+from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException
+from starlette.types import Scope
+
+# Vite emits content-hashed file names under assets/, so they never change.
+IMMUTABLE_ASSET_CACHE = "public, max-age=31536000, immutable"
+INDEX_CACHE = "no-cache"
+
+
+def _list_files(directory: str) -> FrozenSet[str]:
+    files = set()
+    for root, _, names in os.walk(directory):
+        for name in names:
+            full_path = os.path.join(root, name)
+            files.add(os.path.relpath(full_path, directory).replace(os.sep, "/"))
+    return frozenset(files)
+
+
+def _is_file_request(relative_path: str) -> bool:
+    """Whether a path names a file rather than a client-side route."""
+    if relative_path.startswith("assets/"):
+        return True
+    return bool(posixpath.splitext(posixpath.basename(relative_path))[1])
+
+
+class SPAStaticFiles(StaticFiles):
+    """Serve the frontend build, falling back to index.html for client routes.
+
+    The file set is read once at startup (the build does not change while the
+    app runs), so unknown paths are routed to index.html without probing the
+    filesystem. Missing files (anything under ``assets/`` or with an
+    extension) get a 404 rather than an HTML body. Responses keep
+    StaticFiles' ETag/Last-Modified handling.
+    ``/api/...`` paths are expected to be claimed by a catch-all route
+    registered ahead of this mount.
+    """
+
+    def __init__(self, *, directory: str, **kwargs) -> None:
+        super().__init__(directory=directory, **kwargs)
+        self.files = _list_files(directory)
+
+    async def get_response(self, path: str, scope: Scope):
+        relative_path = path.replace(os.sep, "/")
+        if relative_path in self.files:
+            response = await super().get_response(path, scope)
+            if relative_path.startswith("assets/"):
+                response.headers["Cache-Control"] = IMMUTABLE_ASSET_CACHE
+            return response
+        if _is_file_request(relative_path):
+            raise HTTPException(status_code=404)
+        response = await super().get_response("index.html", scope)
+        response.headers["Cache-Control"] = INDEX_CACHE
+        return response
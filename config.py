@@ -15,6 +15,8 @@ class Config:
     DB_NAME = os.getenv("DB_NAME")
     DB_USER = os.getenv("DB_USER")
     DB_PASSWORD = os.getenv("DB_PASSWORD")
+    # mysql-connector caps pools at 32 connections
+    DB_POOL_SIZE = min(int(os.getenv("DB_POOL_SIZE", 16)), 32)
     
     # FastAPI metadata / runtime toggles
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret-key-change-in-production")
@@ -1,27 +1,95 @@
 """Database connection and utility functions."""
 import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
 from mysql.connector import Error
-import mysql.connector
+from mysql.connector.errors import PoolError
+from mysql.connector.pooling import MySQLConnectionPool
 from config import config
 
 logger = logging.getLogger(__name__)
 
+_pool: Optional[MySQLConnectionPool] = None
+_pool_lock = threading.Lock()
+
+# How long a caller waits for a pooled connection to be returned before
+# giving up, and how often it re-checks the pool meanwhile.
+POOL_WAIT_TIMEOUT = 5.0
+POOL_WAIT_INTERVAL = 0.05
+
+
+def _get_pool() -> MySQLConnectionPool:
+    """Create the shared connection pool on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = MySQLConnectionPool(
+                    pool_name="vm",
+                    pool_size=config.DB_POOL_SIZE,
+                    pool_reset_session=True,
+                    **config.db_config,
+                )
+    return _pool
+
 
 def get_db_connection():
-    """Create and return a database connection.
-    
+    """Return a database connection, borrowed from the shared pool.
+
+    ``close()`` hands pooled connections back to the pool (after resetting
+    the session). When every pooled connection is in use, waits up to
+    ``POOL_WAIT_TIMEOUT`` seconds for one to be returned, so load stays
+    bounded by the pool size instead of spilling into unpooled connections.
+
     Returns:
-        mysql.connector.connection.MySQLConnection or None: Database connection object,
-        or None if connection fails.
+        mysql.connector connection or None: Database connection object,
+        or None if connection fails or the pool stays exhausted.
     """
     try:
-        connection = mysql.connector.connect(**config.db_config)
+        deadline = time.monotonic() + POOL_WAIT_TIMEOUT
+        while True:
+            try:
+                connection = _get_pool().get_connection()
+                break
+            except PoolError as e:
+                if time.monotonic() >= deadline:
+                    logger.warning(
+                        "Connection pool exhausted for %.1fs (size %s): %s",
+                        POOL_WAIT_TIMEOUT, config.DB_POOL_SIZE, e,
+                    )
+                    return None
+                time.sleep(POOL_WAIT_INTERVAL)
         if connection.is_connected():
             return connection
     except Error as e:
-        logger.error(f"连接数据库时出错: {e}")
+        logger.error("连接数据库时出错: %s", e)
         return None
     except Exception as e:
-        logger.error(f"Unexpected database error: {e}")
+        logger.error("Unexpected database error: %s", e)
         return None
 
+
+@contextmanager
+def db_conn() -> Iterator:
+    """Yield a database connection and always close (return) it afterwards."""
+    connection = get_db_connection()
+    if not connection:
+        raise RuntimeError("数据库连接失败")
+    try:
+        yield connection
+    finally:
+        connection.close()
+
+
+@contextmanager
+def db_cursor(dictionary: bool = False) -> Iterator:
+    """Yield a cursor on a pooled connection; both are closed afterwards."""
+    with db_conn() as connection:
+        cursor = connection.cursor(dictionary=dictionary)
+        try:
+            yield cursor
+        finally:
+            cursor.close()
@@ -301,7 +301,8 @@ export interface RecommendationGenerateResponse {
 
 export interface RecommendationHistoryResponse {
   reports: RecommendationReport[];
-  total: number;
+  has_more: boolean;
+  next_cursor: number | null;
 }
 
 // RecordFuture
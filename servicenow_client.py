@@ -1,17 +1,81 @@
 """ServiceNow API Client handling authentication and requests."""
+import asyncio
+import hashlib
 import logging
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
+# Connection pool and retry policy for the synchronous client's session.
+# Retry only covers idempotent methods (urllib3's default), so POSTs that
+# create tickets or notes are never replayed.
+_SESSION_POOL_CONNECTIONS = 32
+_SESSION_POOL_MAXSIZE = 64
+_SESSION_RETRY = Retry(total=3, backoff_factor=0.2, status_forcelist=[429, 500, 502, 503, 504])
+
+# (connect, read) timeouts in seconds. Without them requests waits forever on
+# a mistyped or unreachable instance URL. The connection test is interactive,
+# so it gives up much sooner.
+_REQUEST_TIMEOUT = (5, 30)
+TEST_CONNECTION_TIMEOUT = (2, 5)
+
+# Large ticket and note listings are fetched as concurrent pages of this size
+# so no single Table API response gets truncated by the instance's row cap.
+_TICKET_PAGE_SIZE = 100
+
+# (credential fingerprint, client) reused by get_servicenow_client().
+_shared_client: Optional[Tuple[Tuple[str, str, str], "ServiceNowClient"]] = None
+
+
+class ServiceNowAPIError(Exception):
+    """ServiceNow answered with an error status or could not be reached.
+
+    ``status_code`` is None for connection failures.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def credential_fingerprint(metadata: Dict, secrets: Dict) -> Tuple[str, str, str]:
+    """Identify a credential set for client reuse without keeping the password."""
+    password = secrets.get('password') or ''
+    return (
+        metadata.get('instance_url') or '',
+        metadata.get('username') or '',
+        hashlib.sha256(password.encode('utf-8')).hexdigest(),
+    )
+
+
+def build_pooled_session() -> requests.Session:
+    """Return a session with the shared pool sizing and retry policy mounted."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=_SESSION_POOL_CONNECTIONS,
+        pool_maxsize=_SESSION_POOL_MAXSIZE,
+        max_retries=_SESSION_RETRY,
+    )
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
 
 class ServiceNowClient:
     """ServiceNow REST API Client."""
 
-    def __init__(self, instance_url: str, username: str, password: str):
-        """Initialize client with explicit credentials."""
+    def __init__(self, instance_url: str, username: str, password: str,
+                 session: Optional[requests.Session] = None):
+        """Initialize client with explicit credentials.
+
+        ``session`` may be supplied to share a connection pool; by default a
+        pooled session with retries is created.
+        """
         self.instance_url = (instance_url or "").rstrip('/')
         self.username = username or ""
         self.password = password or ""
@@ -22,7 +86,7 @@ class ServiceNowClient:
             raise ValueError("ServiceNow username and password are required")
 
         self.base_url = f"{self.instance_url}/api/now"
-        self.session = requests.Session()
+        self.session = session or build_pooled_session()
         self.session.auth = (self.username, self.password)
         self.session.headers.update({
             'Content-Type': 'application/json',
@@ -42,20 +106,24 @@ class ServiceNowClient:
             Response data as dictionary
             
         Raises:
-            requests.exceptions.RequestException: If request fails
+            ServiceNowAPIError: If request fails
         """
         url = f"{self.base_url}{endpoint}"
+        kwargs.setdefault('timeout', _REQUEST_TIMEOUT)
         
         try:
             response = self.session.request(method, url, **kwargs)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.HTTPError as e:
-            logger.error(f"ServiceNow API error: {e.response.status_code} - {e.response.text}")
-            raise Exception(f"ServiceNow API error: {e.response.status_code} - {e.response.text}")
+            logger.error("ServiceNow API error: %s - %s", e.response.status_code, e.response.text)
+            raise ServiceNowAPIError(
+                f"ServiceNow API error: {e.response.status_code} - {e.response.text}",
+                e.response.status_code,
+            ) from e
         except requests.exceptions.RequestException as e:
-            logger.error(f"ServiceNow request error: {e}")
-            raise Exception(f"Failed to connect to ServiceNow: {str(e)}")
+            logger.error("ServiceNow request error: %s", e)
+            raise ServiceNowAPIError(f"Failed to connect to ServiceNow: {str(e)}") from e
     
     def create_ticket(self, table: str = 'incident', **kwargs) -> Dict:
         """
@@ -160,10 +228,13 @@ class ServiceNowClient:
         result = self._make_request('POST', endpoint, json=data)
         return result.get('result', {})
     
-    def test_connection(self) -> bool:
+    def test_connection(self, timeout: Tuple[float, float] = TEST_CONNECTION_TIMEOUT) -> bool:
         """
         Test connection to ServiceNow instance
         
+        Args:
+            timeout: (connect, read) timeout in seconds
+            
         Returns:
             True if connection is successful
         """
@@ -171,15 +242,168 @@ class ServiceNowClient:
             # Try to get user info as a connection test
             endpoint = '/table/sys_user'
             params = {'sysparm_limit': 1}
-            self._make_request('GET', endpoint, params=params)
+            self._make_request('GET', endpoint, params=params, timeout=timeout)
+            return True
+        except Exception as e:
+            logger.error("ServiceNow connection test failed: %s", e)
+            return False
+
+
+class AsyncServiceNowClient:
+    """Non-blocking ServiceNow REST API client for async route handlers.
+
+    Mirrors ServiceNowClient on top of one pooled ``httpx.AsyncClient``; call
+    ``aclose()`` when the client is discarded.
+    """
+
+    def __init__(self, instance_url: str, username: str, password: str):
+        self.instance_url = (instance_url or "").rstrip('/')
+        self.username = username or ""
+        self.password = password or ""
+
+        if not self.instance_url:
+            raise ValueError("ServiceNow instance URL is required")
+        if not self.username or not self.password:
+            raise ValueError("ServiceNow username and password are required")
+
+        self.base_url = f"{self.instance_url}/api/now"
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            auth=(self.username, self.password),
+            headers={
+                'Content-Type': 'application/json',
+                'Accept': 'application/json'
+            },
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            timeout=httpx.Timeout(30.0),
+        )
+
+    async def aclose(self) -> None:
+        await self.http.aclose()
+
+    async def _make_request(self, method: str, endpoint: str, **kwargs) -> Dict:
+        """Async counterpart of ServiceNowClient._make_request."""
+        response = await self._send(method, endpoint, **kwargs)
+        return response.json()
+
+    async def _send(self, method: str, endpoint: str, **kwargs) -> httpx.Response:
+        """Send a request and return the raw response, for callers needing headers."""
+        try:
+            response = await self.http.request(method, endpoint, **kwargs)
+            response.raise_for_status()
+            return response
+        except httpx.HTTPStatusError as e:
+            logger.error("ServiceNow API error: %s - %s", e.response.status_code, e.response.text)
+            raise ServiceNowAPIError(
+                f"ServiceNow API error: {e.response.status_code} - {e.response.text}",
+                e.response.status_code,
+            ) from e
+        except httpx.RequestError as e:
+            logger.error("ServiceNow request error: %s", e)
+            raise ServiceNowAPIError(f"Failed to connect to ServiceNow: {str(e)}") from e
+
+    async def create_ticket(self, table: str = 'incident', **kwargs) -> Dict:
+        result = await self._make_request('POST', f'/table/{table}', json=kwargs)
+        return result.get('result', {})
+
+    async def get_tickets(self, table: str = 'incident',
+                          sysparm_query: Optional[str] = None,
+                          sysparm_limit: int = 100,
+                          sysparm_offset: int = 0) -> List[Dict]:
+        """Fetch up to ``sysparm_limit`` tickets, paging concurrently when large.
+
+        Pages are merged in offset order and the result ends at the first
+        short page.
+        """
+        if sysparm_limit <= _TICKET_PAGE_SIZE:
+            return await self._get_ticket_page(table, sysparm_query, sysparm_limit, sysparm_offset)
+        end = sysparm_offset + sysparm_limit
+        pages = [
+            (page_offset, min(_TICKET_PAGE_SIZE, end - page_offset))
+            for page_offset in range(sysparm_offset, end, _TICKET_PAGE_SIZE)
+        ]
+        results = await asyncio.gather(*(
+            self._get_ticket_page(table, sysparm_query, page_limit, page_offset)
+            for page_offset, page_limit in pages
+        ))
+        tickets: List[Dict] = []
+        for (_, page_limit), page in zip(pages, results):
+            tickets.extend(page)
+            if len(page) < page_limit:
+                break
+        return tickets
+
+    async def _get_ticket_page(self, table: str, sysparm_query: Optional[str],
+                               sysparm_limit: int, sysparm_offset: int) -> List[Dict]:
+        params = {
+            'sysparm_limit': sysparm_limit,
+            'sysparm_offset': sysparm_offset,
+            'sysparm_display_value': 'true',
+        }
+        if sysparm_query:
+            params['sysparm_query'] = sysparm_query
+        result = await self._make_request('GET', f'/table/{table}', params=params)
+        return result.get('result', [])
+
+    async def get_ticket(self, table: str, sys_id: str) -> Dict:
+        params = {'sysparm_display_value': 'true'}
+        result = await self._make_request('GET', f'/table/{table}/{sys_id}', params=params)
+        return result.get('result', {})
+
+    async def get_ticket_notes(self, table: str, sys_id: str) -> List[Dict]:
+        """Fetch all notes of a ticket, oldest first.
+
+        The first page reports the total via ``X-Total-Count``; any remaining
+        pages are then requested concurrently.
+        """
+        params = {
+            'sysparm_query': f'element_id={sys_id}^element={table}',
+            'sysparm_orderby': 'sys_created_on',
+            'sysparm_display_value': 'true',
+            'sysparm_limit': _TICKET_PAGE_SIZE,
+        }
+        response = await self._send('GET', '/table/sys_journal_field', params={**params, 'sysparm_offset': 0})
+        notes: List[Dict] = response.json().get('result', [])
+        try:
+            total = int(response.headers.get('X-Total-Count', 0))
+        except ValueError:
+            total = 0
+        if total <= _TICKET_PAGE_SIZE or len(notes) < _TICKET_PAGE_SIZE:
+            return notes
+        pages = await asyncio.gather(*(
+            self._make_request('GET', '/table/sys_journal_field', params={**params, 'sysparm_offset': offset})
+            for offset in range(_TICKET_PAGE_SIZE, total, _TICKET_PAGE_SIZE)
+        ))
+        for page in pages:
+            notes.extend(page.get('result', []))
+        return notes
+
+    async def add_ticket_note(self, table: str, sys_id: str, note_text: str) -> Dict:
+        data = {
+            'element_id': sys_id,
+            'element': table,
+            'name': table,
+            'value': note_text,
+        }
+        result = await self._make_request('POST', '/table/sys_journal_field', json=data)
+        return result.get('result', {})
+
+    async def test_connection(self) -> bool:
+        try:
+            await self._make_request('GET', '/table/sys_user', params={'sysparm_limit': 1})
             return True
         except Exception as e:
-            logger.error(f"ServiceNow connection test failed: {e}")
+            logger.error("ServiceNow connection test failed: %s", e)
             return False
 
 
 def get_servicenow_client() -> Optional[ServiceNowClient]:
-    """Backward compatible helper that reads credentials from settings service."""
+    """Backward compatible helper that reads credentials from settings service.
+
+    The client (and its pooled session) is reused until the stored
+    credentials change.
+    """
+    global _shared_client
     try:
         from app.services.integration_settings_service import (
             PROVIDER_SERVICENOW,
@@ -196,9 +420,13 @@ def get_servicenow_client() -> Optional[ServiceNowClient]:
 
     metadata = runtime.get('metadata') or {}
     secrets = runtime.get('secrets') or {}
+    fingerprint = credential_fingerprint(metadata, secrets)
+    cached = _shared_client
+    if cached and cached[0] == fingerprint:
+        return cached[1]
 
     try:
-        return ServiceNowClient(
+        client = ServiceNowClient(
             instance_url=metadata.get('instance_url', ''),
             username=metadata.get('username', ''),
             password=secrets.get('password', ''),
@@ -206,3 +434,5 @@ def get_servicenow_client() -> Optional[ServiceNowClient]:
     except (ValueError, Exception) as exc:  # noqa: BLE001
         logger.error("Failed to initialize ServiceNow client: %s", exc)
         return None
+    _shared_client = (fingerprint, client)
+    return client